@@ -3,15 +3,29 @@ import os
 import re
 import shutil
 import json
+from concurrent.futures import ThreadPoolExecutor
 from FT_public import FT_skincluster as skn  # Import the skincluster module from FT_public
-from PySide2.QtWidgets import QDialog,QPushButton, QButtonGroup, QRadioButton, QFileDialog, QListView, QTreeView, QAbstractItemView, QApplication, QVBoxLayout
-import importlib
-importlib.reload(skn)
+from FT_public import FT_cache as cache
+from FT_public import FT_obj as obj_reader
+from FT_public import FT_accessory_cache as accessory_cache
 
-# Use your FT Accessories directory and sourceimages path
-SOURCEIMAGES_DIR = os.path.dirname(cmds.file(q=1, loc=1)) #should be the rig directory or whereever the user is placing the rig, as the only reliable way to get them to load is to put them in the same folder
+# nothing here touches Qt or the open scene at import time so the module is safe to import in mayapy batch jobs
+TEXTURE_INDEX_NAME = "texture_index.json"
+TEXTURE_COPY_THREADS = 8
 
 
+def get_sourceimages_dir():
+    """
+       Folder the textures are staged into, resolved from the scene open right now
+    """
+    return os.path.dirname(cmds.file(q=1, loc=1)) #should be the rig directory or whereever the user is placing the rig, as the only reliable way to get them to load is to put them in the same folder
+
+def __getattr__(name):
+    # SOURCEIMAGES_DIR used to be evaluated at import, keep it working for scripts that read it
+    if name == "SOURCEIMAGES_DIR":
+        return get_sourceimages_dir()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 def check_project_folder():
     """
        Does a check to determine if were in a character 
@@ -96,7 +110,7 @@ def remove_existing_accessory_group():
                 '''
            
                 
-def import_obj(obj_file_path, FT_ID, joint_resolution):
+def import_obj(obj_file_path, FT_ID, joint_resolution, obj=None):
     # Extract the base name of the file (e.g., Handwrap_001_L)
     if joint_resolution == "Lo":
         base_name = os.path.splitext(os.path.basename(obj_file_path))[0] + "Lo_"
@@ -109,71 +123,155 @@ def import_obj(obj_file_path, FT_ID, joint_resolution):
     if existing_objs:
         cmds.delete(existing_objs)
     
-    # Import the OBJ file
-    imported_objs = cmds.file(obj_file_path, i=True, type="OBJ", rnn=True)
-    imported_obj = cmds.ls(imported_objs, assemblies=True)[0]  # Get the top-level transform node
-    cmds.polyNormalPerVertex(imported_obj, ufn=True)
-    cmds.polySoftEdge(imported_obj, ch=0)  # Smooth normals
-    
-    # Ensure the imported object has the correct name
-    
-    imported_obj = cmds.rename(imported_obj, base_name)
-    
-    # Add FT_ID attribute to the shape
-    shapes = cmds.listRelatives(imported_obj, shapes=True, fullPath=True)
-    if shapes:
-        for shape in shapes:
-            if not cmds.attributeQuery('FT_ID', node=shape, exists=True):
-                cmds.addAttr(shape, longName='FT_ID', dataType='string')
-            cmds.setAttr(f"{shape}.FT_ID", FT_ID, type='string')
+    # Build the mesh straight from the OBJ file, no translator and no construction history
+    if obj is None:
+        obj = obj_reader.read_obj(obj_file_path)
+    imported_obj = obj_reader.create_mesh(obj, base_name, FT_ID=FT_ID)
     
     return imported_obj
 
 def import_material_networks(material_folder):
+    new_nodes = []
     for material_file in os.listdir(material_folder):
         if material_file.endswith(".ma"):
             material_file_path = os.path.join(material_folder, material_file)
-            cmds.file(material_file_path, i=True, type="mayaAscii", options="v=0", loadReferenceDepth="all")
+            new_nodes += cmds.file(material_file_path, i=True, type="mayaAscii", options="v=0", loadReferenceDepth="all", returnNewNodes=True) or []
+    return new_nodes
+
+def load_texture_index(textures_subfolder):
+    """
+       sha1 -> file name of every texture staged into the folder, so a map shared by several accessories is only copied once
+    """
+    index_path = os.path.join(textures_subfolder, TEXTURE_INDEX_NAME)
+    if not os.path.exists(index_path):
+        return {}
+    try:
+        with open(index_path, 'r') as file:
+            return json.load(file)
+    except ValueError:
+        return {}
+
+def _same_stat(path, other_path, mtime=True):
+    if not os.path.exists(path):
+        return False
+    stat, other_stat = os.stat(path), os.stat(other_path)
+    return stat.st_size == other_stat.st_size and (not mtime or stat.st_mtime == other_stat.st_mtime)
+
+def _check_texture(source_path, textures_subfolder, index):
+    """
+       Works out whether a texture has to be copied, runs on the stage_textures pool.
+
+       Returns:
+           tuple: (digest, staged path or None when it has to be copied), digest is None when the source is missing
+               and "" when the stats already showed the destination is a copy of the source
+    """
+    if not os.path.exists(source_path):
+        return None, None
+    dest_texture_path = os.path.join(textures_subfolder, os.path.basename(source_path))
+    # copy2 keeps the mtime, a destination of the same size and mtime is the copy made last time
+    if _same_stat(dest_texture_path, source_path):
+        return "", dest_texture_path
+    digest = cache.file_digest(source_path)
+    if digest in index:
+        indexed_path = os.path.join(textures_subfolder, index[digest])
+        if _same_stat(indexed_path, source_path, mtime=False) and cache.file_digest(indexed_path) == digest:
+            return digest, indexed_path
+    if _same_stat(dest_texture_path, source_path, mtime=False) and cache.file_digest(dest_texture_path) == digest:
+        return digest, dest_texture_path
+    return digest, None
+
+def stage_textures(source_paths, textures_subfolder, threads=TEXTURE_COPY_THREADS):
+    """
+       Copies the textures into textures_subfolder, only files that are missing or whose size or contents differ
+       are copied. Files are only hashed when their size and mtime dont already settle it, the hashing and the
+       copies run on a thread pool. A texture already staged under another name is reused.
+
+       Returns:
+           dict: source path -> staged path
+    """
+    source_paths = sorted(set(source_paths))
+    if not os.path.exists(textures_subfolder):
+        os.makedirs(textures_subfolder)
+    index = load_texture_index(textures_subfolder)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        checks = dict(zip(source_paths, pool.map(lambda source_path: _check_texture(source_path, textures_subfolder, index), source_paths)))
+
+    staged = {}
+    copies = {}
+    copied_digests = {}
+    for source_path in source_paths:
+        digest, staged_path = checks[source_path]
+        if digest is None:
+            cmds.warning(f"Texture not found: {source_path}")
+            continue
+        if staged_path:
+            staged[source_path] = staged_path
+        elif digest in copied_digests:
+            # same map under another name in this import, point it at the first copy
+            staged[source_path] = copied_digests[digest]
+        else:
+            staged[source_path] = os.path.join(textures_subfolder, os.path.basename(source_path))
+            copies[staged[source_path]] = source_path
+            copied_digests[digest] = staged[source_path]
+        if digest:
+            index[digest] = os.path.basename(staged[source_path])
+
+    def copy(dest_texture_path):
+        print("Copying texture into the character sourceimages folder:", dest_texture_path)
+        shutil.copy2(copies[dest_texture_path], dest_texture_path)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(copy, copies))
+
+    with open(os.path.join(textures_subfolder, TEXTURE_INDEX_NAME), 'w') as file:
+        json.dump(index, file, indent=4, sort_keys=True)
+    print(f"Staged {len(staged)} textures, copied {len(copies)}")
+    return staged
 
 def setup_materials(materials_info, obj_materials, textures_folder, textures_subfolder, joint_resolution):
+    # joint_resolution can be a list, the copies of every resolution share the shading groups
+    joint_resolutions = joint_resolution if isinstance(joint_resolution, (list, tuple)) else [joint_resolution]
     shading_groups = {}
-    
-    for obj, materials in obj_materials.items():
-
-        print ("setup_materials obj", obj)
-        if joint_resolution == "Lo":
-            obj+="Lo_"
 
-        if joint_resolution == "Hi":
-            obj+="Hi_"
+    # gather every texture up front, stage them in one go and retarget the file nodes in one pass
+    texture_paths = {}
+    for material in set(material for materials in obj_materials.values() for material in materials):
+        for file_node in materials_info.get(material, []):
+            new_texture_name = cmds.getAttr(f"{file_node}.newTextureName")
+            texture_paths[file_node] = os.path.join(textures_folder, new_texture_name)
+    staged = stage_textures(texture_paths.values(), textures_subfolder)
+    for file_node, original_texture_path in texture_paths.items():
+        if original_texture_path in staged:
+            cmds.setAttr(f"{file_node}.fileTextureName", staged[original_texture_path], type="string")
+    
+    for joint_resolution in joint_resolutions:
+        for obj, materials in obj_materials.items():
 
-        for material in materials:
-            if material not in shading_groups:
-                shading_group = cmds.sets(renderable=True, noSurfaceShader=True, empty=True, name=f"{material}SG")
-                cmds.connectAttr(f"{material}.outColor", f"{shading_group}.surfaceShader")
-                shading_groups[material] = shading_group
-            else:
-                shading_group = shading_groups[material]
+            print ("setup_materials obj", obj)
+            if joint_resolution == "Lo":
+                obj+="Lo_"
 
-            cmds.sets(obj, edit=True, forceElement=shading_group)
+            if joint_resolution == "Hi":
+                obj+="Hi_"
 
-            file_nodes = materials_info.get(material, [])
-            for file_node in file_nodes:
-                new_texture_name = cmds.getAttr(f"{file_node}.newTextureName")
-                original_texture_path = os.path.join(textures_folder, new_texture_name)
-                dest_texture_path = os.path.join(textures_subfolder, new_texture_name)
+            for material in materials:
+                if material not in shading_groups:
+                    shading_group = cmds.sets(renderable=True, noSurfaceShader=True, empty=True, name=f"{material}SG")
+                    cmds.connectAttr(f"{material}.outColor", f"{shading_group}.surfaceShader")
+                    shading_groups[material] = shading_group
+                else:
+                    shading_group = shading_groups[material]
 
-                if not os.path.exists(dest_texture_path):  # Only copy if not already copied
-                    print("Copying texture into the character sourceimages folder:", dest_texture_path)
-                    shutil.copy(original_texture_path, dest_texture_path)
-                  
-                # Update the file node with the new texture path
-                cmds.setAttr(f"{file_node}.fileTextureName", dest_texture_path, type="string")
+                cmds.sets(obj, edit=True, forceElement=shading_group)
 
-def import_rig_weights(obj, weights_folder, joint_resolution):
+def import_rig_weights(obj, weights_folder, joint_resolution, cached_weights=None):
     #export_joints = cmds.ls('out_C0_*_jnt')
 
     #joint_resolution = 'export' if export_joints else ''
+    if cached_weights and obj in cached_weights:
+        print("Loading cached weights for", obj)
+        skn.apply_skin_weights(obj, *cached_weights[obj])
+        return
     weights_file_path = os.path.join(weights_folder, joint_resolution, f"{obj}_skin.xml")
 
     print("Loading weights from", weights_file_path)
@@ -182,8 +280,14 @@ def import_rig_weights(obj, weights_folder, joint_resolution):
     else:
         cmds.warning(f"Weight file not found: {weights_file_path}")
         
-def import_assets(asset_path, joint_resolution):
+def import_assets(asset_path, joint_resolution, sourceimages_dir=None):
+    """
+       Imports an accessory folder onto the rig. joint_resolution is "Standard", "Lo", "Hi" or a list of them,
+       a list reads the geometry, materials and textures once and builds one skinned copy per resolution
+       under its resolution group, all sharing the same shading networks
+    """
     print("asset_path ----->", asset_path)
+    joint_resolutions = joint_resolution if isinstance(joint_resolution, (list, tuple)) else [joint_resolution]
     #asset_path = "D:\Working\dev\git\_accessories\staging\LeatherPants_FE6-DJ7-HAD5"
     #joint_resolution = "Lo"
     asset_name, FT_ID = os.path.basename(asset_path).split("_")
@@ -205,15 +309,31 @@ def import_assets(asset_path, joint_resolution):
     obj_materials = json_data['obj_materials']
     version = json_data.get('version', '0001')
 
+    # pre-converted geometry and materials for this FT_ID and version, shared by every joint resolution
+    try:
+        cached = accessory_cache.load_entry(asset_folder, FT_ID, version)
+    except (IOError, OSError, ValueError) as error:
+        cmds.warning(f"Accessory cache unavailable, loading from the source files: {error}")
+        cached = None
+    # each obj is read once and built once per resolution
+    if cached:
+        geometry = cached["geometry"]
+    else:
+        geometry = {obj_file: obj_reader.read_obj(os.path.join(objs_folder, obj_file))
+                    for obj_file in os.listdir(objs_folder) if obj_file.endswith(".obj")}
+
     # Create a new group for the imported OBJs
-    if joint_resolution == "Standard":
-        group_name = f"{asset_name}_{FT_ID.replace('-','')}_AccessoryGroup"
-    elif joint_resolution == "Lo":
-        group_name = f"{asset_name}_{FT_ID.replace('-','')}_{joint_resolution}_AccessoryGroup"
-    elif joint_resolution == "Hi":
-        group_name = f"{asset_name}_{FT_ID.replace('-','')}_{joint_resolution}_AccessoryGroup"
-    if cmds.objExists(group_name):
-        cmds.delete(group_name)
+    group_names = {}
+    for joint_resolution in joint_resolutions:
+        if joint_resolution == "Standard":
+            group_name = f"{asset_name}_{FT_ID.replace('-','')}_AccessoryGroup"
+        elif joint_resolution == "Lo":
+            group_name = f"{asset_name}_{FT_ID.replace('-','')}_{joint_resolution}_AccessoryGroup"
+        elif joint_resolution == "Hi":
+            group_name = f"{asset_name}_{FT_ID.replace('-','')}_{joint_resolution}_AccessoryGroup"
+        if cmds.objExists(group_name):
+            cmds.delete(group_name)
+        group_names[joint_resolution] = group_name
     affected_objects = []
 
     existing_like_accessory_groups = cmds.ls(f"{asset_name}_{FT_ID.replace('-','')}*_AccessoryGroup")
@@ -275,31 +395,46 @@ def import_assets(asset_path, joint_resolution):
                            
 
     print("affected_objects:", affected_objects)
-    import_material_networks(material_folder)
-
-    group_node = cmds.group(empty=True, name=group_name)
-    cmds.addAttr(group_node, longName="FT_ID", dataType="string")
-    cmds.setAttr(f"{group_node}.FT_ID", FT_ID, type="string")
-    cmds.addAttr(group_node, longName="version", dataType="string")
-    cmds.setAttr(f"{group_node}.version", version, type="string")
-
-    if not cmds.objExists(joint_resolution):
-        joint_resolution_grp = cmds.group(empty=True, name=joint_resolution)
+    # the materials are the same for every resolution, import them once
+    if cached and cached["materials"]:
+        cmds.file(cached["materials"], i=True, type="mayaBinary", options="v=0")
     else:
-        joint_resolution_grp = joint_resolution
-    cmds.parent(group_node, joint_resolution)
+        material_nodes = import_material_networks(material_folder)
+        if cached:
+            accessory_cache.save_materials(cached["folder"], material_nodes)
 
     all_imported_objs = []
-    for obj_file in os.listdir(objs_folder):
-        if obj_file.endswith(".obj"):
-            obj_file_path = os.path.join(objs_folder, obj_file)
-            imported_obj = import_obj(obj_file_path, FT_ID, joint_resolution)
-            all_imported_objs.append(imported_obj)
-            cmds.parent(imported_obj, group_node)
-
-            import_rig_weights(imported_obj, weights_folder, joint_resolution)
-
-    setup_materials(materials_info, obj_materials, textures_folder, SOURCEIMAGES_DIR, joint_resolution)
+    for joint_resolution in joint_resolutions:
+        group_node = cmds.group(empty=True, name=group_names[joint_resolution])
+        cmds.addAttr(group_node, longName="FT_ID", dataType="string")
+        cmds.setAttr(f"{group_node}.FT_ID", FT_ID, type="string")
+        cmds.addAttr(group_node, longName="version", dataType="string")
+        cmds.setAttr(f"{group_node}.version", version, type="string")
+
+        if not cmds.objExists(joint_resolution):
+            joint_resolution_grp = cmds.group(empty=True, name=joint_resolution)
+        else:
+            joint_resolution_grp = joint_resolution
+        cmds.parent(group_node, joint_resolution)
+
+        cached_weights = None
+        if cached:
+            try:
+                cached_weights = accessory_cache.load_weights(asset_folder, FT_ID, version, joint_resolution, list(geometry))
+            except (IOError, OSError, ValueError) as error:
+                cmds.warning(f"Accessory weights cache unavailable, loading from the source files: {error}")
+        for obj_file in os.listdir(objs_folder):
+            if obj_file.endswith(".obj"):
+                obj_file_path = os.path.join(objs_folder, obj_file)
+                imported_obj = import_obj(obj_file_path, FT_ID, joint_resolution, obj=geometry[obj_file])
+                all_imported_objs.append(imported_obj)
+                cmds.parent(imported_obj, group_node)
+
+                import_rig_weights(imported_obj, weights_folder, joint_resolution, cached_weights)
+
+    if sourceimages_dir is None:
+        sourceimages_dir = get_sourceimages_dir()
+    setup_materials(materials_info, obj_materials, textures_folder, sourceimages_dir, joint_resolutions)
 
     for material,connected_shapes in affected_objects:
         if material in incoming_materials:        
@@ -331,16 +466,20 @@ def import_assets(asset_path, joint_resolution):
     for rez in ["Lo", "Standard", "Hi"]:
         if cmds.objExists(rez):
             cmds.hide(rez)
-    cmds.showHidden(joint_resolution)
+    cmds.showHidden(joint_resolutions[-1])
         
+JOINT_RESOLUTIONS = ["Standard", "Lo", "Hi"]
+
 def import_asset_from_folder(asset_folder, joint_resolution):
-    import_assets(asset_folder, joint_resolution)
+    # "All" loads every resolution in one pass
+    import_assets(asset_folder, JOINT_RESOLUTIONS if joint_resolution == "All" else joint_resolution)
 
 # Global variable to remember the last selection
 last_joint_resolution = "Standard"
 
 def load_accessory_folders():
     global last_joint_resolution
+    from PySide2.QtWidgets import QDialog,QPushButton, QButtonGroup, QRadioButton, QFileDialog, QListView, QTreeView, QAbstractItemView, QApplication, QVBoxLayout
     
     app = QApplication.instance()
     if not app:
@@ -368,6 +507,7 @@ def load_accessory_folders():
     radio_standard = QRadioButton("Standard")
     radio_lo = QRadioButton("Lo")
     radio_hi = QRadioButton("Hi")
+    radio_all = QRadioButton("All")
 
     # Load last selection and set it as default
     if last_joint_resolution == "Standard":
@@ -376,15 +516,19 @@ def load_accessory_folders():
         radio_lo.setChecked(True)
     elif last_joint_resolution == "Hi":
         radio_hi.setChecked(True)
+    elif last_joint_resolution == "All":
+        radio_all.setChecked(True)
 
     button_group = QButtonGroup(density_dialog)
     button_group.addButton(radio_standard)
     button_group.addButton(radio_lo)
     button_group.addButton(radio_hi)
+    button_group.addButton(radio_all)
 
     layout.addWidget(radio_standard)
     layout.addWidget(radio_lo)
     layout.addWidget(radio_hi)
+    layout.addWidget(radio_all)
 
     button_ok = QPushButton("OK")
     button_ok.clicked.connect(density_dialog.accept)
@@ -399,6 +543,8 @@ def load_accessory_folders():
             last_joint_resolution = "Lo"
         elif radio_hi.isChecked():
             last_joint_resolution = "Hi"
+        elif radio_all.isChecked():
+            last_joint_resolution = "All"
 
         if file_dialog.exec():
             paths = file_dialog.selectedFiles()
@@ -0,0 +1,196 @@
+'''accessory cache - keeps a pre-converted copy of every accessory version so loading it again skips the obj, xml and .ma parsing
+
+One folder per FT_ID and version under the cache root holds what every joint resolution shares:
+    geometry.npz    the read_obj arrays of every obj, keys are <obj file name>/<array>
+    materials.mb    the material networks as imported, written the first time the accessory is loaded
+    cache.json      the source key, a hash of every obj, .ma and json file, a changed file makes the entry stale
+and a sub folder per joint resolution holds its weights:
+    weights.npz     the influences and sparse vertices, columns and values of every skin xml, keys are <mesh>/<array>
+    cache.json      the source key of the shared files and the resolution's skin xmls
+
+The root is FT_ACCESSORY_CACHE when set, otherwise .FT_accessory_cache in the home folder.
+'''
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import maya.cmds as cmds
+
+from FT_public import FT_cache as cache
+from FT_public import FT_obj as obj_reader
+from FT_public import FT_skincluster as skn
+
+CACHE_VERSION = 3
+ENTRY_NAME = "cache.json"
+
+def get_cache_root():
+    return os.environ.get("FT_ACCESSORY_CACHE") or os.path.join(os.path.expanduser("~"), ".FT_accessory_cache")
+
+def get_cache_folder(FT_ID, version, joint_resolution=None):
+    folder = os.path.join(get_cache_root(), FT_ID, str(version))
+    return os.path.join(folder, joint_resolution) if joint_resolution else folder
+
+def _source_files(asset_folder, joint_resolution=None):
+    # the shared files, plus the skin xmls of the joint resolution when one is given
+    folders = [("", None), ("objs", ".obj"), ("material_networks", ".ma")]
+    if joint_resolution:
+        folders.append((os.path.join("weights", joint_resolution), ".xml"))
+    source_files = []
+    for folder, extension in folders:
+        folder_path = os.path.join(asset_folder, folder)
+        if not os.path.isdir(folder_path):
+            continue
+        for file_name in sorted(os.listdir(folder_path)):
+            if (extension is None and file_name.endswith(".json")) or (extension and file_name.endswith(extension)):
+                source_files.append(os.path.join(folder, file_name))
+    return source_files
+
+def source_key(asset_folder, joint_resolution=None):
+    """
+    Hash of the name and contents of every file the import reads, for the joint resolution's weights when one is given.
+    """
+    digests = {path: cache.file_digest(os.path.join(asset_folder, path)) for path in _source_files(asset_folder, joint_resolution)}
+    key = {"cache_version": CACHE_VERSION, "files": digests}
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def _read_entry(folder, key):
+    entry_path = os.path.join(folder, ENTRY_NAME)
+    if not os.path.exists(entry_path):
+        return None
+    try:
+        with open(entry_path, "r") as entry_file:
+            entry = json.load(entry_file)
+    except ValueError:
+        return None
+    return entry if entry.get("key") == key else None
+
+def _write_entry(folder, entry):
+    with open(os.path.join(folder, ENTRY_NAME), "w") as entry_file:
+        json.dump(entry, entry_file, indent=4)
+    return entry
+
+def load_entry(asset_folder, FT_ID, version):
+    """
+    Returns the shared cache entry of the accessory, built first when it is missing or its sources changed.
+
+    Returns:
+        dict: folder, geometry (obj file name -> read_obj dict) and materials, the .mb path or None
+            when it hasnt been written yet
+    """
+    folder = get_cache_folder(FT_ID, version)
+    key = source_key(asset_folder)
+    entry = _read_entry(folder, key)
+    if entry is None:
+        print("Building accessory cache:", folder)
+        entry = build_entry(asset_folder, folder, key)
+    else:
+        print("Loading accessory from cache:", folder)
+
+    geometry = {}
+    with np.load(os.path.join(folder, "geometry.npz")) as arrays:
+        for array_key in arrays.files:
+            obj_file, field = array_key.rsplit("/", 1)
+            geometry.setdefault(obj_file, {"uv_ids": None, "normal_ids": None})[field] = arrays[array_key]
+
+    materials_path = os.path.join(folder, "materials.mb")
+    return {"folder": folder,
+            "geometry": geometry,
+            "materials": materials_path if entry.get("materials") and os.path.exists(materials_path) else None}
+
+def build_entry(asset_folder, folder, key):
+    """
+    Converts the objs of an accessory into the cache folder, the materials are added by save_materials
+    once they have been imported.
+    """
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    geometry = {}
+    objs_folder = os.path.join(asset_folder, "objs")
+    for obj_file in sorted(os.listdir(objs_folder)):
+        if obj_file.endswith(".obj"):
+            obj = obj_reader.read_obj(os.path.join(objs_folder, obj_file))
+            for field, array in obj.items():
+                if array is not None:
+                    geometry[f"{obj_file}/{field}"] = array
+    np.savez(os.path.join(folder, "geometry.npz"), **geometry)
+    return _write_entry(folder, {"key": key, "materials": False})
+
+def load_weights(asset_folder, FT_ID, version, joint_resolution, obj_files):
+    """
+    Returns the cached weights of one joint resolution, built first when they are missing or their sources changed.
+
+    Args:
+        obj_files (list(str,)): the obj file names of the accessory, the skin xmls are matched to them
+
+    Returns:
+        dict: mesh -> read_skin_weights tuple
+    """
+    folder = get_cache_folder(FT_ID, version, joint_resolution)
+    key = source_key(asset_folder, joint_resolution)
+    entry = _read_entry(folder, key)
+    if entry is None:
+        print("Building accessory weights cache:", folder)
+        entry = build_weights(asset_folder, folder, key, joint_resolution, obj_files)
+
+    weights = {}
+    with np.load(os.path.join(folder, "weights.npz")) as arrays:
+        for mesh in entry["meshes"]:
+            weights[mesh] = ([str(name) for name in arrays[f"{mesh}/influences"]],
+                             arrays[f"{mesh}/vertices"], arrays[f"{mesh}/columns"], arrays[f"{mesh}/values"])
+    return weights
+
+def build_weights(asset_folder, folder, key, joint_resolution, obj_files):
+    """
+    Converts the skin xmls of one joint resolution into the cache folder.
+    """
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+
+    # the xml files are named after the mesh they were exported from, <obj><Lo_|Hi_>_skin.xml
+    obj_names = sorted((os.path.splitext(obj_file)[0] for obj_file in obj_files), key=len, reverse=True)
+    weights = {}
+    meshes = []
+    weights_folder = os.path.join(asset_folder, "weights", joint_resolution)
+    for weights_file in sorted(os.listdir(weights_folder)) if os.path.isdir(weights_folder) else []:
+        if not weights_file.endswith("_skin.xml"):
+            continue
+        mesh = weights_file[:-len("_skin.xml")]
+        if not any(mesh.startswith(name) for name in obj_names):
+            continue
+        influences, vertices, columns, values = skn.read_skin_weights(os.path.join(weights_folder, weights_file))
+        weights[f"{mesh}/influences"] = np.array(influences)
+        weights[f"{mesh}/vertices"] = vertices
+        weights[f"{mesh}/columns"] = columns
+        weights[f"{mesh}/values"] = values
+        meshes.append(mesh)
+    np.savez(os.path.join(folder, "weights.npz"), **weights)
+    return _write_entry(folder, {"key": key, "meshes": meshes})
+
+def save_materials(folder, nodes):
+    """
+    Exports freshly imported material network nodes into the cache entry so the next load imports one binary file.
+    """
+    nodes = [node for node in nodes if cmds.objExists(node)]
+    if not nodes:
+        return
+    selection = cmds.ls(sl=True)
+    cmds.select(nodes, replace=True, noExpand=True)
+    try:
+        cmds.file(os.path.join(folder, "materials.mb"), exportSelected=True, type="mayaBinary", force=True,
+                  constructionHistory=True, shader=True, channels=False, constraints=False, expressions=False,
+                  preserveReferences=False)
+    finally:
+        if selection:
+            cmds.select(selection, replace=True)
+        else:
+            cmds.select(clear=True)
+
+    entry_path = os.path.join(folder, ENTRY_NAME)
+    with open(entry_path, "r") as entry_file:
+        entry = json.load(entry_file)
+    entry["materials"] = True
+    with open(entry_path, "w") as entry_file:
+        json.dump(entry, entry_file, indent=4)
@@ -0,0 +1,273 @@
+'''anim curve io - reads and writes whole animCurves as arrays instead of one key per command'''
+
+import contextlib
+import os
+
+import maya.cmds as cmds
+from maya.api import OpenMaya, OpenMayaAnim
+import numpy as np
+
+TANGENT_TYPES = {
+    "global": OpenMayaAnim.MFnAnimCurve.kTangentGlobal,
+    "fixed": OpenMayaAnim.MFnAnimCurve.kTangentFixed,
+    "linear": OpenMayaAnim.MFnAnimCurve.kTangentLinear,
+    "flat": OpenMayaAnim.MFnAnimCurve.kTangentFlat,
+    "step": OpenMayaAnim.MFnAnimCurve.kTangentStep,
+    "stepnext": OpenMayaAnim.MFnAnimCurve.kTangentStepNext,
+    "slow": OpenMayaAnim.MFnAnimCurve.kTangentSlow,
+    "fast": OpenMayaAnim.MFnAnimCurve.kTangentFast,
+    "spline": OpenMayaAnim.MFnAnimCurve.kTangentSmooth,
+    "clamped": OpenMayaAnim.MFnAnimCurve.kTangentClamped,
+    "plateau": OpenMayaAnim.MFnAnimCurve.kTangentPlateau,
+    "auto": OpenMayaAnim.MFnAnimCurve.kTangentAuto,
+}
+
+UNDO_PLUGIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "FT_undo_plugin.py")
+# changes waiting for the FT_apiUndo command to pick them up
+pending_changes = []
+
+def get_anim_curve(plug):
+    """
+    Returns the animCurve driving a plug, or None if it isnt keyed.
+    """
+    curves = cmds.keyframe(plug, query=True, name=True)
+    if curves:
+        return curves[0]
+    return None
+
+def get_or_create_anim_curve(plug, time=None):
+    """
+    Returns the animCurve driving a plug, setting a key on the current value first if there isnt one.
+    time (float) places that key, it defaults to the current time.
+    """
+    curve = get_anim_curve(plug)
+    if curve is None:
+        if time is None:
+            cmds.setKeyframe(plug)
+        else:
+            cmds.setKeyframe(plug, time=(time,))
+        curve = get_anim_curve(plug)
+    return curve
+
+def disconnect_inputs(plugs):
+    """
+    Breaks whatever drives the plugs, other than animCurves, so baked curves can take over.
+    """
+    for plug in plugs:
+        sources = cmds.listConnections(plug, source=True, destination=False, plugs=True, skipConversionNodes=True) or []
+        curves = cmds.listConnections(plug, source=True, destination=False, type="animCurve") or []
+        for source in sources:
+            if source.split(".")[0] not in curves:
+                cmds.disconnectAttr(source, plug)
+
+def get_anim_curve_fn(curve):
+    """
+    Returns an MFnAnimCurve for the named animCurve node.
+    """
+    curve_obj = OpenMaya.MSelectionList().add(curve).getDependNode(0)
+    return OpenMayaAnim.MFnAnimCurve(curve_obj)
+
+def _ui_to_internal_scale(curve_fn):
+    """
+    keyframe queries return ui units, MFnAnimCurve works in internal units (cm and radians).
+    """
+    curve_type = curve_fn.animCurveType
+    if curve_type in (OpenMayaAnim.MFnAnimCurve.kAnimCurveTA, OpenMayaAnim.MFnAnimCurve.kAnimCurveUA):
+        return OpenMaya.MAngle.uiToInternal(1.0)
+    if curve_type in (OpenMayaAnim.MFnAnimCurve.kAnimCurveTL, OpenMayaAnim.MFnAnimCurve.kAnimCurveUL):
+        return OpenMaya.MDistance.uiToInternal(1.0)
+    return 1.0
+
+def read_curve(curve):
+    """
+    Reads every key of a curve with a single keyframe query.
+
+    Returns:
+        tuple(np.ndarray, np.ndarray): key times (ui time unit) and values (ui units)
+    """
+    key_time_values = cmds.keyframe(curve, query=True, timeChange=True, valueChange=True) or []
+    key_time_values = np.array(key_time_values, dtype=float)
+    return key_time_values[0::2], key_time_values[1::2]
+
+def read_curves(curves):
+    """
+    Reads the keys of any set of curves into two contiguous arrays.
+
+    Args:
+        curves (list(str,)): animCurve nodes
+
+    Returns:
+        tuple(np.ndarray, np.ndarray, np.ndarray): times, values and offsets, the keys of
+            curves[i] live in times[offsets[i]:offsets[i + 1]]
+    """
+    times = []
+    values = []
+    offsets = np.zeros(len(curves) + 1, dtype=np.int64)
+    for i, curve in enumerate(curves):
+        curve_times, curve_values = read_curve(curve)
+        times.append(curve_times)
+        values.append(curve_values)
+        offsets[i + 1] = offsets[i] + len(curve_times)
+    if not curves:
+        return np.zeros(0), np.zeros(0), offsets
+    return np.concatenate(times), np.concatenate(values), offsets
+
+def stack_keys(times, values, offsets):
+    """
+    Reshapes the output of read_curves to (curves, keys) arrays. Every curve must have the same key count.
+    """
+    key_counts = np.diff(offsets)
+    if len(key_counts) and np.any(key_counts != key_counts[0]):
+        raise ValueError("Curves have different key counts and cant be stacked.")
+    shape = (len(key_counts), int(key_counts[0]) if len(key_counts) else 0)
+    return times.reshape(shape), values.reshape(shape)
+
+def _tangent_type(tangent):
+    if isinstance(tangent, str):
+        return TANGENT_TYPES[tangent]
+    return tangent
+
+def commit_change(change):
+    """
+    Puts an MAnimCurveChange on maya's undo queue. The edits it holds are already made, the
+    FT_apiUndo command from FT_undo_plugin only records it so undo and redo can replay it.
+    """
+    if not cmds.pluginInfo("FT_undo_plugin", query=True, loaded=True):
+        cmds.loadPlugin(UNDO_PLUGIN, quiet=True)
+    pending_changes.append(change)
+    cmds.FT_apiUndo()
+
+@contextlib.contextmanager
+def undoable():
+    """
+    Collects the curve edits made in the block on one MAnimCurveChange and commits it on the way out.
+
+        with animcurves.undoable() as change:
+            animcurves.write_plugs(plugs, times, values, change=change)
+    """
+    change = OpenMayaAnim.MAnimCurveChange()
+    try:
+        yield change
+    finally:
+        commit_change(change)
+
+def write_curve(curve, times, values, in_tangent="global", out_tangent="global", keep_outside_keys=False, change=None):
+    """
+    Replaces the keys of a curve with a single MFnAnimCurve.addKeys call.
+
+    Args:
+        curve (str): animCurve node
+        times (sequence): key times in the ui time unit
+        values (sequence): key values in ui units
+        in_tangent (str or list(str,)): one tangent type for every key, or one per key
+        out_tangent (str or list(str,)): one tangent type for every key, or one per key
+        keep_outside_keys (bool): only replace the keys between the first and last time,
+            keys outside of that span are left alone
+        change (MAnimCurveChange): records the edits, the write is only undoable with one, see undoable()
+    """
+    curve_fn = get_anim_curve_fn(curve)
+    times = np.asarray(times, dtype=float)
+    values = np.asarray(values, dtype=float) * _ui_to_internal_scale(curve_fn)
+    if not len(times):
+        return
+
+    per_key_in = not isinstance(in_tangent, str)
+    per_key_out = not isinstance(out_tangent, str)
+    default_in = "global" if per_key_in else in_tangent
+    default_out = "global" if per_key_out else out_tangent
+
+    if keep_outside_keys:
+        existing_times, _ = read_curve(curve)
+        inside = np.nonzero((existing_times >= times[0]) & (existing_times <= times[-1]))[0]
+        for index in inside[::-1]:
+            curve_fn.remove(int(index), change)
+
+    time_unit = OpenMaya.MTime.uiUnit()
+    time_array = OpenMaya.MTimeArray([OpenMaya.MTime(t, time_unit) for t in times.tolist()])
+    curve_fn.addKeys(time_array, OpenMaya.MDoubleArray(values.tolist()),
+                     _tangent_type(default_in), _tangent_type(default_out),
+                     keep_outside_keys, change)
+
+    if per_key_in or per_key_out:
+        first_index = curve_fn.find(time_array[0]) if keep_outside_keys else 0
+        for i in range(len(times)):
+            if per_key_in and in_tangent[i] != default_in:
+                curve_fn.setInTangentType(first_index + i, _tangent_type(in_tangent[i]), change)
+            if per_key_out and out_tangent[i] != default_out:
+                curve_fn.setOutTangentType(first_index + i, _tangent_type(out_tangent[i]), change)
+
+def write_curves(curves, times, values, offsets=None, in_tangent="global", out_tangent="global", keep_outside_keys=False,
+                 change=None):
+    """
+    Writes a batch of curves, one addKeys call per curve.
+
+    times and values are either (curves, keys) arrays or flat arrays split by offsets as returned by read_curves.
+    """
+    for i, curve in enumerate(curves):
+        if offsets is None:
+            curve_times, curve_values = times[i], values[i]
+        else:
+            curve_times = times[offsets[i]:offsets[i + 1]]
+            curve_values = values[offsets[i]:offsets[i + 1]]
+        write_curve(curve, curve_times, curve_values, in_tangent=in_tangent, out_tangent=out_tangent,
+                    keep_outside_keys=keep_outside_keys, change=change)
+
+def write_plugs(plugs, times, values, in_tangent="global", out_tangent="global", keep_outside_keys=False, change=None):
+    """
+    Same as write_curves but takes plugs, creating a curve on any plug that isnt keyed yet.
+    times and values are (plugs, keys) arrays or lists of per plug arrays.
+    """
+    curves = [get_or_create_anim_curve(plug, float(times[i][0])) for i, plug in enumerate(plugs)]
+    write_curves(curves, times, values, in_tangent=in_tangent, out_tangent=out_tangent,
+                 keep_outside_keys=keep_outside_keys, change=change)
+    return curves
+
+def reduce_keys(times, values, tolerances):
+    """
+    Picks keys that rebuild each curve within its tolerance when the kept keys are joined with
+    linear tangents, by greedy splitting. Works on a whole batch of curves at once.
+
+    Every pass measures the error of all curves against their current keys and splits every
+    segment that is out of tolerance at its worst sample, so the number of passes grows with the
+    depth of the splits rather than with the number of keys. Splitting at the worst sample always
+    honours the tolerance but can keep a few more keys than the smallest set that would.
+
+    Args:
+        times (np.ndarray): (curves, keys) key times
+        values (np.ndarray): (curves, keys) key values
+        tolerances (np.ndarray): (curves,) largest allowed difference per curve
+
+    Returns:
+        np.ndarray: (curves, keys) bool mask of the keys to keep
+    """
+    times = np.asarray(times, dtype=float)
+    values = np.asarray(values, dtype=float)
+    tolerances = np.asarray(tolerances, dtype=float)
+    curve_count, key_count = values.shape
+    if key_count <= 2:
+        return np.ones((curve_count, key_count), dtype=bool)
+    keep = np.zeros((curve_count, key_count), dtype=bool)
+    keep[:, [0, -1]] = True
+
+    key_index = np.arange(key_count)
+    while True:
+        # previous and next kept key of every sample
+        previous_key = np.maximum.accumulate(np.where(keep, key_index, 0), axis=1)
+        next_key = np.minimum.accumulate(np.where(keep, key_index, key_count - 1)[:, ::-1], axis=1)[:, ::-1]
+        t0 = np.take_along_axis(times, previous_key, axis=1)
+        t1 = np.take_along_axis(times, next_key, axis=1)
+        v0 = np.take_along_axis(values, previous_key, axis=1)
+        v1 = np.take_along_axis(values, next_key, axis=1)
+        span = t1 - t0
+        weight = np.divide(times - t0, span, out=np.zeros_like(span), where=span > 0)
+        error = np.abs(v0 + (v1 - v0) * weight - values)
+
+        rows, columns = np.nonzero(error > tolerances[:, None])
+        if not len(rows):
+            return keep
+
+        # the worst sample of every failing segment becomes a key
+        segment = np.cumsum(keep, axis=1)[rows, columns] + rows * key_count
+        order = np.lexsort((-error[rows, columns], segment))
+        _, first = np.unique(segment[order], return_index=True)
+        keep[rows[order[first]], columns[order[first]]] = True
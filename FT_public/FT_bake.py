@@ -1,12 +1,26 @@
+import hashlib
+import json
+import os
 import maya.cmds as mc
 import maya.mel as mm
+from maya.api import OpenMaya
+import numpy as np
+import FT_public.FT_animcurves as animcurves
+import FT_public.FT_math as ftmath
 
 def bake_transform_animation(transforms, sample_by = 1, bakeSRT = True, skipSRT=[],
                                 bakeAttrs = ['tx', 'ty', 'tz', 'rx', 'ry', 'rz'], 
-                                minimizeRotation=False):
+                                minimizeRotation=False, sharded=False, workers=None,
+                                reduce_keys=False, translate_tolerance=0.01, rotate_tolerance=0.05,
+                                quaternion_continuity=False):
     """
     Bake transforms down to keyframes
     bakeSrt (bool) fixes the flips after the bake is complete
+    quaternion_continuity (bool) samples matrices and solves flip free eulers directly, no fix is needed
+        afterwards so bakeSRT is ignored, see bake_quaternion_continuity
+    sharded (bool) splits the playback range across headless mayapy processes, see FT_shard
+    workers (int) number of mayapy processes for a sharded bake, defaults to the number of cores
+    reduce_keys (bool) thins the baked curves within translate_tolerance and rotate_tolerance, see reduce_baked_curves
     """
     #set_nodes = mc.sets(engine_joints, query=True)
     start_frame = mc.playbackOptions(query=True, minTime=True)
@@ -14,9 +28,38 @@ def bake_transform_animation(transforms, sample_by = 1, bakeSRT = True, skipSRT=
 
     #log.info("Baking animation curves for joints under %s:" % engine_joints)
 
-    #swap to a panel that doesnt render
-    model_panel = set_dull_panel()
+    if quaternion_continuity:
+        bake_quaternion_continuity(transforms, start_frame, end_frame, sample_by=sample_by, bakeAttrs=bakeAttrs)
+        bakeSRT = False
+    elif sharded:
+        import FT_public.FT_shard as shard
+        shard.bake_sharded(transforms, int(start_frame), int(end_frame), sample_by=sample_by,
+                           bakeAttrs=bakeAttrs, minimizeRotation=minimizeRotation, workers=workers)
+    else:
+        #swap to a panel that doesnt render
+        model_panel = set_dull_panel()
 
+        bake_results(transforms, start_frame, end_frame, sample_by=sample_by, bakeAttrs=bakeAttrs,
+                     minimizeRotation=minimizeRotation)
+
+        #swap back to model panel viewer
+        set_model_panel(model_panel)
+
+    if bakeSRT == True:
+        skipped = fix_rotation_flips([transform for transform in transforms if transform not in skipSRT])
+        for transform in skipped:
+            print ("skipped:", transform)
+        print ("no flip bake fix completed")
+
+    if reduce_keys:
+        reduce_baked_curves(transforms, translate_tolerance=translate_tolerance, rotate_tolerance=rotate_tolerance,
+                            attrs=bakeAttrs)
+
+def bake_results(transforms, start_frame, end_frame, sample_by = 1,
+                 bakeAttrs = ['tx', 'ty', 'tz', 'rx', 'ry', 'rz'], minimizeRotation=False):
+    """
+    The bakeResults call every FT bake goes through, shared with the sharded bake workers.
+    """
     mc.bakeResults(transforms,
                      #hierarchy = "below",
                      simulation=True,
@@ -35,18 +78,6 @@ def bake_transform_animation(transforms, sample_by = 1, bakeSRT = True, skipSRT=
                      #shape=True
                      )
 
-    if bakeSRT == True:
-        for transform in transforms:
-            if transform not in skipSRT:
-                try:
-                    maya_bakeSRT_runCommand_new(transform)
-                except:
-                    print ("skipped:", transform)
-        print ("no flip bake fix completed")
-
-    #swap back to model panel viewer
-    set_model_panel(model_panel)
-
 def set_dull_panel():
     """
     Temporarily change to dope sheet or another "dull" window for baking purposes
@@ -74,18 +105,29 @@ def maya_bakeSRT_runCommand_new(transform):
 
     """
     Takes transforms and fixes gimbal issues one frame at a time using some conditional math.
+    This is the scalar reference path, fix_rotation_flips does the same work on whole arrays.
     """
 
     t0 = float(mc.playbackOptions(q=1, ast=1))
     t1 = float(mc.playbackOptions(q=1, aet=1))
 
     # get keys - should be same for all channels since we baked them in that range
-    k = 0
-    nKeys = int(mc.keyframe(transform + ".rotateX", query=1, keyframeCount=1))
-    rotX = mc.keyframe(transform + ".rotateX", valueChange=1, query=1)
-    rotY = mc.keyframe(transform + ".rotateY", valueChange=1, query=1)
-    rotZ = mc.keyframe(transform + ".rotateZ", valueChange=1, query=1)
+    curves = [animcurves.get_anim_curve(transform + attr) for attr in (".rotateX", ".rotateY", ".rotateZ")]
+    times, rotX = animcurves.read_curve(curves[0])
+    rotY = animcurves.read_curve(curves[1])[1]
+    rotZ = animcurves.read_curve(curves[2])[1]
+    rotX, rotY, rotZ = unwrap_euler_rotations_scalar(list(rotX), list(rotY), list(rotZ))
+
+    # set keyframes
+    for curve, values in zip(curves, (rotX, rotY, rotZ)):
+        animcurves.write_curve(curve, times, values)
 
+def unwrap_euler_rotations_scalar(rotX, rotY, rotZ):
+    """
+    Key by key gimbal and flip rules, edits the three lists of rotate values (degrees) in place.
+    The wrap counts use floor division like the original MEL did.
+    """
+    nKeys = len(rotX)
     for k in range(1,nKeys):
         x_diff = 0.0
         y_diff = 0.0
@@ -93,19 +135,19 @@ def maya_bakeSRT_runCommand_new(transform):
         x_diff = rotX[k] - rotX[k - 1]
 
         if x_diff<-90:
-            rotX[k]+=float(float((((int((x_diff + 90)) / -360) + 1) * 360)))
+            rotX[k]+=float(float((((int((x_diff + 90)) // -360) + 1) * 360)))
         x_diff=rotX[k] - rotX[k - 1]
 
         if x_diff>270:
-            rotX[k]-=float(float((((int((x_diff - 270)) / 360) + 1) * 360)))
+            rotX[k]-=float(float((((int((x_diff - 270)) // 360) + 1) * 360)))
         z_diff=rotZ[k] - rotZ[k - 1]
 
         if z_diff<-90:
-            rotZ[k]+=float(float((((int((z_diff + 90)) / -360) + 1) * 360)))
+            rotZ[k]+=float(float((((int((z_diff + 90)) // -360) + 1) * 360)))
         z_diff=rotZ[k] - rotZ[k - 1]
 
         if z_diff>270:
-            rotZ[k]-=float(float((((int((z_diff - 270)) / 360) + 1) * 360)))
+            rotZ[k]-=float(float((((int((z_diff - 270)) // 360) + 1) * 360)))
         x_diff=rotX[k] - rotX[k - 1]
 
         if (x_diff>90) and (x_diff<270):
@@ -115,34 +157,214 @@ def maya_bakeSRT_runCommand_new(transform):
         y_diff=rotY[k] - rotY[k - 1]
 
         if y_diff>180:
-            rotY[k]-=float(float((((int((y_diff - 180)) / 360) + 1) * 360)))
+            rotY[k]-=float(float((((int((y_diff - 180)) // 360) + 1) * 360)))
         y_diff=rotY[k] - rotY[k - 1]
 
         if y_diff<-180:
-            rotY[k]+=float(float((((int((y_diff + 180)) / -360) + 1) * 360)))
+            rotY[k]+=float(float((((int((y_diff + 180)) // -360) + 1) * 360)))
 
-    # set keyframes
-    for k in range(0,nKeys):
+    return rotX, rotY, rotZ
+
+def _cumulative_turns(turns):
+    """
+    Running sum of per-key wrap counts, padded so the first key never moves.
+    """
+    total = np.zeros(turns.shape[:-1] + (turns.shape[-1] + 1,))
+    np.cumsum(turns, axis=-1, out=total[..., 1:])
+    return total
+
+def _flip_states(x_step):
+    """
+    Which keys the X rule flips, worked out from the raw X steps.
+
+    A key flips when its step, plus half a turn if the key before it flipped, wraps strictly between
+    90 and 270, so each raw step in there toggles the state. A raw step of exactly 90 or 270 never
+    flips whatever came before, the state starts again from there.
+    """
+    x_step_wrapped = np.mod(x_step, 360.0)
+    step_flips = (x_step_wrapped > 90.0) & (x_step_wrapped < 270.0)
+    resets = (x_step_wrapped == 90.0) | (x_step_wrapped == 270.0)
+    toggles = _cumulative_turns(step_flips)[..., 1:]
+    last_reset = np.maximum.accumulate(np.where(resets, np.arange(x_step.shape[-1]), -1), axis=-1)
+    toggles_at_reset = np.where(last_reset >= 0, np.take_along_axis(toggles, np.maximum(last_reset, 0), axis=-1), 0)
+    flipped = np.zeros(x_step.shape[:-1] + (x_step.shape[-1] + 1,), dtype=bool)
+    flipped[..., 1:] = (toggles - toggles_at_reset) % 2 == 1
+    return flipped
+
+def _wrap_turns(steps, low, high):
+    """
+    Whole turns that bring each step within [low, high] the way the scalar rules do.
+
+    The rules only move a step that lies outside the interval, one past high lands just above
+    low and one past low just below high, so a step that wraps exactly onto an end keeps low or
+    high depending on how far the key before it had already been moved. Those keys are rare and
+    walked in order, everything else is a plain floor.
+    """
+    turns = -np.floor((steps - low) / 360.0)
+    boundary = np.mod(steps - low, 360.0) == 0.0
+    if not boundary.any():
+        return turns
+    previous_turns = _cumulative_turns(turns)
+    flat_turns = turns.reshape(-1, turns.shape[-1])
+    flat_steps = steps.reshape(-1, steps.shape[-1])
+    flat_previous = previous_turns.reshape(-1, previous_turns.shape[-1])
+    row, added = -1, 0.0
+    for boundary_row, key in np.argwhere(boundary.reshape(-1, boundary.shape[-1])):
+        if boundary_row != row:
+            row, added = boundary_row, 0.0
+        # the step from the key before as it was corrected so far
+        step = flat_steps[row, key] - 360.0 * (flat_previous[row, key] + added)
+        if step == low or step == high:
+            wrapped = step
+        else:
+            wrapped = high if step < low else low
+        corrected_turns = (wrapped - flat_steps[row, key]) / 360.0
+        added += corrected_turns - flat_turns[row, key]
+        flat_turns[row, key] = corrected_turns
+    return turns
+
+def unwrap_euler_rotations(rot_x, rot_y, rot_z):
+    """
+    Array version of unwrap_euler_rotations_scalar. Takes rotate values in degrees shaped
+    (keys,) or (transforms, keys) and returns corrected copies of the three arrays.
+
+    Every correction the scalar rules make is a whole number of half or full turns decided
+    by the raw key to key steps, so the per-key decisions can be worked out up front and
+    summed along the curve instead of walking it.
+    """
+    rot_x = np.array(rot_x, dtype=float)
+    rot_y = np.array(rot_y, dtype=float)
+    rot_z = np.array(rot_z, dtype=float)
+    if rot_x.shape[-1] < 2:
+        return rot_x, rot_y, rot_z
+
+    x_step = np.diff(rot_x, axis=-1)
+    flipped = _flip_states(x_step)
+    previous_half_turn = flipped[..., :-1] * 180.0
+
+    # X and Z steps from the previous corrected key are wrapped into [-90, 270] before the flip is applied
+    x_turns = _wrap_turns(x_step + previous_half_turn, -90.0, 270.0)
+    z_turns = _wrap_turns(np.diff(rot_z, axis=-1) + previous_half_turn, -90.0, 270.0)
+    rot_x += _cumulative_turns(x_turns) * 360.0 - flipped * 180.0
+    rot_z += _cumulative_turns(z_turns) * 360.0 - flipped * 180.0
+
+    # Y is mirrored on flipped keys, then kept within [-180, 180] of the previous key
+    rot_y = np.where(flipped, 180.0 - rot_y, rot_y)
+    y_turns = _wrap_turns(np.diff(rot_y, axis=-1), -180.0, 180.0)
+    rot_y += _cumulative_turns(y_turns) * 360.0
 
-        mc.keyframe((transform + ".rotateX"),
-            edit=1, index=(k,k), valueChange=rotX[k])
-        mc.keyframe((transform + ".rotateY"),
-            edit=1, index=(k,k), valueChange=rotY[k])
-        mc.keyframe((transform + ".rotateZ"),
-            edit=1, index=(k,k), valueChange=rotZ[k])
+    return rot_x, rot_y, rot_z
+
+def fix_rotation_flips(transforms):
+    """
+    Applies the gimbal and flip rules to the rotate curves of all the transforms at once and
+    writes each corrected curve back with one addKeys call. Transforms without three matching rotate
+    curves are skipped and returned.
+    """
+    skipped = []
+    keyed = []
+    for transform in transforms:
+        curves = [animcurves.get_anim_curve(f"{transform}.{attr}") for attr in ("rotateX", "rotateY", "rotateZ")]
+        if not all(curves):
+            skipped.append(transform)
+            continue
+        keyed.append((transform, curves))
+
+    times, values, offsets = animcurves.read_curves([curve for _, curves in keyed for curve in curves])
+    starts = offsets[:-1].reshape(-1, 3)
+    key_counts = np.diff(offsets).reshape(-1, 3)
+
+    # transforms with the same key count are stacked so each batch is unwrapped in a single pass
+    batches = {}
+    for i, (transform, _) in enumerate(keyed):
+        if len(set(key_counts[i])) != 1:
+            skipped.append(transform)
+            continue
+        batches.setdefault(int(key_counts[i][0]), []).append(i)
+
+    for count, indices in batches.items():
+        key_index = starts[indices][:, :, None] + np.arange(count)
+        rotations = unwrap_euler_rotations(*values[key_index].transpose(1, 0, 2))
+        for row, i in enumerate(indices):
+            for axis, curve in enumerate(keyed[i][1]):
+                animcurves.write_curve(curve, times[key_index[row, axis]], rotations[axis][row])
+
+    return skipped
 
 #transforms = mc.ls(sl= True)
 #bake.bake_transform_animation(transforms)
 
-def remove_flip(joints):
+def sample_matrices(plugs, frames):
+    """
+    Evaluates matrix plugs at every frame through an MDGContext, the current time is never changed
+    so nothing redraws.
+
+    Args:
+        plugs (list(str,)): matrix plugs, e.g. joint.matrix or node.worldMatrix[0]
+        frames (list(float,)): frames in the ui time unit
+
+    Returns:
+        np.ndarray: (frames, plugs, 4, 4) matrices
+    """
+    selection = OpenMaya.MSelectionList()
+    for plug in plugs:
+        selection.add(plug)
+    mplugs = [selection.getPlug(i) for i in range(len(plugs))]
+
+    time_unit = OpenMaya.MTime.uiUnit()
+    matrices = np.empty((len(frames), len(plugs), 16))
+    for f, frame in enumerate(frames):
+        context = OpenMaya.MDGContext(OpenMaya.MTime(frame, time_unit))
+        for p, mplug in enumerate(mplugs):
+            matrices[f, p] = OpenMaya.MFnMatrixData(mplug.asMObject(context)).matrix()
+    return matrices.reshape(len(frames), len(plugs), 4, 4)
+
+def internal_to_ui_units(channels):
+    """
+    sample_matrices gives translation in cm and the euler solves give degrees, write_plugs takes
+    ui units. Converts a dict of "t" and "r" arrays to the scene's linear and angular units.
+    """
+    converted = dict(channels)
+    if "t" in channels:
+        converted["t"] = channels["t"] / OpenMaya.MDistance.uiToInternal(1.0)
+    if "r" in channels:
+        converted["r"] = np.radians(channels["r"]) / OpenMaya.MAngle.uiToInternal(1.0)
+    return converted
+
+def get_rotation_setup(transforms):
+    """
+    Returns the rotateOrder, jointOrient and rotateAxis of each transform as arrays, jointOrient is
+    zero on anything that isnt a joint.
+    """
+    rotate_orders = np.array([mc.getAttr(transform + ".rotateOrder") for transform in transforms], dtype=int)
+    joint_orients = np.zeros((len(transforms), 3))
+    rotate_axes = np.zeros((len(transforms), 3))
+    for i, transform in enumerate(transforms):
+        if mc.objExists(transform + ".jointOrient"):
+            joint_orients[i] = mc.getAttr(transform + ".jointOrient")[0]
+        rotate_axes[i] = mc.getAttr(transform + ".rotateAxis")[0]
+    return rotate_orders, joint_orients, rotate_axes
+
+def remove_flip(joints, use_context=False):
+    """
+    Re-solves the rotate channels of the joints from their matrices on every frame and keys the
+    result rounded to 3 decimals.
+    use_context (bool) samples the matrices through an MDGContext instead of stepping the timeline,
+        the current frame is left untouched and the whole range is solved as one array
+    """
+    if use_context:
+        remove_flip_context(joints)
+        return
 
     start_frame = mc.playbackOptions(q=1, min=1)
     end_frame = mc.playbackOptions(q=1, max=1)+1
 
-    for i in range(int(start_frame), int(end_frame)):
+    frames = list(range(int(start_frame), int(end_frame)))
+    rotations = np.zeros((len(joints), 3, len(frames)))
+    for f, i in enumerate(frames):
         mc.currentTime(i)
 
-        for joint in joints:
+        for j, joint in enumerate(joints):
 
             # repo worldSpace
             rot = mc.xform(joint, q=1, ws=1, ro=1)
@@ -155,6 +377,418 @@ def remove_flip(joints):
 
             # unroll -180
 
-            mc.setKeyframe(joint+'.rx')
-            mc.setKeyframe(joint+'.ry')
-            mc.setKeyframe(joint+'.rz')
+            rotations[j, :, f] = abs_rot
+
+    # keys are written once the sweep is done, one curve at a time
+    plugs = [joint + attr for joint in joints for attr in ('.rx', '.ry', '.rz')]
+    animcurves.write_plugs(plugs, np.broadcast_to(frames, (len(plugs), len(frames))), rotations.reshape(len(plugs), -1),
+                           keep_outside_keys=True)
+
+def remove_flip_context(joints, precision=3):
+    """
+    Context sampled version of remove_flip, see remove_flip.
+    """
+    start_frame = mc.playbackOptions(q=1, min=1)
+    end_frame = mc.playbackOptions(q=1, max=1)
+
+    frames = list(range(int(start_frame), int(end_frame) + 1))
+    local_matrices = sample_matrices([joint + ".matrix" for joint in joints], frames)
+    rotate_orders, joint_orients, rotate_axes = get_rotation_setup(joints)
+
+    # (frames, joints, 3) -> one row of keys per rotate plug
+    rotations = ftmath.joint_rotations(local_matrices, rotate_orders, joint_orients, rotate_axes)
+    rotations = internal_to_ui_units({"r": rotations})["r"]
+    rotations = np.round(rotations, precision).transpose(1, 2, 0).reshape(len(joints) * 3, len(frames))
+
+    plugs = [joint + attr for joint in joints for attr in ('.rx', '.ry', '.rz')]
+    animcurves.write_plugs(plugs, np.broadcast_to(frames, rotations.shape), rotations,
+                           keep_outside_keys=True)
+
+def _channel_tolerance(attr, translate_tolerance, rotate_tolerance, scale_tolerance):
+    if attr.startswith(("r", "R")):
+        return rotate_tolerance
+    if attr.startswith(("s", "S")):
+        return scale_tolerance
+    return translate_tolerance
+
+def reduce_baked_curves(transforms, translate_tolerance=0.01, rotate_tolerance=0.05, scale_tolerance=0.001,
+                        attrs=('tx', 'ty', 'tz', 'rx', 'ry', 'rz', 'sx', 'sy', 'sz')):
+    """
+    Thins baked curves, by greedy splitting, down to keys that stay within tolerance of the bake, the kept keys
+    get linear tangents so the curve between them never strays past the tolerance.
+
+    Args:
+        translate_tolerance (float): largest translate difference in scene units
+        rotate_tolerance (float): largest rotate difference in degrees
+        scale_tolerance (float): largest scale difference
+
+    Returns:
+        dict: {transform: (keys before, keys after)} and prints the compression ratio per transform
+    """
+    plugs = []
+    curves = []
+    tolerances = []
+    for transform in transforms:
+        for attr in attrs:
+            curve = animcurves.get_anim_curve(f"{transform}.{attr}")
+            if curve:
+                plugs.append((transform, attr))
+                curves.append(curve)
+                tolerances.append(_channel_tolerance(attr, translate_tolerance, rotate_tolerance, scale_tolerance))
+
+    times, values, offsets = animcurves.read_curves(curves)
+    key_counts = np.diff(offsets)
+    tolerances = np.array(tolerances)
+
+    # baked curves share a key count, each count is reduced as one batch
+    report = {}
+    for count in np.unique(key_counts):
+        indices = np.nonzero(key_counts == count)[0]
+        key_index = offsets[indices][:, None] + np.arange(count)
+        keep = animcurves.reduce_keys(times[key_index], values[key_index], tolerances[indices])
+        for row, i in enumerate(indices):
+            if not keep[row].all():
+                animcurves.write_curve(curves[i], times[key_index[row]][keep[row]], values[key_index[row]][keep[row]],
+                                       in_tangent="linear", out_tangent="linear")
+            before, after = report.get(plugs[i][0], (0, 0))
+            report[plugs[i][0]] = (before + int(count), after + int(keep[row].sum()))
+
+    for transform, (before, after) in report.items():
+        print(f"{transform}: {before} -> {after} keys ({before / max(after, 1):.1f}x)")
+    return report
+
+def strip_static_channels(transforms, translate_tolerance=0.001, rotate_tolerance=0.01, scale_tolerance=0.0001,
+                          attrs=('tx', 'ty', 'tz', 'rx', 'ry', 'rz', 'sx', 'sy', 'sz'), drop=False):
+    """
+    Finds the keyed channels that stay within tolerance of one value for their whole range, the range
+    of every curve is measured in one pass over all of their keys.
+
+    Static channels are collapsed to a single key halfway between their lowest and highest value, or
+    with drop=True their curves are deleted and the channel is left set to that value.
+
+    Returns:
+        dict: {"static": [plugs], "animated": count of channels left animated, "keys_removed": count}
+    """
+    plugs = []
+    curves = []
+    tolerances = []
+    for transform in transforms:
+        for attr in attrs:
+            curve = animcurves.get_anim_curve(f"{transform}.{attr}")
+            if curve:
+                plugs.append(f"{transform}.{attr}")
+                curves.append(curve)
+                tolerances.append(_channel_tolerance(attr, translate_tolerance, rotate_tolerance, scale_tolerance))
+
+    report = {"static": [], "animated": 0, "keys_removed": 0}
+    times, values, offsets = animcurves.read_curves(curves)
+    key_counts = np.diff(offsets)
+    has_keys = key_counts > 0
+    if not has_keys.any():
+        return report
+
+    starts = offsets[:-1][has_keys]
+    highest = np.full(len(curves), np.nan)
+    lowest = np.full(len(curves), np.nan)
+    highest[has_keys] = np.maximum.reduceat(values, starts)
+    lowest[has_keys] = np.minimum.reduceat(values, starts)
+    static = has_keys & (highest - lowest <= np.array(tolerances))
+    middle = (highest + lowest) * 0.5
+
+    static_indices = np.nonzero(static)[0]
+    if drop and len(static_indices):
+        mc.delete([curves[i] for i in static_indices])
+        for i in static_indices:
+            mc.setAttr(plugs[i], middle[i])
+    else:
+        for i in static_indices:
+            if key_counts[i] > 1:
+                animcurves.write_curve(curves[i], times[offsets[i]:offsets[i] + 1], middle[i:i + 1])
+
+    report["static"] = [plugs[i] for i in static_indices]
+    report["animated"] = int(len(curves) - len(static_indices))
+    report["keys_removed"] = int(key_counts[static_indices].sum() - (0 if drop else len(static_indices)))
+    print(f"{'dropped' if drop else 'collapsed'} {len(static_indices)} static channels of {len(curves)}, "
+          f"{report['keys_removed']} keys removed")
+    return report
+
+_SHORT_NAMES = {"translateX": "tx", "translateY": "ty", "translateZ": "tz",
+                "rotateX": "rx", "rotateY": "ry", "rotateZ": "rz",
+                "scaleX": "sx", "scaleY": "sy", "scaleZ": "sz"}
+
+def bake_quaternion_continuity(transforms, start_frame, end_frame, sample_by=1,
+                               bakeAttrs=['tx', 'ty', 'tz', 'rx', 'ry', 'rz']):
+    """
+    Bakes transforms without euler flips by construction.
+
+    The local matrix of every transform is sampled for the range through an MDGContext and the
+    rotations are solved to the euler solution closest to the previous frame in each transform's
+    rotateOrder, that choice is what keeps the curves free of flips. There is no quaternion step, a
+    quaternion and its negation are the same rotation so their hemisphere cant change the matrix the
+    euler solve sees. Translate and scale come straight
+    from the matrix, so pivots are assumed to be zero and parents unscaled as they are on FT skeletons.
+    All curves are written in one pass and no filter pass is needed afterwards.
+    """
+    frames = list(np.arange(int(start_frame), int(end_frame) + 1, sample_by, dtype=float))
+    local_matrices = sample_matrices([transform + ".matrix" for transform in transforms], frames)
+    rotate_orders, joint_orients, rotate_axes = get_rotation_setup(transforms)
+
+    rotations = ftmath.joint_rotation_matrices(local_matrices, joint_orients, rotate_axes)
+    channels = internal_to_ui_units({
+        "t": local_matrices[:, :, 3, :3],
+        "r": ftmath.closest_euler(rotations, rotate_orders),
+    })
+    channels["s"] = np.linalg.norm(local_matrices[:, :, :3, :3], axis=-1)
+
+    plugs = []
+    values = []
+    for j, transform in enumerate(transforms):
+        for attr in bakeAttrs:
+            short_name = _SHORT_NAMES.get(attr, attr)
+            if short_name[0] in channels and short_name[1:] in ("x", "y", "z"):
+                plugs.append(f"{transform}.{short_name}")
+                values.append(channels[short_name[0]][:, j, "xyz".index(short_name[1])])
+
+    animcurves.disconnect_inputs(plugs)
+    values = np.array(values)
+    animcurves.write_plugs(plugs, np.broadcast_to(frames, values.shape), values)
+    return plugs
+
+def bake_offset_parent_matrices(joints, start_frame, end_frame, sample_by=1):
+    """
+    Bakes joints driven through their offsetParentMatrix, like the FT out joints, without building
+    any decompose nodes.
+
+    The matrix feeding each offsetParentMatrix is sampled for the range through an MDGContext and
+    solved to translate and rotate in numpy with each joint's rotateOrder, jointOrient and rotateAxis.
+    The offsetParentMatrix is then disconnected and zeroed and the curves written onto the joints,
+    so they hold the same local matrices as before.
+
+    Returns:
+        list(str,): the plugs that were baked
+    """
+    selection = OpenMaya.MSelectionList()
+    for joint in joints:
+        selection.add(joint)
+
+    driven_joints = []
+    source_plugs = []
+    for i, joint in enumerate(joints):
+        offset_plug = OpenMaya.MFnDependencyNode(selection.getDependNode(i)).findPlug("offsetParentMatrix", False)
+        sources = offset_plug.connectedTo(True, False)
+        if sources:
+            driven_joints.append(joint)
+            source_plugs.append(sources[0].name())
+    if not driven_joints:
+        return []
+
+    frames = list(np.arange(int(start_frame), int(end_frame) + 1, sample_by, dtype=float))
+    local_matrices = sample_matrices(source_plugs, frames)
+    rotate_orders, joint_orients, rotate_axes = get_rotation_setup(driven_joints)
+    rotations = ftmath.joint_rotation_matrices(local_matrices, joint_orients, rotate_axes)
+    channels = internal_to_ui_units({"t": local_matrices[:, :, 3, :3],
+                                     "r": ftmath.closest_euler(rotations, rotate_orders)})
+
+    modifier = OpenMaya.MDGModifier()
+    identity = OpenMaya.MFnMatrixData().create(OpenMaya.MMatrix())
+    for joint, source_plug in zip(driven_joints, source_plugs):
+        offset_plug = OpenMaya.MSelectionList().add(joint + ".offsetParentMatrix").getPlug(0)
+        modifier.disconnect(OpenMaya.MSelectionList().add(source_plug).getPlug(0), offset_plug)
+        modifier.newPlugValue(offset_plug, identity)
+    modifier.doIt()
+
+    plugs = []
+    values = []
+    for j, joint in enumerate(driven_joints):
+        for channel in "tr":
+            for a, axis in enumerate("xyz"):
+                plugs.append(f"{joint}.{channel}{axis}")
+                values.append(channels[channel][:, j, a])
+
+    animcurves.disconnect_inputs(plugs)
+    values = np.array(values)
+    animcurves.write_plugs(plugs, np.broadcast_to(frames, values.shape), values)
+    return plugs
+
+def skeleton_hierarchy(root_joint):
+    """
+    Returns the joints under root_joint, root included, ordered so parents come before their
+    children, and the index of each joint's parent (-1 for the root).
+    """
+    joints = [(mc.ls(root_joint, long=True) or [root_joint])[0]]
+    parents = [-1]
+    i = 0
+    while i < len(joints):
+        for child in mc.listRelatives(joints[i], children=True, type="joint", fullPath=True) or []:
+            joints.append(child)
+            parents.append(i)
+        i += 1
+    return joints, parents
+
+def sample_clip(root_joint, start_frame, end_frame, sample_by=1):
+    """
+    Samples the local transforms of a skeleton for a clip file, see FT_clip.
+
+    Returns:
+        tuple: joint short names without namespace, parent indices and a (frames, joints, 10)
+            array of translate, quaternion (x, y, z, w) and scale
+    """
+    joints, parents = skeleton_hierarchy(root_joint)
+    frames = list(np.arange(int(start_frame), int(end_frame) + 1, sample_by, dtype=float))
+    local_matrices = sample_matrices([joint + ".matrix" for joint in joints], frames)
+
+    quaternions = ftmath.matrices_to_quaternions(ftmath.remove_scale(local_matrices))
+    trs = np.empty(local_matrices.shape[:2] + (10,))
+    trs[..., 0:3] = local_matrices[..., 3, :3]
+    trs[..., 3:7] = ftmath.quaternion_continuity(quaternions, axis=0)
+    trs[..., 7:10] = np.linalg.norm(local_matrices[..., :3, :3], axis=-1)
+
+    names = [joint.rpartition("|")[2].rpartition(":")[2] for joint in joints]
+    return names, parents, trs
+
+def source_anim_curves(namespace):
+    """
+    Returns the time based animCurves driving nodes in a namespace, i.e. the animation on a character.
+    """
+    curves = []
+    for curve in mc.ls(type=("animCurveTL", "animCurveTA", "animCurveTU", "animCurveTT")):
+        destinations = mc.listConnections(curve, source=False, destination=True) or []
+        if any(destination.startswith(namespace + ":") for destination in destinations):
+            curves.append(curve)
+    return sorted(curves)
+
+def curve_window_fingerprints(curves, start_frame, end_frame, window=50):
+    """
+    Hashes the keys of each curve per window of frames.
+
+    A window's hash covers the keys inside it plus the nearest key on either side, since those shape
+    the segments running into the window, along with tangents and infinity settings.
+
+    Returns:
+        dict: {curve: [hex digest per window]}
+    """
+    window_starts = np.arange(int(start_frame), int(end_frame) + 1, window)
+    fingerprints = {}
+    for curve in curves:
+        times, values = animcurves.read_curve(curve)
+        tangents = [mc.keyTangent(curve, query=True, **{flag: True}) or []
+                    for flag in ("inTangentType", "outTangentType", "inAngle", "outAngle", "inWeight", "outWeight")]
+        keys = list(zip(times.tolist(), values.tolist(), *tangents))
+        infinity = mc.setInfinity(curve, query=True, preInfinite=True, postInfinite=True)
+
+        digests = []
+        for window_start in window_starts:
+            first = max(int(np.searchsorted(times, window_start, "left")) - 1, 0)
+            last = int(np.searchsorted(times, window_start + window - 1, "right")) + 1
+            digests.append(hashlib.sha1(repr((infinity, keys[first:last])).encode()).hexdigest())
+        fingerprints[curve] = digests
+    return fingerprints
+
+def _bake_cache_paths(export_path):
+    base, _ = os.path.splitext(export_path)
+    return base + ".bake.json", base + ".bake.npz"
+
+def load_bake_cache(export_path):
+    """
+    Loads the fingerprints and baked curves stored next to an export, None if there arent any.
+    """
+    json_path, npz_path = _bake_cache_paths(export_path)
+    if not (os.path.exists(json_path) and os.path.exists(npz_path)):
+        return None
+    with open(json_path, "r") as cache_file:
+        cache = json.load(cache_file)
+    with np.load(npz_path) as arrays:
+        cache["plugs"] = [str(plug) for plug in arrays["plugs"]]
+        cache["times"] = arrays["times"]
+        cache["values"] = arrays["values"]
+    return cache
+
+def save_bake_cache(export_path, fingerprints, start_frame, end_frame, window, plugs, rig_digest=None, options_digest=None):
+    """
+    Stores the source fingerprints and the baked curves of the plugs next to an export.
+    rig_digest (str) content hash of the rig file the curves were baked from, see FT_cache.file_digest
+    options_digest (str) hash of the export options the fbx was written with, see FT_cache.options_digest
+    """
+    times = np.arange(int(start_frame), int(end_frame) + 1, dtype=float)
+    values = np.full((len(plugs), len(times)), np.nan)
+    for i, plug in enumerate(plugs):
+        curve = animcurves.get_anim_curve(plug)
+        if curve:
+            curve_times, curve_values = animcurves.read_curve(curve)
+            values[i] = np.interp(times, curve_times, curve_values)
+
+    json_path, npz_path = _bake_cache_paths(export_path)
+    if not os.path.exists(os.path.dirname(json_path)):
+        os.makedirs(os.path.dirname(json_path))
+    with open(json_path, "w") as cache_file:
+        json.dump({"start": int(start_frame), "end": int(end_frame), "window": window, "rig": rig_digest,
+                   "options": options_digest, "fingerprints": fingerprints}, cache_file)
+    np.savez(npz_path, plugs=np.array(plugs), times=times, values=values)
+
+def dirty_frame_range(cache, fingerprints, start_frame, end_frame, window=50, padding=5, plugs=None, rig_digest=None,
+                      options_digest=None):
+    """
+    Compares fresh fingerprints with a bake cache. A cache baked from a different rig file or
+    exported with different options is never reused, the rig shapes every baked frame and the
+    options what is written from them.
+
+    Returns:
+        tuple(int,) or None: the padded range covering every window whose source animation changed,
+            None when nothing changed and the whole range when the cache cant be reused
+    """
+    start_frame, end_frame = int(start_frame), int(end_frame)
+    if (cache is None or cache["start"] != start_frame or cache["end"] != end_frame
+            or cache["window"] != window or cache.get("rig") != rig_digest
+            or cache.get("options") != options_digest
+            or (plugs is not None and cache["plugs"] != list(plugs))):
+        return start_frame, end_frame
+
+    window_count = len(range(start_frame, end_frame + 1, window))
+    dirty = np.zeros(window_count, dtype=bool)
+    for curve in set(fingerprints) | set(cache["fingerprints"]):
+        old = cache["fingerprints"].get(curve, [None] * window_count)
+        new = fingerprints.get(curve, [None] * window_count)
+        dirty |= np.array([a != b for a, b in zip(old, new)], dtype=bool)
+
+    if not dirty.any():
+        return None
+    dirty_windows = np.nonzero(dirty)[0]
+    first = start_frame + dirty_windows[0] * window - padding
+    last = start_frame + (dirty_windows[-1] + 1) * window - 1 + padding
+    return int(max(first, start_frame)), int(min(last, end_frame))
+
+_ROTATE_ATTRS = ("rx", "ry", "rz", "rotateX", "rotateY", "rotateZ")
+
+def splice_values(cached_values, fresh_values, inside, turn=None):
+    """
+    Puts fresh values over cached ones where inside is True.
+    turn (float) marks the values as rotations, one full turn in their unit. The euler filter can land the
+    fresh span on different whole turns than the cache, so the span is shifted by whole turns onto the cached
+    key at its start and the cached keys after it onto the fresh key at its end, like FT_shard's stitch.
+    """
+    values = np.array(cached_values, dtype=float)
+    fresh = np.asarray(fresh_values, dtype=float)[inside]
+    if turn and fresh.size:
+        first, last = np.nonzero(inside)[0][[0, -1]]
+        fresh = fresh + np.round((values[first] - fresh[0]) / turn) * turn
+        values[last + 1:] += np.round((fresh[-1] - values[last]) / turn) * turn
+    values[inside] = fresh
+    return values
+
+def splice_bake_cache(cache, plugs, bake_range):
+    """
+    Writes full length curves onto the plugs from the cached bake, with the frames in bake_range taken
+    from the fresh bake already on them.
+    """
+    times = cache["times"]
+    inside = (times >= bake_range[0]) & (times <= bake_range[1])
+    turn = 2.0 * np.pi / OpenMaya.MAngle.uiToInternal(1.0)
+    for i, plug in enumerate(plugs):
+        curve = animcurves.get_anim_curve(plug)
+        if curve is None or np.isnan(cache["values"][i]).any():
+            continue
+        curve_times, curve_values = animcurves.read_curve(curve)
+        fresh_values = np.interp(times, curve_times, curve_values)
+        is_rotate = plug.rpartition(".")[2] in _ROTATE_ATTRS
+        values = splice_values(cache["values"][i], fresh_values, inside, turn if is_rotate else None)
+        animcurves.write_curve(curve, times, values)
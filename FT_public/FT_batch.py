@@ -0,0 +1,320 @@
+'''headless batch fbx export - exports every rig reference in a list of animation scenes across a pool of mayapy workers
+
+Run it with mayapy so the workers can be found next to it:
+    mayapy -m FT_public.FT_batch "D:/shots/*/anim/*.mb" --destination D:/fbx --workers 4
+
+Each worker starts maya once and exports scenes until the queue is empty. The references of a
+scene are exported one after the other from the same open scene, generate_fbx_animation only
+tears down the nodes of the rig it exports. The scene is only reopened after a failed export, to
+drop whatever that export left behind. Every scene writes under its own folder of the destination,
+its folder relative to the folder all the scenes share, so scenes with the same name from
+different shots dont write over each others fbx files. A worker that crashes or times out is
+replaced and its scene is retried, the manifest written to the destination keeps the status
+and timings of every scene and reference.
+'''
+
+import argparse
+import glob
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+import FT_public.FT_shard as shard
+
+RESULT_PREFIX = "FT_BATCH_RESULT "
+MANIFEST_NAME = "batch_manifest.json"
+
+def collect_scenes(patterns):
+    """
+    Expands scene paths, globs and @list files (one path or glob per line) into a sorted list of scenes.
+    """
+    scenes = []
+    for pattern in patterns:
+        if pattern.startswith("@"):
+            with open(pattern[1:], "r") as list_file:
+                scenes.extend(collect_scenes([line.strip() for line in list_file if line.strip()]))
+            continue
+        matches = glob.glob(pattern, recursive=True)
+        scenes.extend(matches if matches else [pattern])
+    return sorted(set(os.path.abspath(scene) for scene in scenes))
+
+def scene_destinations(scenes, destination):
+    """
+    Gives every scene its own folder under destination, the scene folder relative to the folder all the scenes share.
+
+    Returns:
+        dict: scene path to destination folder
+    """
+    folders = [os.path.dirname(scene) for scene in scenes]
+    try:
+        root = os.path.commonpath(folders) if folders else ""
+    except ValueError:
+        # scenes on different drives share no folder
+        root = ""
+    destinations = {}
+    for scene, folder in zip(scenes, folders):
+        relative = os.path.relpath(folder, root) if root else os.path.splitdrive(folder)[1].lstrip("\\/")
+        destinations[scene] = os.path.normpath(os.path.join(destination, relative))
+    return destinations
+
+class Worker(object):
+    """
+    One mayapy process running run_worker, jobs go in on stdin as json lines and results
+    come back on stdout prefixed with RESULT_PREFIX, everything else it prints goes to its log.
+    """
+    def __init__(self, index, mayapy, log_folder):
+        self.index = index
+        self.jobs_done = 0
+        self.log_path = os.path.join(log_folder, f"worker_{index}.log")
+        self.log = open(self.log_path, "a")
+        self.process = subprocess.Popen([mayapy, "-m", "FT_public.FT_batch", "--worker"],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                        env=shard.worker_environment(), universal_newlines=True, bufsize=1)
+
+    def run(self, job, timeout=None):
+        """
+        Sends a job and waits for its result, None if the worker died or timed out first.
+        """
+        self.log.write(f"\n---- {job['scene']}\n")
+        timer = None
+        if timeout:
+            timer = threading.Timer(timeout, self.process.kill)
+            timer.start()
+        try:
+            self.process.stdin.write(json.dumps(job) + "\n")
+            self.process.stdin.flush()
+            for line in self.process.stdout:
+                if line.startswith(RESULT_PREFIX):
+                    self.jobs_done += 1
+                    return json.loads(line[len(RESULT_PREFIX):])
+                self.log.write(line)
+        except (OSError, ValueError):
+            pass
+        finally:
+            if timer:
+                timer.cancel()
+            self.log.flush()
+        return None
+
+    def close(self):
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=60)
+            except (OSError, subprocess.TimeoutExpired):
+                self.process.kill()
+        self.log.close()
+
+def export_scenes(scenes, destination, workers=None, Lo_Mid_Hi="Lo", reduce_keys=False, incremental=False,
+                  profile_phases=False, retries=1, timeout=None, max_jobs_per_worker=20, mayapy=None):
+    """
+    Exports every rig reference in every scene with a pool of mayapy workers.
+
+    Args:
+        scenes (list(str,)): maya scenes
+        destination (str): base folder for the fbx files, each scene gets a folder under it, see scene_destinations
+        Lo_Mid_Hi (str): tier folder under it, Lo like generate_fbx_animations
+        workers (int): number of mayapy processes, defaults to half the cores since each export is memory hungry
+        retries (int): how many times a scene is requeued after its worker crashed or timed out
+        timeout (float): seconds a single scene may take before its worker is killed, None waits forever
+        max_jobs_per_worker (int): workers are restarted after this many scenes to keep maya memory growth in check
+        mayapy (str): mayapy executable, defaults to the one next to the running python
+
+    Returns:
+        dict: the manifest, also written to <destination>/batch_manifest.json
+    """
+    workers = max(1, min(workers or max(1, (os.cpu_count() or 2) // 2), len(scenes) or 1))
+    mayapy = mayapy or shard.find_mayapy()
+    log_folder = os.path.join(destination, "batch_logs")
+    if not os.path.exists(log_folder):
+        os.makedirs(log_folder)
+
+    manifest_path = os.path.join(destination, MANIFEST_NAME)
+    manifest = {"started": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "destination": destination,
+                "workers": workers,
+                "scenes": {scene: {"status": "queued", "attempts": 0} for scene in scenes}}
+    manifest_lock = threading.Lock()
+
+    def save_manifest():
+        with open(manifest_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=4)
+
+    jobs = queue.Queue()
+    destinations = scene_destinations(scenes, destination)
+    for scene in scenes:
+        manifest["scenes"][scene]["destination"] = destinations[scene]
+        jobs.put({"scene": scene,
+                  "destination": destinations[scene],
+                  "Lo_Mid_Hi": Lo_Mid_Hi,
+                  "reduce_keys": reduce_keys,
+                  "incremental": incremental,
+                  "profile_phases": profile_phases})
+
+    def work(index):
+        worker = None
+        while True:
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                break
+            if worker is None or worker.jobs_done >= max_jobs_per_worker:
+                if worker:
+                    worker.close()
+                worker = Worker(index, mayapy, log_folder)
+
+            entry = manifest["scenes"][job["scene"]]
+            entry["attempts"] += 1
+            start = time.time()
+            result = worker.run(job, timeout)
+            with manifest_lock:
+                entry["seconds"] = round(time.time() - start, 2)
+                entry["log"] = worker.log_path
+                if result is None:
+                    # the worker is gone, start a fresh one for whatever is next
+                    worker.close()
+                    entry["error"] = f"worker exited with code {worker.process.returncode}"
+                    worker = None
+                    if entry["attempts"] <= retries:
+                        entry["status"] = "retrying"
+                        jobs.put(job)
+                    else:
+                        entry["status"] = "crashed"
+                    print(f"worker {index} lost {job['scene']}, {entry['status']}")
+                else:
+                    entry.update(result)
+                    print(f"worker {index} {result['status']}: {job['scene']} ({entry['seconds']}s)")
+                save_manifest()
+        if worker:
+            worker.close()
+
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    manifest["finished"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    save_manifest()
+
+    statuses = [entry["status"] for entry in manifest["scenes"].values()]
+    print(f"batch export finished: {statuses.count('ok')} ok, {len(statuses) - statuses.count('ok')} failed, "
+          f"manifest {manifest_path}")
+    return manifest
+
+def export_scene(job):
+    """
+    mayapy side of export_scenes, exports every rig reference of one scene, the ones failing the preflight
+    (unloaded ones included) are reported as failed.
+    """
+    import maya.cmds as cmds
+    import FT_public.FT_export as export
+
+    scene_start = time.time()
+    cmds.file(job["scene"], open=True, force=True)
+    # unloaded references are kept so the preflight reports them instead of them going missing
+    references = [node for node in cmds.ls(type="reference")
+                  if node not in ["sharedReferenceNode", "UNKNOWN_REF_NODE"]]
+
+    preflight = export.preflight_references(references, job["destination"], Lo_Mid_Hi=job["Lo_Mid_Hi"])
+    export.print_preflight_report(preflight)
+    if preflight["errors"]:
+        return {"status": "failed", "error": "; ".join(preflight["errors"]), "references": [],
+                "export_seconds": round(time.time() - scene_start, 2)}
+
+    results = []
+    for reference_node in list(references):
+        if preflight["references"][reference_node]["errors"]:
+            results.append({"reference": reference_node, "status": "failed", "seconds": 0.0,
+                            "error": "preflight: " + "; ".join(preflight["references"][reference_node]["errors"])})
+            references.remove(reference_node)
+
+    scene_clean = True
+    for reference_node in references:
+        if not scene_clean:
+            # a failed export can leave its rig half torn down
+            cmds.file(job["scene"], open=True, force=True)
+            scene_clean = True
+        start = time.time()
+        result = {"reference": reference_node}
+        try:
+            result["namespace"] = export.get_namespace_from_reference(reference_node)
+            result["fbx"] = export.generate_fbx_animation(reference_node, job["destination"],
+                                                          Lo_Mid_Hi=job["Lo_Mid_Hi"],
+                                                          reduce_keys=job["reduce_keys"],
+                                                          incremental=job["incremental"],
+                                                          profile_phases=job["profile_phases"])
+            result["status"] = "ok"
+        except Exception as error:
+            result["status"] = "failed"
+            result["error"] = f"{type(error).__name__}: {error}"
+            scene_clean = False
+        result["seconds"] = round(time.time() - start, 2)
+        results.append(result)
+
+    failed = [result for result in results if result["status"] != "ok"]
+    return {"status": "failed" if failed or not results else "ok",
+            "error": None if results else "no references",
+            "references": results,
+            "export_seconds": round(time.time() - scene_start, 2)}
+
+def run_worker():
+    """
+    Starts maya and exports the scenes sent on stdin until it closes.
+    """
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+    import maya.cmds as cmds
+    if not cmds.pluginInfo("fbxmaya", query=True, loaded=True):
+        cmds.loadPlugin("fbxmaya")
+
+    for line in iter(sys.stdin.readline, ""):
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        try:
+            result = export_scene(job)
+        except Exception as error:
+            result = {"status": "failed", "error": f"{type(error).__name__}: {error}", "references": []}
+        sys.stdout.write(RESULT_PREFIX + json.dumps(result) + "\n")
+        sys.stdout.flush()
+
+    maya.standalone.uninitialize()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="FT_batch", description="Export fbx animations from maya scenes with a pool of mayapy workers.")
+    parser.add_argument("scenes", nargs="*", help="scene paths, globs or @file with one per line")
+    parser.add_argument("--destination", help="base folder for the fbx files")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--tier", default="Lo", choices=["Lo", "Mid", "Hi"], help="tier folder the fbx files go in")
+    parser.add_argument("--reduce-keys", action="store_true")
+    parser.add_argument("--incremental", action="store_true")
+    parser.add_argument("--profile", action="store_true")
+    parser.add_argument("--retries", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=None, help="seconds per scene")
+    parser.add_argument("--max-jobs-per-worker", type=int, default=20)
+    parser.add_argument("--mayapy", default=None)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        run_worker()
+        return 0
+    if not args.scenes or not args.destination:
+        parser.error("scenes and --destination are required")
+
+    scenes = collect_scenes(args.scenes)
+    if not scenes:
+        parser.error("no scenes matched")
+    manifest = export_scenes(scenes, os.path.abspath(args.destination), workers=args.workers, Lo_Mid_Hi=args.tier,
+                             reduce_keys=args.reduce_keys, incremental=args.incremental,
+                             profile_phases=args.profile, retries=args.retries, timeout=args.timeout,
+                             max_jobs_per_worker=args.max_jobs_per_worker, mayapy=args.mayapy)
+    return 0 if all(entry["status"] == "ok" for entry in manifest["scenes"].values()) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
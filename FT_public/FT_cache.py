@@ -0,0 +1,109 @@
+'''export cache - remembers what every fbx was exported from so unchanged shots can be skipped
+
+Each export folder holds an export_cache.json mapping the fbx file names in it to a key, the key is
+a hash of the scene file, the rig file, the frame range, the tier and the export options.
+No maya imports, the scene side values are passed in.
+'''
+
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = "export_cache.json"
+
+# (path, mtime, size) -> digest, saves rehashing a rig shared by several shots in one session
+_digests = {}
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """
+    sha1 of a file's contents, read in chunks. None if the file doesnt exist.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_mtime, stat.st_size)
+    if memo_key not in _digests:
+        digest = hashlib.sha1()
+        with open(path, "rb") as file_handle:
+            for chunk in iter(lambda: file_handle.read(chunk_size), b""):
+                digest.update(chunk)
+        _digests[memo_key] = digest.hexdigest()
+    return _digests[memo_key]
+
+def export_key(scene_path, rig_path, start_frame, end_frame, tier, options=None):
+    """
+    Content key for one fbx export.
+
+    Args:
+        scene_path (str): the saved animation scene
+        rig_path (str): the referenced rig file
+        options (dict): any export options that change the fbx, they must be json serializable
+
+    Returns:
+        str: hex digest, None if either file is missing so the export never counts as cached
+    """
+    scene_digest = file_digest(scene_path)
+    rig_digest = file_digest(rig_path)
+    if scene_digest is None or rig_digest is None:
+        return None
+    key = {"scene": scene_digest,
+           "rig": rig_digest,
+           "range": [float(start_frame), float(end_frame)],
+           "tier": tier,
+           "options": options or {}}
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+def options_digest(options):
+    """
+    Hash of a json serializable dict of export options, the same options always give the same digest.
+    """
+    return hashlib.sha1(json.dumps(options or {}, sort_keys=True).encode()).hexdigest()
+
+def load_manifest(folder):
+    manifest_path = os.path.join(folder, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        with open(manifest_path, "r") as manifest_file:
+            return json.load(manifest_file)
+    except ValueError:
+        # a half written manifest only costs a re-export
+        return {}
+
+def save_manifest(folder, manifest):
+    if not os.path.exists(folder):
+        os.makedirs(folder)
+    with open(os.path.join(folder, MANIFEST_NAME), "w") as manifest_file:
+        json.dump(manifest, manifest_file, indent=4, sort_keys=True)
+
+def is_cached(fbx_path, key):
+    """
+    True when the fbx exists and the manifest beside it recorded the same key for it.
+    """
+    if key is None or not os.path.exists(fbx_path):
+        return False
+    entry = load_manifest(os.path.dirname(fbx_path)).get(os.path.basename(fbx_path))
+    return bool(entry) and entry.get("key") == key
+
+def record(fbx_path, key, **info):
+    """
+    Stores the key of a freshly exported fbx in the manifest beside it, extra info is kept with it.
+    """
+    if key is None:
+        return
+    folder = os.path.dirname(fbx_path)
+    manifest = load_manifest(folder)
+    entry = {"key": key}
+    entry.update(info)
+    manifest[os.path.basename(fbx_path)] = entry
+    save_manifest(folder, manifest)
+
+def print_report(hits, misses):
+    """
+    Prints which fbx files were reused and which were exported.
+    """
+    print(f"export cache: {len(hits)} hits, {len(misses)} misses")
+    for fbx_path in hits:
+        print("    hit ", fbx_path)
+    for fbx_path in misses:
+        print("    miss", fbx_path)
@@ -0,0 +1,82 @@
+'''compact animation clips - baked skeleton animation as a raw float32 array and a small json header
+
+A clip is two files next to each other:
+    <name>.clip.npy   (frames, joints, 10) float32, tx ty tz qx qy qz qw sx sy sz in local space,
+                      translation in maya's internal unit, cm, whatever the scene's linear unit is
+    <name>.clip.json  joint names, parent indices, frame rate, frame range and the channel layout
+
+The .npy can be memory mapped so a tool only pages in the frames it reads. No maya imports, the
+reading side runs anywhere numpy does.
+'''
+
+import json
+import os
+
+import numpy as np
+
+CHANNELS = ["tx", "ty", "tz", "qx", "qy", "qz", "qw", "sx", "sy", "sz"]
+VERSION = 1
+
+def clip_paths(path):
+    """
+    Returns the .clip.npy and .clip.json paths for a clip, path can be either of them,
+    the fbx it was exported with or the clip name without extension.
+    """
+    base = path
+    for extension in (".clip.npy", ".clip.json", ".fbx"):
+        if base.lower().endswith(extension):
+            base = base[:-len(extension)]
+            break
+    return base + ".clip.npy", base + ".clip.json"
+
+def write_clip(path, joint_names, parents, trs, fps, start_frame, end_frame, sample_by=1, **info):
+    """
+    Writes a clip.
+
+    Args:
+        path (str): see clip_paths
+        joint_names (list(str,)): one per joint, parents come before their children
+        parents (list(int,)): index of each joints parent, -1 for the root
+        trs (np.ndarray): (frames, joints, 10) values in CHANNELS order
+        fps (float): frames per second of the scene
+        info: anything else to keep in the header, e.g. the source scene
+
+    Returns:
+        tuple(str,): the written .npy and .json paths
+    """
+    trs = np.ascontiguousarray(trs, dtype=np.float32)
+    if trs.ndim != 3 or trs.shape[1] != len(joint_names) or trs.shape[2] != len(CHANNELS):
+        raise ValueError(f"Expected a (frames, {len(joint_names)}, {len(CHANNELS)}) array, got {trs.shape}.")
+
+    npy_path, json_path = clip_paths(path)
+    if not os.path.exists(os.path.dirname(npy_path)):
+        os.makedirs(os.path.dirname(npy_path))
+    np.save(npy_path, trs)
+
+    header = {"version": VERSION,
+              "channels": CHANNELS,
+              "joints": list(joint_names),
+              "parents": [int(parent) for parent in parents],
+              "fps": float(fps),
+              "start": float(start_frame),
+              "end": float(end_frame),
+              "sample_by": float(sample_by),
+              "frame_count": int(trs.shape[0])}
+    header.update(info)
+    with open(json_path, "w") as header_file:
+        json.dump(header, header_file, indent=4)
+    return npy_path, json_path
+
+def read_clip(path, mmap=True):
+    """
+    Reads a clip.
+
+    Returns:
+        tuple(dict, np.ndarray): the header and the (frames, joints, 10) array, memory mapped read only
+            unless mmap is False
+    """
+    npy_path, json_path = clip_paths(path)
+    with open(json_path, "r") as header_file:
+        header = json.load(header_file)
+    trs = np.load(npy_path, mmap_mode="r" if mmap else None)
+    return header, trs
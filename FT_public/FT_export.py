@@ -1,7 +1,14 @@
 import maya.cmds as cmds
+from maya.api import OpenMaya
 import FT_public.FT_bake as bake
+import FT_public.FT_cache as cache
+import FT_public.FT_clip as clip
+import maya.mel as mel
+import FT_public.FT_profile as profile
 import FT_public.ml_worldBake as ml_worldBake
+import json
 import os
+import time
 
 #import importlib 
 #importlib.reload(ml_worldBake)
@@ -37,33 +44,65 @@ def create_reference(file_path, namespace=None):
     return reference_node
 
 
-def decompose_out_joints(out_joints):
+def print_progress(message, done, total):
+    print (f"{message}:{done}/{total}")
+
+def decompose_out_joints(out_joints, progress_callback=print_progress, progress_interval=1.0):
     """
     Figure-Tek Rigs make use of matricies to speed up the many joints that drive the surface of the mesh. These matricies need to be decomposed to get the info onto the standard tx,ty,tz,rx,ry,rz channels
+
+    Every decomposeMatrix node, connection and offsetParentMatrix reset is queued on one MDGModifier and applied with a single doIt.
+    progress_callback(message, done, total) is called at most once per progress_interval seconds, and once at the end
+
+    Returns:
+        list(str,): the decomposeMatrix nodes
     """
-    i = 0
+    selection = OpenMaya.MSelectionList()
     for joint in out_joints:
-            
-        print (f"decomposing matricies:{i}/{len(out_joints)}")
-        multMatrix_node_catch = cmds.listConnections(joint + ".offsetParentMatrix")
-        if multMatrix_node_catch:
-            multMatrix_node = multMatrix_node_catch[0]
-            decomposeMatrix_node =  cmds.createNode('decomposeMatrix', n = multMatrix_node.replace("mM","dM"))
-            cmds.connectAttr(f'{multMatrix_node}.matrixSum',f'{decomposeMatrix_node}.inputMatrix', f = True)
-        
-            cmds.connectAttr(f'{decomposeMatrix_node}.outputTranslateX',f'{joint}.translateX', f = True)
-            cmds.connectAttr(f'{decomposeMatrix_node}.outputTranslateY',f'{joint}.translateY', f = True)
-            cmds.connectAttr(f'{decomposeMatrix_node}.outputTranslateZ',f'{joint}.translateZ', f = True)
-            cmds.connectAttr(f'{decomposeMatrix_node}.outputRotateX',f'{joint}.rotateX', f = True)
-            cmds.connectAttr(f'{decomposeMatrix_node}.outputRotateY',f'{joint}.rotateY', f = True)
-            cmds.connectAttr(f'{decomposeMatrix_node}.outputRotateZ',f'{joint}.rotateZ', f = True)
-            cmds.disconnectAttr(f'{multMatrix_node}.matrixSum',f'{joint}.offsetParentMatrix')
-            #zero out matrix
-            zeroOrigin = [1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0, 0.0, 1.0]
-            #joint = 'FTF_Variant0001_REF:out_C0_47390_jnt'
-            cmds.setAttr(f'{joint}.offsetParentMatrix', *zeroOrigin, type='matrix') 
-            
-        i+=1
+        selection.add(joint)
+
+    modifier = OpenMaya.MDGModifier()
+    identity = OpenMaya.MFnMatrixData().create(OpenMaya.MMatrix())
+    channels = [("outputTranslateX", "translateX"), ("outputTranslateY", "translateY"), ("outputTranslateZ", "translateZ"),
+                ("outputRotateX", "rotateX"), ("outputRotateY", "rotateY"), ("outputRotateZ", "rotateZ")]
+    decompose_nodes = []
+    last_report = time.time()
+    for i in range(selection.length()):
+        if progress_callback and time.time() - last_report >= progress_interval:
+            progress_callback("decomposing matricies", i, len(out_joints))
+            last_report = time.time()
+
+        joint_fn = OpenMaya.MFnDependencyNode(selection.getDependNode(i))
+        offset_plug = joint_fn.findPlug("offsetParentMatrix", False)
+        sources = offset_plug.connectedTo(True, False)
+        if not sources:
+            continue
+        matrix_sum_plug = sources[0]
+        multMatrix_node = OpenMaya.MFnDependencyNode(matrix_sum_plug.node()).name()
+
+        decomposeMatrix_obj = modifier.createNode("decomposeMatrix")
+        decomposeMatrix_node = multMatrix_node.replace("mM","dM")
+        modifier.renameNode(decomposeMatrix_obj, decomposeMatrix_node)
+        decompose_fn = OpenMaya.MFnDependencyNode(decomposeMatrix_obj)
+        modifier.connect(matrix_sum_plug, decompose_fn.findPlug("inputMatrix", False))
+
+        for output, channel in channels:
+            channel_plug = joint_fn.findPlug(channel, False)
+            # same as connectAttr -f, break whatever was driving the channel
+            for source in channel_plug.connectedTo(True, False):
+                modifier.disconnect(source, channel_plug)
+            modifier.connect(decompose_fn.findPlug(output, False), channel_plug)
+
+        modifier.disconnect(matrix_sum_plug, offset_plug)
+        #zero out matrix
+        modifier.newPlugValue(offset_plug, identity)
+        decompose_nodes.append(decomposeMatrix_obj)
+
+    modifier.doIt()
+    if progress_callback:
+        progress_callback("decomposing matricies", len(out_joints), len(out_joints))
+    # names are only final once the modifier has run, maya may have made them unique
+    return [OpenMaya.MFnDependencyNode(node).name() for node in decompose_nodes]
 
 def disconnect_incoming_shear(transform_node):
     shear_attrs = ['shearXY', 'shearXZ', 'shearYZ', "shear"]
@@ -79,6 +118,193 @@ def disconnect_incoming_shear(transform_node):
                 for inc in incoming_connections:
                     cmds.disconnectAttr(inc, full_attr)
 
+TIERS = ["Lo", "Mid", "Hi"]
+
+MATRIX_NODE_TYPES = ["mgear_matrixConstraint", "multMatrix", "decomposeMatrix"]
+
+def gather_rig_matrix_nodes(namespace, joints):
+    """
+    Walks upstream from the skeleton through the dependency nodes of one namespace and returns the
+    matrix nodes driving it, with the matrix and *_rigUParCon nodes of the namespace the walk cant
+    reach. The walk stops at dag nodes and the rest is looked up in the namespace only, so the cost
+    follows the size of the character rather than the scene, and other characters matrix nodes are
+    never picked up.
+    Run it before the joints are baked, their keys cut the walk off from the nodes that drove them.
+    """
+    prefix = namespace + ":"
+    visited = set(joints)
+    frontier = list(joints)
+    matrix_nodes = set()
+    while frontier:
+        sources = set(cmds.listConnections(frontier, source=True, destination=False, skipConversionNodes=True) or [])
+        sources = [node for node in sources if node not in visited and node.startswith(prefix)]
+        if not sources:
+            break
+        visited.update(sources)
+        matrix_nodes.update(cmds.ls(sources, type=MATRIX_NODE_TYPES) or [])
+        matrix_nodes.update(node for node in sources if node.endswith("_rigUParCon"))
+        dag_nodes = set(cmds.ls(sources, dag=True) or [])
+        frontier = [node for node in sources if node not in dag_nodes]
+    matrix_nodes.update(cmds.ls(f"{namespace}:*", type=MATRIX_NODE_TYPES) or [])
+    matrix_nodes.update(cmds.ls(f"{namespace}:*_rigUParCon") or [])
+    return sorted(matrix_nodes)
+
+def delete_nodes(nodes):
+    """
+    Deletes nodes with one delete command, falling back to one at a time if the batch fails.
+
+    Returns:
+        dict: node counts deleted per node type
+    """
+    nodes = cmds.ls(nodes) or []
+    if not nodes:
+        return {}
+    node_types = {}
+    for node in nodes:
+        node_type = cmds.nodeType(node)
+        node_types[node_type] = node_types.get(node_type, 0) + 1
+    try:
+        cmds.delete(nodes)
+    except RuntimeError:
+        for node in nodes:
+            if cmds.objExists(node):
+                try:
+                    cmds.delete(node)
+                except RuntimeError:
+                    pass
+    return node_types
+
+def teardown_matrix_nodes(namespace, joints, matrix_nodes=None):
+    """
+    Deletes the matrix nodes driving a characters skeleton, see gather_rig_matrix_nodes.
+    matrix_nodes (list) the nodes gathered before the bake, gathered now when None
+
+    Returns:
+        dict: teardown report with the namespace, node counts per type and seconds taken
+    """
+    start = time.time()
+    if matrix_nodes is None:
+        matrix_nodes = gather_rig_matrix_nodes(namespace, joints)
+    removed = delete_nodes(matrix_nodes)
+    report = {"namespace": namespace, "matrix_nodes": removed, "seconds": time.time() - start}
+    print(f"{namespace}: removed {sum(removed.values())} matrix nodes {removed}")
+    return report
+
+def teardown_rig_groups(namespace, report=None):
+    """
+    Deletes the rig_* nodes of a character, the rig and its sets, once the model and skeleton are out of it.
+    Adds to the report from teardown_matrix_nodes if one is passed.
+    """
+    start = time.time()
+    removed = delete_nodes(cmds.ls(f"{namespace}:rig_*")) #the rig and sets should be returned
+    report = report if report is not None else {"namespace": namespace, "seconds": 0.0}
+    report["rig_nodes"] = removed
+    report["seconds"] += time.time() - start
+    print(f"{namespace}: removed {sum(removed.values())} rig nodes {removed}")
+    return report
+
+def _writable_folder(folder):
+    # the folder may not exist yet, what matters is whether it can be made
+    while folder and not os.path.exists(folder):
+        parent = os.path.dirname(folder)
+        if parent == folder:
+            break
+        folder = parent
+    return bool(folder) and os.path.isdir(folder) and os.access(folder, os.W_OK)
+
+def preflight_references(reference_nodes, base_fbx_destination_folder=None, model_container_wo_namespace="export_grp",
+                         Lo_Mid_Hi="Hi", takes=None):
+    """
+    Checks everything generate_fbx_animation needs for each reference without importing or baking anything.
+
+    Scene wide it checks the fbxmaya plugin, the frame range and takes and that the destination can be written.
+    Per reference it checks the load state, the rig file on disk, the model container and global joint
+    and the joints and groups of every tier, see check_tier_manifest. Problems of the Lo_Mid_Hi tier are
+    errors, the other tiers only warn. Nothing in the scene is changed, not even the plugin being loaded.
+
+    Returns:
+        dict: {"errors": [...], "warnings": [...], "frame_range": (start, end),
+               "references": {reference_node: {"errors", "warnings", "namespace", "rig_file_path", "joint_counts"}}}
+    """
+    report = {"errors": [], "warnings": [], "references": {}}
+
+    if not cmds.pluginInfo("fbxmaya", query=True, loaded=True):
+        report["errors"].append("fbxmaya plugin is not loaded")
+
+    start_frame = cmds.playbackOptions(q=True, min=True)
+    end_frame = cmds.playbackOptions(q=True, max=True)
+    report["frame_range"] = (start_frame, end_frame)
+    if end_frame < start_frame:
+        report["errors"].append(f"playback range {start_frame}-{end_frame} is empty")
+    if start_frame != int(start_frame) or end_frame != int(end_frame):
+        report["warnings"].append(f"playback range {start_frame}-{end_frame} is not on whole frames")
+    try:
+        for take_name, take_start, take_end in normalize_takes(takes):
+            if take_start < start_frame or take_end > end_frame:
+                report["warnings"].append(f"take {take_name} {take_start}-{take_end} reaches outside the playback range")
+    except (ValueError, KeyError, TypeError) as error:
+        report["errors"].append(f"bad takes: {error}")
+
+    scene_path = cmds.file(q=1, loc=1)
+    if base_fbx_destination_folder is None:
+        base_fbx_destination_folder = os.path.dirname(scene_path)
+    if scene_path == "unknown":
+        report["warnings"].append("the scene has never been saved, fbx files will be named after 'unknown'")
+    if not _writable_folder(base_fbx_destination_folder):
+        report["errors"].append(f"can not write to {base_fbx_destination_folder}")
+
+    for reference_node in reference_nodes:
+        reference_report = {"errors": [], "warnings": [], "namespace": None, "rig_file_path": None, "joint_counts": {}}
+        report["references"][reference_node] = reference_report
+        if not cmds.objExists(reference_node) or cmds.nodeType(reference_node) != "reference":
+            reference_report["errors"].append("not a reference node")
+            continue
+        if not cmds.referenceQuery(reference_node, isLoaded=True):
+            reference_report["errors"].append("reference is not loaded")
+            continue
+        rig_file_path = cmds.referenceQuery(reference_node, filename=True, withoutCopyNumber=True)
+        reference_report["rig_file_path"] = rig_file_path
+        if not os.path.exists(rig_file_path):
+            reference_report["warnings"].append(f"rig file {rig_file_path} is not on disk")
+
+        namespace = get_namespace_from_reference(reference_node)
+        reference_report["namespace"] = namespace
+        model_container = f"{namespace}:{model_container_wo_namespace}"
+        global_joint = f"{namespace}:global_C0_0_jnt"
+        if not cmds.objExists(model_container):
+            reference_report["errors"].append(f"missing {model_container}")
+        if not cmds.ls(global_joint, type="joint"):
+            reference_report["errors"].append(f"missing {global_joint}")
+            continue
+        if not cmds.listRelatives(global_joint, parent=True):
+            reference_report["errors"].append(f"{global_joint} has no parent to unparent the skeleton from")
+
+        tier_manifest = build_tier_manifest(namespace, global_joint)
+        joint_paths = (cmds.listRelatives(global_joint, allDescendents=True, type="joint", fullPath=True) or []) + cmds.ls(global_joint, long=True)
+        reference_report["joint_counts"] = {tier: len(tier_manifest["tiers"][tier]["joints"]) for tier in TIERS}
+        for tier, problems in check_tier_manifest(tier_manifest, joint_paths).items():
+            for problem in problems:
+                reference_report["errors" if tier == Lo_Mid_Hi else "warnings"].append(f"{tier} tier: {problem}")
+    return report
+
+def print_preflight_report(report):
+    """
+    Prints a preflight report one line per problem.
+    """
+    failed = [reference_node for reference_node, reference_report in report["references"].items() if reference_report["errors"]]
+    print(f"preflight: {len(report['references']) - len(failed)}/{len(report['references'])} references ready, "
+          f"frame range {report['frame_range'][0]}-{report['frame_range'][1]}")
+    for error in report["errors"]:
+        print("    error:", error)
+    for warning in report["warnings"]:
+        print("    warning:", warning)
+    for reference_node, reference_report in report["references"].items():
+        print(f"    {reference_node} {reference_report['namespace']} joints {reference_report['joint_counts']}")
+        for error in reference_report["errors"]:
+            print("        error:", error)
+        for warning in reference_report["warnings"]:
+            print("        warning:", warning)
+
 # Function to get the file path of a reference node
 def get_reference_file_path(reference_node):
     if not cmds.referenceQuery(reference_node, isLoaded=True):
@@ -108,12 +334,39 @@ def is_figure_tek_project(path):
 def generate_fbx_animations(base_fbx_destination_folder = None, 
                             model_container_wo_namespace="export_grp", 
                             bypass_selection_export_all=False,
-                            Lo_Mid_Hi = "Hi"):
+                            Lo_Mid_Hi = "Lo",
+                            reduce_keys=False,
+                            incremental=False,
+                            profile_phases=False,
+                            shared_sweep=False,
+                            sample_out_matrices=False,
+                            use_cache=False,
+                            force=False,
+                            write_clip=False,
+                            takes=None,
+                            preflight=True,
+                            strip_static=None):
     """
     runs in a scene with any number of rigs in it. cmds.select any <> reference nodes you want exported,
     if nothing or nothing in the selection in the  you want to export or itll generate one for every available rig
     if destination_folder == None:
         a folder will be created wherever the original rig files are
+    Lo_Mid_Hi (str) the tier folder the fbx files are written to, Lo unless asked for
+    reduce_keys (bool) thins the baked curves before export, see generate_fbx_animation
+    incremental (bool) only rebakes frames whose source animation changed since the last export, see generate_fbx_animation
+    profile_phases (bool) writes a timing report next to each fbx, see generate_fbx_animation
+    shared_sweep (bool) prepares every reference first and bakes all of their joints in one pass over the
+    timeline instead of one pass per character, then exports each fbx. incremental is per character
+    so it is ignored in this mode
+    sample_out_matrices (bool) bakes the out joints straight from their matrices, see generate_fbx_animation
+    use_cache (bool) skips references whose fbx was exported from the same scene file, rig file, frame range,
+    tier and options, see FT_cache. scenes with unsaved changes always export. force (bool) exports anyway
+    and refreshes the cache
+    write_clip (bool) also writes a compact clip file next to each fbx, see generate_fbx_animation
+    takes (list) named frame ranges exported as one fbx each for every reference, see generate_fbx_animation
+    preflight (bool) checks every reference before anything is imported and leaves out the ones that would fail,
+    see preflight_references
+    strip_static (str) "collapse" or "drop" the channels that never move, see generate_fbx_animation
     
     """
     all_references = []
@@ -128,6 +381,7 @@ def generate_fbx_animations(base_fbx_destination_folder = None,
     if bypass_selection_export_all:
         all_references = cmds.ls(type='reference')
     
+    export_references = []
     for reference_node in all_references:
         print (reference_node)
         # Skipping special reference nodes
@@ -135,10 +389,9 @@ def generate_fbx_animations(base_fbx_destination_folder = None,
             continue
         # Retrieve file path and namespace of the reference
         rig_file_path = get_reference_file_path(reference_node)
-        rig_folder_path = os.path.dirname(rig_file_path)
-
-        namespace = cmds.referenceQuery(reference_node, namespace=True, shortName=True)
         if rig_file_path:
+            rig_folder_path = os.path.dirname(rig_file_path)
+            namespace = cmds.referenceQuery(reference_node, namespace=True, shortName=True)
             print(f"Reference Node: {reference_node}, File Path: {rig_file_path}, Namespace: {namespace}")
             #determine if an export rig exists
 
@@ -159,29 +412,124 @@ def generate_fbx_animations(base_fbx_destination_folder = None,
             if base_fbx_destination_folder == None:
                 base_fbx_destination_folder = os.path.dirname(cmds.file(q=1, loc=1))
 
-
-            generate_fbx_animation(reference_node, base_fbx_destination_folder, model_container_wo_namespace=model_container_wo_namespace, Lo_Mid_Hi = "Lo")
-     
-
+            export_references.append(reference_node)
             #else:
             #    print(f"The file {file_path} is NOT inside a Figure-Tek project folder.")    
 
-def generate_fbx_animation(reference_node, 
-                            base_fbx_destination_folder, 
-                            model_container_wo_namespace="export_grp", 
-                            delete_model_containers = True,
-                             Lo_Mid_Hi = "Hi"):
+    if preflight and export_references:
+        report = preflight_references(export_references, base_fbx_destination_folder,
+                                      model_container_wo_namespace=model_container_wo_namespace,
+                                      Lo_Mid_Hi=Lo_Mid_Hi, takes=takes)
+        print_preflight_report(report)
+        if report["errors"]:
+            # scene wide problems, nothing would export
+            cmds.warning("Preflight failed, nothing was exported.")
+            return []
+        for reference_node, reference_report in report["references"].items():
+            if reference_report["errors"]:
+                cmds.warning(f"Preflight failed for {reference_node}, skipping it.")
+                export_references.remove(reference_node)
+
+    # keys are worked out before anything is imported, exporting changes the scene
+    cache_keys = {}
+    cache_hits = []
+    if use_cache:
+        scene_path = cmds.file(q=1, loc=1)
+        scene_modified = cmds.file(q=True, modified=True)
+        start_frame = cmds.playbackOptions(q=True, min=True)
+        end_frame = cmds.playbackOptions(q=True, max=True)
+        options = {"model_container": model_container_wo_namespace,
+                   "reduce_keys": reduce_keys,
+                   "sample_out_matrices": sample_out_matrices,
+                   "write_clip": write_clip,
+                   "strip_static": strip_static}
+        for reference_node in list(export_references):
+            namespace = get_namespace_from_reference(reference_node)
+            rig_file_path = cmds.referenceQuery(reference_node, filename=True, withoutCopyNumber=True)
+            if takes:
+                # each take is keyed on its own range
+                take_keys = [(get_fbx_animation_path(base_fbx_destination_folder, namespace, Lo_Mid_Hi, take_name),
+                              None if scene_modified else cache.export_key(scene_path, rig_file_path, take_start, take_end, Lo_Mid_Hi, options))
+                             for take_name, take_start, take_end in normalize_takes(takes)]
+            else:
+                take_keys = [(get_fbx_animation_path(base_fbx_destination_folder, namespace, Lo_Mid_Hi),
+                              None if scene_modified else cache.export_key(scene_path, rig_file_path, start_frame, end_frame, Lo_Mid_Hi, options))]
+            if not force and all(cache.is_cached(fbx_export_path, key) for fbx_export_path, key in take_keys):
+                cache_hits.extend(fbx_export_path for fbx_export_path, _ in take_keys)
+                export_references.remove(reference_node)
+            else:
+                for fbx_export_path, key in take_keys:
+                    cache_keys[fbx_export_path] = (key, rig_file_path)
+
+    if shared_sweep:
+        fbx_export_paths = generate_fbx_animations_shared(export_references, base_fbx_destination_folder,
+                                                          model_container_wo_namespace=model_container_wo_namespace,
+                                                          Lo_Mid_Hi=Lo_Mid_Hi, reduce_keys=reduce_keys,
+                                                          profile_phases=profile_phases,
+                                                          sample_out_matrices=sample_out_matrices,
+                                                          write_clip=write_clip, takes=takes,
+                                                          strip_static=strip_static)
+    else:
+        fbx_export_paths = []
+        for reference_node in export_references:
+            fbx_export_paths.append(
+                generate_fbx_animation(reference_node, base_fbx_destination_folder, model_container_wo_namespace=model_container_wo_namespace, Lo_Mid_Hi = Lo_Mid_Hi,
+                                       reduce_keys=reduce_keys, incremental=incremental,
+                                       profile_phases=profile_phases, sample_out_matrices=sample_out_matrices,
+                                       write_clip=write_clip, takes=takes, strip_static=strip_static))
+    fbx_export_paths = _flatten_paths(fbx_export_paths)
+
+    if use_cache:
+        for fbx_export_path in fbx_export_paths:
+            key, rig_file_path = cache_keys.get(fbx_export_path, (None, None))
+            cache.record(fbx_export_path, key, scene=scene_path, rig=rig_file_path)
+        cache.print_report(cache_hits, fbx_export_paths)
+    return cache_hits + fbx_export_paths
+
+def get_fbx_animation_path(base_fbx_destination_folder, namespace, Lo_Mid_Hi="Hi", take_name=None):
     '''
-    imports the reference, bakes all joints, deletes everything but the baked skeleton, creates a folder and exports an fbx file.
+    where generate_fbx_animation writes the fbx of a rig for the current scene, or for one take of it
     '''
-    
-    #current_project_path = cmds.workspace(q=True, rd=True) # -rootDirectory
-    #print(current_project_path)
-    
-    #export_rig = current_project_path + "_rig/PG4_export.mb" #should do a list to determine what file needs to be pulled 
+    scene_name, _ = os.path.basename(cmds.file(q=1, loc=1)).split(".")
+    if take_name:
+        return base_fbx_destination_folder + f"/{namespace}_fbx_animations/{Lo_Mid_Hi}/{namespace}_{scene_name}_{take_name}.fbx"
+    return base_fbx_destination_folder + f"/{namespace}_fbx_animations/{Lo_Mid_Hi}/{namespace}_{scene_name}.fbx"
 
+def normalize_takes(takes):
+    '''
+    takes can be given as (name, start, end) tuples or dicts with name, start and end keys.
+
+    Returns:
+        list(tuple): (name, start, end) per take
+    '''
+    normalized = []
+    for take in takes or []:
+        if isinstance(take, dict):
+            take = (take["name"], take["start"], take["end"])
+        name, start_frame, end_frame = take
+        if end_frame < start_frame:
+            raise ValueError(f"Take {name} ends before it starts.")
+        normalized.append((str(name), float(start_frame), float(end_frame)))
+    return normalized
+
+def _flatten_paths(fbx_export_paths):
+    flat = []
+    for fbx_export_path in fbx_export_paths:
+        flat.extend(fbx_export_path if isinstance(fbx_export_path, list) else [fbx_export_path])
+    return flat
+
+def prepare_animation_reference(reference_node, base_fbx_destination_folder, Lo_Mid_Hi="Hi", sample_out_matrices=False):
+    '''
+    imports a rig reference and readies its joints for baking, the first phase of generate_fbx_animation.
+    sample_out_matrices (bool) leaves the out joint matrices alone for bake_prepared_references to sample
+
+    Returns:
+        dict: namespace, joints, out_joints, base_joints, global_joint, fbx_export_path and the matrix_nodes
+            the bake leaves behind, see gather_rig_matrix_nodes
+    '''
     namespace = get_namespace_from_reference(reference_node)
-    cmds.file(importReference=True, referenceNode=reference_node)
+    with profile.phase("import_reference"):
+        cmds.file(importReference=True, referenceNode=reference_node)
     
     #gather joints perhaps - per reference or namespace
     
@@ -189,7 +537,9 @@ def generate_fbx_animation(reference_node,
     #namespace = "aperature_REF"
     joints = cmds.listRelatives (f"{namespace}:global_C0_0_jnt", ad = True, type = "joint") + cmds.ls(f"{namespace}:global_C0_0_jnt", type = "joint") #the decendents and the root joint
     #cmds.select(joints)
-    
+
+    fbx_export_path = get_fbx_animation_path(base_fbx_destination_folder, namespace, Lo_Mid_Hi)
+
     #Set all joints to keyable for later baking
     for joint in joints:
         for attr in ["tx","ty","tz","rx","ry","rz","sx","sy","sz"]:
@@ -198,16 +548,41 @@ def generate_fbx_animation(reference_node,
     out_joints = cmds.ls(f"{namespace}:out_C0_*_jnt")
     
     #if matricies need to be decomposed:
-    if out_joints:
-        decompose_out_joints(out_joints)
+    if out_joints and not sample_out_matrices:
+        with profile.phase("decompose_out_joints"):
+            decompose_out_joints(out_joints)
+    # gathered while the decompose chains still lead up from the joints
+    with profile.phase("gather_matrix_nodes"):
+        matrix_nodes = gather_rig_matrix_nodes(namespace, joints)
     resulting_joints_set = set(joints) - set(out_joints)
     
     # Convert back to a list
     base_joints = list(resulting_joints_set)
-    
+
+    return {"namespace": namespace,
+            "joints": joints,
+            "out_joints": out_joints,
+            "base_joints": base_joints,
+            "global_joint": f"{namespace}:global_C0_0_jnt",
+            "fbx_export_path": fbx_export_path,
+            "sample_out_matrices": sample_out_matrices,
+            "matrix_nodes": matrix_nodes}
+
+def bake_prepared_references(prepared_references, model_container_wo_namespace="export_grp"):
+    '''
+    bakes the joints of every prepared rig, in one pass over the timeline no matter how many rigs there are,
+    then strips the rigs down to their model containers and skeletons. the second phase of generate_fbx_animation.
+    '''
+    base_joints = [joint for prepared in prepared_references for joint in prepared["base_joints"]]
+    out_joints = [joint for prepared in prepared_references for joint in prepared["out_joints"]
+                  if not prepared["sample_out_matrices"]]
+    sampled_out_joints = [joint for prepared in prepared_references for joint in prepared["out_joints"]
+                          if prepared["sample_out_matrices"]]
+
     print("using ml bake to the main joints")
     cmds.select(base_joints)
-    ml_worldBake.matchBakeLocators(parent=None, bakeOnOnes=True, constrainSource=False)
+    with profile.phase("match_bake_locators"):
+        ml_worldBake.matchBakeLocators(parent=None, bakeOnOnes=True, constrainSource=False)
     
     #BAKE!
     
@@ -219,66 +594,331 @@ def generate_fbx_animation(reference_node,
     #using a the standard maya bake command -
     print('baking down the out joints')
     if out_joints:
-        bake.bake_transform_animation(out_joints, bakeSRT = False)
+        with profile.phase("bake_out_joints"):
+            bake.bake_transform_animation(out_joints, bakeSRT = False)
+        print("out bake completed.")
+    if sampled_out_joints:
+        # no decompose nodes, the matrices are read and solved in one go
+        with profile.phase("sample_out_matrices"):
+            bake.bake_offset_parent_matrices(sampled_out_joints, cmds.playbackOptions(q=True, min=True),
+                                             cmds.playbackOptions(q=True, max=True))
         print("out bake completed.")
     
     
-    matrix_nodes = cmds.ls(type = "mgear_matrixConstraint") + cmds.ls(type = "multMatrix") + cmds.ls( "*:*_rigUParCon")
-    print(len(matrix_nodes))
-    #matrix_nodes = cmds.ls( "*:*_rigUParCon")
-    #len(matrix_nodes)
-    #deleting matrix constraints any other matrix in the scene
-    for matrix_node in matrix_nodes:
-        try:
-            cmds.delete(matrix_node)
-        except:
-            pass
+    with profile.phase("delete_matrix_nodes"):
+        for prepared in prepared_references:
+            prepared["teardown"] = teardown_matrix_nodes(prepared["namespace"], prepared["joints"], prepared["matrix_nodes"])
     
-    #reparent the mesh group and the joint hierearchy to the world
-    model_container = f"{namespace}:{model_container_wo_namespace}"
-    global_joint = f"{namespace}:global_C0_0_jnt"
+    for prepared in prepared_references:
+        namespace = prepared["namespace"]
+        #reparent the mesh group and the joint hierearchy to the world
+        model_container = f"{namespace}:{model_container_wo_namespace}"
 
-    # grabbing everything under jnt_org
-    children_of_jnt_org = cmds.listRelatives(cmds.listRelatives(global_joint,p=True), c= True)
-    
-    cmds.parent(model_container,children_of_jnt_org, w =True)
-    
-    
-    
-    rig_nodes = cmds.ls(f"{namespace}:rig_*") #the rig and sets should be returned
-    for rig_node in rig_nodes :
-        if cmds.objExists(rig_node):
-            cmds.delete(rig_node)
+        # grabbing everything under jnt_org
+        children_of_jnt_org = cmds.listRelatives(cmds.listRelatives(prepared["global_joint"],p=True), c= True)
+        
+        cmds.parent(model_container,children_of_jnt_org, w =True)
+        
+        
+        
+        with profile.phase("delete_rig_nodes"):
+            teardown_rig_groups(namespace, prepared["teardown"])
 
     cmds.select(cmds.ls( "worldBake_*",type = "transform"))
     
-    ml_worldBake.fromLocators(bakeOnOnes=True)
+    with profile.phase("from_locators"):
+        ml_worldBake.fromLocators(bakeOnOnes=True)
+
+def export_prepared_reference(prepared, model_container_wo_namespace="export_grp", reduce_keys=False,
+                              translate_tolerance=0.01, rotate_tolerance=0.05, write_clip=False, takes=None,
+                              strip_static=None):
+    '''
+    exports the baked skeleton of a prepared rig, the last phase of generate_fbx_animation.
+    write_clip (bool) samples the baked skeleton into <fbx>.clip.npy and <fbx>.clip.json as well, see FT_clip
+    takes (list) (name, start, end) ranges, each one is written to its own fbx holding a single take of that
+    name trimmed to its range. a list of fbx files is returned instead of one
+    strip_static (str) "collapse" leaves a single key on every channel that stays within tolerance for the
+    whole range, "drop" deletes their curves. the channels removed are written to <fbx>.static_channels.json
+    '''
+    fbx_export_path = prepared["fbx_export_path"]
     #process animCurves?
+    if reduce_keys:
+        print("reducing baked keys")
+        with profile.phase("reduce_keys"):
+            bake.reduce_baked_curves(prepared["joints"], translate_tolerance=translate_tolerance, rotate_tolerance=rotate_tolerance)
+    if strip_static:
+        with profile.phase("strip_static"):
+            static_report = bake.strip_static_channels(prepared["joints"], drop=strip_static == "drop")
+        static_report_path = os.path.splitext(fbx_export_path)[0] + ".static_channels.json"
+        if not os.path.exists(os.path.dirname(static_report_path)):
+            os.makedirs(os.path.dirname(static_report_path))
+        with open(static_report_path, "w") as report_file:
+            json.dump(dict(static_report, mode=strip_static), report_file, indent=4)
 
-    scene_name, _ = os.path.basename(cmds.file(q=1, loc=1)).split(".")
     # Get the parent directory
     #character_project_directory = os.path.abspath(os.path.join(export_rig, '..', '..'))
-    cmds.delete(model_container)            
+    model_container = f"{prepared['namespace']}:{model_container_wo_namespace}"
+    if cmds.objExists(model_container):
+        cmds.delete(model_container)            
     
-    cmds.select(global_joint) 
+    cmds.select(prepared["global_joint"]) 
     #fbx_export_path = os.path.join(base_fbx_destination_folder,"fbx_animations", f"{namespace}_{scene_name}.fbx")
 
-    fbx_export_path = base_fbx_destination_folder + f"/{namespace}_fbx_animations/{Lo_Mid_Hi}/{namespace}_{scene_name}.fbx"
-    
     print (fbx_export_path)
     if not os.path.exists(os.path.dirname(fbx_export_path)):
         # Create the folder
         os.makedirs(os.path.dirname(fbx_export_path))
     print ("fbx_export_path=", fbx_export_path)
-    print ("""cmds.FBXExportBakeComplexAnimation("-v", "true")""")
+    # Include animations, baking on export would put a key back on every frame of reduced or stripped curves
+    bake_complex = "false" if reduce_keys or strip_static else "true"
+    print ("FBXExportBakeComplexAnimation", bake_complex)
+    cmds.FBXExportBakeComplexAnimation("-v", bake_complex)
     # Export the fbx file
+    
+    if not takes:
+        # the bake range is left over from whatever was exported last, bake the playback range
+        cmds.FBXExportBakeComplexStart("-v", cmds.playbackOptions(q=True, min=True))
+        cmds.FBXExportBakeComplexEnd("-v", cmds.playbackOptions(q=True, max=True))
+        with profile.phase("fbx_export"):
+            cmds.FBXExport("-file", fbx_export_path, "-s")
+        if write_clip:
+            write_prepared_clip(prepared, fbx_export_path, cmds.playbackOptions(q=True, min=True), cmds.playbackOptions(q=True, max=True))
+        return fbx_export_path
 
-    print ("""cmds.FBXExport("-file", fbx_export_path, "-s")""")
-    # Include animations
-    cmds.FBXExportBakeComplexAnimation("-v", "true")
-    # Export the fbx file
+    take_paths = []
+    fbx_folder, fbx_name = os.path.split(fbx_export_path)
+    bake_start = cmds.FBXExportBakeComplexStart("-q")
+    bake_end = cmds.FBXExportBakeComplexEnd("-q")
+    try:
+        for take_name, start_frame, end_frame in normalize_takes(takes):
+            take_path = f"{fbx_folder}/{os.path.splitext(fbx_name)[0]}_{take_name}.fbx"
+            print ("take", take_name, start_frame, end_frame, take_path)
+            # the take trims curves that are exported as they are, the bake range trims the baked ones
+            cmds.FBXExportSplitAnimationIntoTakes("-c")
+            cmds.FBXExportSplitAnimationIntoTakes("-v", take_name, start_frame, end_frame)
+            cmds.FBXExportBakeComplexStart("-v", start_frame)
+            cmds.FBXExportBakeComplexEnd("-v", end_frame)
+            with profile.phase("fbx_export"):
+                cmds.FBXExport("-file", take_path, "-s")
+            if write_clip:
+                write_prepared_clip(prepared, take_path, start_frame, end_frame, take=take_name)
+            take_paths.append(take_path)
+    finally:
+        cmds.FBXExportSplitAnimationIntoTakes("-c")
+        cmds.FBXExportBakeComplexStart("-v", bake_start)
+        cmds.FBXExportBakeComplexEnd("-v", bake_end)
+    return take_paths
+
+def write_prepared_clip(prepared, fbx_export_path, start_frame, end_frame, **info):
+    '''
+    samples the baked skeleton of a prepared rig into a clip file beside the fbx, see FT_clip
+    '''
+    with profile.phase("write_clip"):
+        joint_names, parents, trs = bake.sample_clip(prepared["global_joint"], start_frame, end_frame)
+        clip.write_clip(fbx_export_path, joint_names, parents, trs, mel.eval("currentTimeUnitToFPS()"),
+                        start_frame, end_frame, namespace=prepared["namespace"],
+                        scene=cmds.file(q=1, loc=1), linear_unit="cm", **info)
+
+def generate_fbx_animations_shared(reference_nodes, 
+                                   base_fbx_destination_folder, 
+                                   model_container_wo_namespace="export_grp", 
+                                   Lo_Mid_Hi = "Hi",
+                                   reduce_keys=False,
+                                   translate_tolerance=0.01,
+                                   rotate_tolerance=0.05,
+                                   profile_phases=False,
+                                   sample_out_matrices=False,
+                                   write_clip=False,
+                                   takes=None,
+                                   strip_static=None):
+    '''
+    generate_fbx_animation for several references at once. every reference is imported and prepared first,
+    all of their joints are baked together so the timeline is only stepped through once per bake,
+    then each skeleton is exported to its own fbx. with takes only their combined range is baked and every
+    take is exported per skeleton, see generate_fbx_animation
+
+    Returns:
+        list(str,): the exported fbx files
+    '''
+    if profile_phases and not profile.is_enabled():
+        profile.enable()
+        try:
+            return generate_fbx_animations_shared(reference_nodes, base_fbx_destination_folder,
+                                                  model_container_wo_namespace=model_container_wo_namespace,
+                                                  Lo_Mid_Hi=Lo_Mid_Hi, reduce_keys=reduce_keys,
+                                                  translate_tolerance=translate_tolerance,
+                                                  rotate_tolerance=rotate_tolerance,
+                                                  sample_out_matrices=sample_out_matrices,
+                                                  write_clip=write_clip, takes=takes,
+                                                  strip_static=strip_static)
+        finally:
+            profile.disable()
+    # enable() starts from a clean report, phases a caller recorded before calling in are kept
+
+    prepared_references = [prepare_animation_reference(reference_node, base_fbx_destination_folder, Lo_Mid_Hi,
+                                                       sample_out_matrices=sample_out_matrices)
+                           for reference_node in reference_nodes]
+    if not prepared_references:
+        return []
+    playback_range = set_takes_range(takes)
+    bake_prepared_references(prepared_references, model_container_wo_namespace)
+
+    # every model container goes before the first export so no fbx picks up another characters mesh
+    for prepared in prepared_references:
+        model_container = f"{prepared['namespace']}:{model_container_wo_namespace}"
+        if cmds.objExists(model_container):
+            cmds.delete(model_container)
+
+    fbx_export_paths = [export_prepared_reference(prepared, model_container_wo_namespace, reduce_keys=reduce_keys,
+                                                  translate_tolerance=translate_tolerance, rotate_tolerance=rotate_tolerance,
+                                                  write_clip=write_clip, takes=takes,
+                                                  strip_static=strip_static)
+                        for prepared in prepared_references]
+    fbx_export_paths = _flatten_paths(fbx_export_paths)
+    if playback_range:
+        cmds.playbackOptions(min=playback_range[0], max=playback_range[1])
+
+    if profile.is_enabled():
+        # one report per scene and tier, named for the characters baked rather than the fbx files written
+        scene_name = os.path.splitext(os.path.basename(cmds.file(q=1, loc=1)))[0]
+        profile.write_report(os.path.join(base_fbx_destination_folder,
+                                          f"{scene_name}_{len(prepared_references)}_characters_{Lo_Mid_Hi}.profile.json"))
+        profile.print_summary()
+    return fbx_export_paths
+
+def generate_fbx_animation(reference_node, 
+                            base_fbx_destination_folder, 
+                            model_container_wo_namespace="export_grp", 
+                            delete_model_containers = True,
+                             Lo_Mid_Hi = "Hi",
+                             reduce_keys=False,
+                             translate_tolerance=0.01,
+                             rotate_tolerance=0.05,
+                             incremental=False,
+                             fingerprint_window=50,
+                             fingerprint_padding=5,
+                             profile_phases=False,
+                             sample_out_matrices=False,
+                             write_clip=False,
+                             takes=None,
+                             strip_static=None):
+    '''
+    imports the reference, bakes all joints, deletes everything but the baked skeleton, creates a folder and exports an fbx file.
+    reduce_keys (bool) thins every baked joint curve, by greedy splitting, to keys within translate_tolerance
+    (scene units) and rotate_tolerance (degrees), the fbx is then written from those keys rather than resampled
+    incremental (bool) keeps per window fingerprints of the source curves and the baked joint curves next to the fbx.
+    on the next export only the frames covering the changed windows, padded by fingerprint_padding, are baked and
+    spliced into the cached curves. several changed windows are baked as one span from the first to the last.
+    if nothing changed and the fbx is there the export is skipped before the reference is imported. a changed
+    rig file or different export options (tier, reduce_keys and its tolerances, strip_static, write_clip,
+    sample_out_matrices) throw the cache away
+    profile_phases (bool) times each phase and counts its maya commands, writes <fbx>.profile.json and prints
+    a summary table, see FT_profile. it also reports when FT_profile was enabled by the caller
+    sample_out_matrices (bool) skips the decomposeMatrix network and the out joint bake, the matrices driving
+    the out joints are sampled for every frame and solved in numpy, see FT_bake.bake_offset_parent_matrices
+    write_clip (bool) also writes the baked skeleton to a memory mappable <fbx>.clip.npy with a <fbx>.clip.json
+    header holding joint names, parents, frame rate and range, see FT_clip
+    takes (list) named ranges as (name, start, end) or dicts, e.g. [("aperture_open", 1, 48), ("aperture_closing", 49, 90)].
+    the rig is imported and baked once over the range covering every take, then each take is written to
+    <namespace>_<scene>_<take>.fbx holding one take of that name. incremental is ignored with takes.
+    returns the list of take fbx files
+    strip_static (str) "collapse" or "drop" the baked channels that stay constant for the whole range, with a
+    report of them next to the fbx, see FT_bake.strip_static_channels
+    '''
+    if profile_phases and not profile.is_enabled():
+        profile.enable()
+        try:
+            return generate_fbx_animation(reference_node, base_fbx_destination_folder,
+                                          model_container_wo_namespace=model_container_wo_namespace,
+                                          delete_model_containers=delete_model_containers, Lo_Mid_Hi=Lo_Mid_Hi,
+                                          reduce_keys=reduce_keys, translate_tolerance=translate_tolerance,
+                                          rotate_tolerance=rotate_tolerance, incremental=incremental,
+                                          fingerprint_window=fingerprint_window,
+                                          fingerprint_padding=fingerprint_padding,
+                                          sample_out_matrices=sample_out_matrices,
+                                          write_clip=write_clip, takes=takes, strip_static=strip_static)
+        finally:
+            profile.disable()
+    # enable() starts from a clean report, phases a caller recorded before calling in are kept
+    
+    #current_project_path = cmds.workspace(q=True, rd=True) # -rootDirectory
+    #print(current_project_path)
     
-    cmds.FBXExport("-file", fbx_export_path, "-s")
+    #export_rig = current_project_path + "_rig/PG4_export.mb" #should do a list to determine what file needs to be pulled 
+
+    if takes:
+        incremental = False
+
+    if incremental:
+        # fingerprint the animation before anything is imported, an unchanged shot skips the import too
+        namespace = get_namespace_from_reference(reference_node)
+        fbx_export_path = get_fbx_animation_path(base_fbx_destination_folder, namespace, Lo_Mid_Hi)
+        rig_digest = cache.file_digest(cmds.referenceQuery(reference_node, filename=True, withoutCopyNumber=True))
+        # anything that changes what is written from the bake, a new option re-exports an unchanged shot
+        options_digest = cache.options_digest({"tier": Lo_Mid_Hi, "model_container": model_container_wo_namespace,
+                                               "reduce_keys": reduce_keys, "translate_tolerance": translate_tolerance,
+                                               "rotate_tolerance": rotate_tolerance, "strip_static": strip_static,
+                                               "write_clip": write_clip, "sample_out_matrices": sample_out_matrices})
+        start_frame = int(cmds.playbackOptions(q=True, min=True))
+        end_frame = int(cmds.playbackOptions(q=True, max=True))
+        with profile.phase("fingerprint"):
+            fingerprints = bake.curve_window_fingerprints(bake.source_anim_curves(namespace), start_frame, end_frame, fingerprint_window)
+            bake_cache = bake.load_bake_cache(fbx_export_path)
+            bake_range = bake.dirty_frame_range(bake_cache, fingerprints, start_frame, end_frame,
+                                                fingerprint_window, fingerprint_padding, rig_digest=rig_digest,
+                                                options_digest=options_digest)
+        if bake_range is None and os.path.exists(fbx_export_path):
+            print("source animation, rig and options unchanged, skipping", fbx_export_path)
+            return fbx_export_path
+
+    prepared = prepare_animation_reference(reference_node, base_fbx_destination_folder, Lo_Mid_Hi,
+                                           sample_out_matrices=sample_out_matrices)
+    fbx_export_path = prepared["fbx_export_path"]
+    playback_range = set_takes_range(takes)
+
+    if incremental:
+        baked_plugs = [f"{joint}.{attr}" for joint in prepared["joints"] for attr in ["tx","ty","tz","rx","ry","rz"]]
+        if bake_range is None or bake_cache is None or bake_cache["plugs"] != baked_plugs:
+            # the fbx is missing or the skeleton changed, bake everything
+            bake_range = (start_frame, end_frame)
+        print(f"baking frames {bake_range[0]}-{bake_range[1]} of {start_frame}-{end_frame}")
+        #the bakes below all run over the playback range
+        cmds.playbackOptions(min=bake_range[0], max=bake_range[1])
+
+    bake_prepared_references([prepared], model_container_wo_namespace)
+
+    if incremental:
+        cmds.playbackOptions(min=start_frame, max=end_frame)
+        with profile.phase("splice_bake_cache"):
+            if bake_range != (start_frame, end_frame):
+                bake.splice_bake_cache(bake_cache, baked_plugs, bake_range)
+            bake.save_bake_cache(fbx_export_path, fingerprints, start_frame, end_frame, fingerprint_window, baked_plugs,
+                                 rig_digest=rig_digest, options_digest=options_digest)
+
+    exported = export_prepared_reference(prepared, model_container_wo_namespace, reduce_keys=reduce_keys,
+                                         translate_tolerance=translate_tolerance, rotate_tolerance=rotate_tolerance,
+                                         write_clip=write_clip, takes=takes, strip_static=strip_static)
+    if playback_range:
+        cmds.playbackOptions(min=playback_range[0], max=playback_range[1])
+
+    if profile.is_enabled():
+        profile.write_report(os.path.splitext(fbx_export_path)[0] + ".profile.json")
+        profile.print_summary()
+    return exported
+
+def set_takes_range(takes):
+    '''
+    sets the playback range to cover every take so the bakes run over it once.
+
+    Returns:
+        tuple: the previous playback range to put back afterwards, None when there are no takes
+    '''
+    takes = normalize_takes(takes)
+    if not takes:
+        return None
+    playback_range = (cmds.playbackOptions(q=True, min=True), cmds.playbackOptions(q=True, max=True))
+    cmds.playbackOptions(min=min(take[1] for take in takes), max=max(take[2] for take in takes))
+    return playback_range
 
 
 def generate_fbx_model(base_fbx_destination_folder=None, model_container_wo_namespace="export_grp", Lo_Mid_Hi = "Hi"):
@@ -288,21 +928,37 @@ def generate_fbx_model(base_fbx_destination_folder=None, model_container_wo_name
     If this is a character file we should be in the export rig scene. Whatever scene this is run from 
     is what will be operated on. Warn the user if this is a character rig and what the consequences may be.
     We will grab the required files based on what we find based on the namespace 
+    exports a single tier, see generate_fbx_models to export several from one rig import
+    '''
+    fbx_export_path = generate_fbx_models(base_fbx_destination_folder, model_container_wo_namespace, tiers=[Lo_Mid_Hi])[Lo_Mid_Hi]
+
+    # no one to answer in batch mode
+    if cmds.about(batch=True):
+        return fbx_export_path
+    val = cmds.confirmDialog( title='Confirm', message='Open the created fbx?', button=['Yes','No'], defaultButton='Yes', cancelButton='No', dismissString='No' )
+
+    if val == "Yes":    
+
+        cmds.file(fbx_export_path, open=True, force=True)
+    return fbx_export_path
+
+def prepare_model_export(model_container_wo_namespace="export_grp"):
+    '''
+    Starts a new scene with the current rig file imported, out joints decomposed, matrix and rig nodes
+    deleted and the model and joints parented to the world, ready for any tier to be exported.
+
+    Returns:
+        tuple(str,): rig file path, namespace, model container and global joint
     '''
-    
     #current_project_path = cmds.workspace(q=True, rd=True) # -rootDirectory
     #print(current_project_path)
     
     #export_rig = current_project_path + "_rig/PG4_export.mb" #should do a list to determine what file needs to be pulled 
 
-    # Example usage
-    
     rig_file_path =cmds.file(q=1, loc=1)
     cmds.file(new=True, f = True)
     # generate the namespace
     namespace, _ = os.path.basename(rig_file_path).split(".")
-    #export_rig_file_path = rig_folder_path + f"/{name}_export.{extension}"
-    #namespace = 
     create_reference(rig_file_path, namespace)
 
     all_references = cmds.ls(type='reference')
@@ -312,90 +968,180 @@ def generate_fbx_model(base_fbx_destination_folder=None, model_container_wo_name
         if rig_file_path in cmds.referenceQuery(ref_node, filename=True):
             reference_node = ref_node
             break
-    #cmds.referenceQuery(reference_node, filename=True)
 
     cmds.file(importReference=True, referenceNode=reference_node)
     
-    #gather joints perhaps - per reference or namespace
-    
-    joints = cmds.listRelatives ("*:global_C0_0_jnt", ad = True, type = "joint") + cmds.ls("*:global_C0_0_jnt", type = "joint")
-    
     out_joints = cmds.ls(f"{namespace}:out_C0_*_jnt")
     
     #if matricies need to be decomposed:
     if out_joints:    
         decompose_out_joints(out_joints)
-        
-    #get only the base joints
-    resulting_joints_set = set(joints) - set(out_joints)
-    base_joints = list(resulting_joints_set)
-    
-    matrix_nodes = cmds.ls(type = "mgear_matrixConstraint") + cmds.ls(type = "multMatrix") + cmds.ls( "*:*_rigUParCon")
-    print(len(matrix_nodes))
     
-    for matrix_node in matrix_nodes:
-        try:
-            cmds.delete(matrix_node)
-        except:
-            pass
-
     #reparent the mesh group and the joint hierearchy to the world
     model_container = f"{namespace}:{model_container_wo_namespace}"
     global_joint = f"{namespace}:global_C0_0_jnt"
+    joints = cmds.listRelatives(global_joint, ad=True, type="joint") + cmds.ls(global_joint, type="joint")
+    teardown = teardown_matrix_nodes(namespace, joints)
+
     children_of_jnt_org = cmds.listRelatives(cmds.listRelatives(global_joint,p=True), c= True)
     
     cmds.parent(model_container,children_of_jnt_org, w =True)
 
     
-    rig_nodes = cmds.ls(f"{namespace}:rig_*") #the rig and sets should be returned
-    for rig_node in rig_nodes:
-        if cmds.objExists(rig_node):
-            cmds.delete(rig_node)
+    teardown_rig_groups(namespace, teardown)
 
-    if base_fbx_destination_folder == None:
-        base_fbx_destination_folder =os.path.dirname(rig_file_path)
+    for tier in TIERS: 
+        if cmds.objExists(f'{namespace}:{tier}'):
+            cmds.showHidden(f'{namespace}:{tier}')
 
+    return rig_file_path, namespace, model_container, global_joint
 
-    #cmds.loadPlugin("fbxmaya", qt=True)
-    
-    
-    #fbx_export_path =  os.path.join(base_fbx_destination_folder, f"fbx_model/{namespace}_base.fbx")
+def get_tier_manifest_path(rig_file_path):
+    return os.path.splitext(rig_file_path)[0] + ".tiers.json"
+
+def _strip_namespace(nodes):
+    return [node.rpartition("|")[2].rpartition(":")[2] for node in nodes]
+
+def build_tier_manifest(namespace, global_joint):
+    '''
+    Lists the joints and geometry of each tier of a rig in the scene, names are stored without the namespace.
+    The Lo tier drops the *Main_*_*_jnt joints, all but SubmentalSldMain_C0_0_jnt, and every tier drops the
+    other tiers geometry groups.
+    '''
+    joints = cmds.listRelatives(global_joint, allDescendents=True, type="joint") or []
+    joints = _strip_namespace(joints + [global_joint])
+    main_joints = set(_strip_namespace(cmds.ls(f"{namespace}:*Main_*_*_jnt") or [])) - {"SubmentalSldMain_C0_0_jnt"}
+    tier_groups = [tier for tier in TIERS if cmds.objExists(f"{namespace}:{tier}")]
 
+    manifest = {"version": 1, "tiers": {}}
+    for tier in TIERS:
+        drop_joints = sorted(main_joints) if tier == "Lo" else []
+        meshes = []
+        if tier in tier_groups:
+            meshes = _strip_namespace(cmds.listRelatives(f"{namespace}:{tier}", allDescendents=True, type="mesh", fullPath=True) or [])
+        manifest["tiers"][tier] = {"joints": [joint for joint in joints if tier != "Lo" or joint not in main_joints],
+                                   "geometry": [tier] if tier in tier_groups else [],
+                                   "meshes": meshes,
+                                   "delete_joints": drop_joints,
+                                   "delete_geometry": [group for group in tier_groups if group != tier]}
+    return manifest
+
+def check_tier_manifest(tier_manifest, joint_paths):
+    '''
+    Lists what would go wrong exporting each tier of a manifest from build_tier_manifest: no joints left,
+    joints kept under a joint the tier deletes, they would be deleted with it, or no tier group.
+    joint_paths (list) full dag paths of the skeleton joints
+
+    Returns:
+        dict: {tier: [problems]} of the failing tiers only
+    '''
+    failing = {}
+    for tier in TIERS:
+        tier_info = tier_manifest["tiers"][tier]
+        problems = []
+        if not tier_info["joints"]:
+            problems.append("no joints")
+        kept = set(tier_info["joints"])
+        deleted = set(tier_info["delete_joints"])
+        orphans = []
+        for joint_path in joint_paths:
+            names = _strip_namespace(joint_path.split("|"))
+            if names[-1] in kept and deleted.intersection(names[:-1]):
+                orphans.append(names[-1])
+        if orphans:
+            problems.append(f"{len(orphans)} joints sit under deleted joints: {', '.join(sorted(orphans)[:5])}")
+        if not tier_info["geometry"]:
+            problems.append("no tier group")
+        if problems:
+            failing[tier] = problems
+    return failing
+
+def load_tier_manifest(rig_file_path, namespace, global_joint):
+    '''
+    Returns the tier manifest saved next to the rig file, it is rebuilt from the scene and saved again
+    whenever the rig file has changed since it was written.
+    '''
+    manifest_path = get_tier_manifest_path(rig_file_path)
+    rig_mtime = os.path.getmtime(rig_file_path) if os.path.exists(rig_file_path) else None
+    if rig_mtime is not None and os.path.exists(manifest_path):
+        try:
+            with open(manifest_path, "r") as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest.get("rig_mtime") == rig_mtime:
+                return manifest
+        except ValueError:
+            pass
+
+    print("building tier manifest", manifest_path)
+    manifest = build_tier_manifest(namespace, global_joint)
+    manifest["rig_mtime"] = rig_mtime
+    try:
+        with open(manifest_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file, indent=4)
+    except (IOError, OSError):
+        print("could not save the tier manifest next to the rig, it will be rebuilt next time")
+    return manifest
+
+def export_model_tier(namespace, model_container, global_joint, base_fbx_destination_folder, Lo_Mid_Hi="Hi", tier_manifest=None):
+    '''
+    Exports one tier from a scene set up by prepare_model_export. The other tiers geometry and the
+    joints the tier doesnt use are deleted inside an undo chunk that is undone after the export,
+    so the scene is ready for the next tier.
+    tier_manifest (dict) the nodes each tier deletes, see load_tier_manifest. built from the scene when None
+    '''
+    if tier_manifest is None:
+        tier_manifest = build_tier_manifest(namespace, global_joint)
     fbx_export_path = base_fbx_destination_folder + f"/{namespace}_fbx_model/{Lo_Mid_Hi}/{namespace}_base.fbx"
     if not os.path.exists(os.path.dirname(fbx_export_path)):
 
         # Create the folder
         os.makedirs(os.path.dirname(fbx_export_path))
-    # delete all but the needed tier
-    for tier in ["Lo", "Mid", "Hi"]: 
-        if cmds.objExists(f'{namespace}:{tier}'):
-            cmds.showHidden(f'{namespace}:{tier}')
-            if tier != Lo_Mid_Hi:
-                cmds.delete(f'{namespace}:{tier}') 
-    if Lo_Mid_Hi == "Lo":
-        
-        cmds.select(cmds.ls(f"{namespace}:*Main_*_*_jnt"))
-        cmds.select(f"{namespace}:SubmentalSldMain_C0_0_jnt", d=True)
-        cmds.delete(cmds.ls(sl=True))
-    cmds.select(model_container, global_joint )
-    # Include animations
-    cmds.FBXExportBakeComplexAnimation("-v", "false")
-    # Export the fbx file
 
-    cmds.FBXExport("-file", fbx_export_path, "-s")
+    cmds.undoInfo(openChunk=True, chunkName=f"export_{Lo_Mid_Hi}")
+    try:
+        # delete all but the needed tier
+        tier = tier_manifest["tiers"][Lo_Mid_Hi]
+        delete_nodes([f"{namespace}:{node}" for node in tier["delete_geometry"] + tier["delete_joints"]])
+        cmds.select(model_container, global_joint )
+        # Include animations
+        cmds.FBXExportBakeComplexAnimation("-v", "false")
+        # Export the fbx file
+        print ("fbx_export_path=", fbx_export_path)
+        cmds.FBXExport("-file", fbx_export_path, "-s")
+    finally:
+        cmds.undoInfo(closeChunk=True)
+        cmds.undo()
+    return fbx_export_path
+
+def generate_fbx_models(base_fbx_destination_folder=None, model_container_wo_namespace="export_grp", tiers=["Lo", "Mid", "Hi"]):
+    '''
+    Exports several tiers of the current rig scene with a single import and clean up of the rig,
+    see generate_fbx_model. Never prompts so it can run in batch.
 
-    val = cmds.confirmDialog( title='Confirm', message='Open the created fbx?', button=['Yes','No'], defaultButton='Yes', cancelButton='No', dismissString='No' )
-    
-    print ("fbx_export_path=", fbx_export_path)
-    print ("""cmds.FBXExportBakeComplexAnimation("-v", "false")""")
-    # Export the fbx file
+    Returns:
+        dict: {tier: fbx_export_path}
+    '''
+    # the tiers are put back with undo, make sure it is recording
+    undo_state = cmds.undoInfo(query=True, state=True)
+    cmds.undoInfo(state=True)
 
-    print ("""cmds.FBXExport("-file", fbx_export_path, "-s")""")
+    rig_file_path, namespace, model_container, global_joint = prepare_model_export(model_container_wo_namespace)
+    # nothing before the tier chunks needs undoing, dont hold on to the import
+    cmds.flushUndo()
+    if base_fbx_destination_folder == None:
+        base_fbx_destination_folder =os.path.dirname(rig_file_path)
 
-    if val == "Yes":    
+    tier_manifest = load_tier_manifest(rig_file_path, namespace, global_joint)
 
-        cmds.file(fbx_export_path, open=True, force=True)
-    return fbx_export_path
+    fbx_export_paths = {}
+    try:
+        for tier in tiers:
+            fbx_export_paths[tier] = export_model_tier(namespace, model_container, global_joint,
+                                                       base_fbx_destination_folder, Lo_Mid_Hi=tier,
+                                                       tier_manifest=tier_manifest)
+    finally:
+        cmds.undoInfo(state=undo_state)
+    return fbx_export_paths
 
 
 
@@ -0,0 +1,224 @@
+'''rotation math on arrays of maya matrices - no maya imports so it runs anywhere numpy does'''
+
+import numpy as np
+
+# rotateOrder enum order on maya transforms
+ROTATE_ORDERS = ["xyz", "yzx", "zxy", "xzy", "yxz", "zyx"]
+
+# first axis and parity of each rotate order, see Shoemake, Graphics Gems IV
+_ORDER_AXES = [(0, 0), (1, 0), (2, 0), (0, 1), (1, 1), (2, 1)]
+_NEXT_AXIS = [1, 2, 0, 1]
+
+def _order_indices(rotate_order):
+    first, parity = _ORDER_AXES[rotate_order]
+    second = _NEXT_AXIS[first + parity]
+    third = _NEXT_AXIS[first - parity + 1]
+    return first, second, third, parity
+
+def euler_to_matrices(angles, rotate_order=0):
+    """
+    Builds rotation matrices from euler angles.
+
+    Args:
+        angles (array): (..., 3) x, y, z rotate values in degrees
+        rotate_order (int): maya rotateOrder enum value
+
+    Returns:
+        np.ndarray: (..., 3, 3) matrices, maya row vector convention
+    """
+    angles = np.radians(np.asarray(angles, dtype=float))
+    first, second, third, parity = _order_indices(rotate_order)
+    a_i, a_j, a_k = angles[..., first], angles[..., second], angles[..., third]
+    if parity:
+        a_i, a_j, a_k = -a_i, -a_j, -a_k
+
+    si, sj, sk = np.sin(a_i), np.sin(a_j), np.sin(a_k)
+    ci, cj, ck = np.cos(a_i), np.cos(a_j), np.cos(a_k)
+    cc, cs = ci * ck, ci * sk
+    sc, ss = si * ck, si * sk
+
+    # column vector matrix, transposed on the way out
+    matrices = np.empty(angles.shape[:-1] + (3, 3))
+    matrices[..., first, first] = cj * ck
+    matrices[..., first, second] = sj * sc - cs
+    matrices[..., first, third] = sj * cc + ss
+    matrices[..., second, first] = cj * sk
+    matrices[..., second, second] = sj * ss + cc
+    matrices[..., second, third] = sj * cs - sc
+    matrices[..., third, first] = -sj
+    matrices[..., third, second] = cj * si
+    matrices[..., third, third] = cj * ci
+    return np.swapaxes(matrices, -1, -2)
+
+def _matrices_to_euler_single_order(matrices, rotate_order):
+    first, second, third, parity = _order_indices(rotate_order)
+    column = np.swapaxes(matrices, -1, -2)
+    cy = np.sqrt(column[..., first, first] ** 2 + column[..., second, first] ** 2)
+    gimbal = cy < 1e-9
+
+    a_i = np.where(gimbal,
+                   np.arctan2(-column[..., second, third], column[..., second, second]),
+                   np.arctan2(column[..., third, second], column[..., third, third]))
+    a_j = np.arctan2(-column[..., third, first], cy)
+    a_k = np.where(gimbal, 0.0, np.arctan2(column[..., second, first], column[..., first, first]))
+    if parity:
+        a_i, a_j, a_k = -a_i, -a_j, -a_k
+
+    angles = np.empty(matrices.shape[:-2] + (3,))
+    angles[..., first] = a_i
+    angles[..., second] = a_j
+    angles[..., third] = a_k
+    return np.degrees(angles)
+
+def matrices_to_euler(matrices, rotate_orders=0):
+    """
+    Decomposes rotation matrices to euler angles with the middle rotation kept within +-90.
+
+    Args:
+        matrices (array): (..., 3, 3) or (..., 4, 4) maya matrices, only the rotation part is read
+            and it must be free of scale
+        rotate_orders (int or array): a maya rotateOrder, or one per matrix broadcasting against
+            the leading dimensions, e.g. one per joint for (frames, joints, 4, 4)
+
+    Returns:
+        np.ndarray: (..., 3) x, y, z rotate values in degrees
+    """
+    matrices = np.asarray(matrices, dtype=float)[..., :3, :3]
+    rotate_orders = np.broadcast_to(np.asarray(rotate_orders, dtype=int), matrices.shape[:-2])
+    angles = np.empty(matrices.shape[:-2] + (3,))
+    for rotate_order in np.unique(rotate_orders):
+        mask = rotate_orders == rotate_order
+        angles[mask] = _matrices_to_euler_single_order(matrices[mask], int(rotate_order))
+    return angles
+
+def remove_scale(matrices):
+    """
+    Returns the (..., 3, 3) rotation part of maya matrices with the scale divided out of each row.
+    """
+    rotation = np.asarray(matrices, dtype=float)[..., :3, :3]
+    return rotation / np.linalg.norm(rotation, axis=-1, keepdims=True)
+
+def joint_rotation_matrices(local_matrices, joint_orients=None, rotate_axes=None):
+    """
+    Isolates the rotate part of joint local matrices.
+
+    A joint's local matrix is scale * rotateAxis * rotate * jointOrient * translate, so the rotate
+    part is left once rotateAxis is undone on the left and jointOrient on the right.
+
+    Args:
+        local_matrices (array): (..., joints, 4, 4) matrices, usually sampled from the joints .matrix plug
+        joint_orients (array): (joints, 3) jointOrient values in degrees, None for plain transforms
+        rotate_axes (array): (joints, 3) rotateAxis values in degrees
+
+    Returns:
+        np.ndarray: (..., joints, 3, 3) rotation matrices
+    """
+    rotation = remove_scale(local_matrices)
+    if rotate_axes is not None:
+        rotate_axis_matrices = euler_to_matrices(rotate_axes, 0)
+        rotation = np.einsum("jba,...jbc->...jac", rotate_axis_matrices, rotation)
+    if joint_orients is not None:
+        orient_matrices = euler_to_matrices(joint_orients, 0)
+        rotation = np.einsum("...jab,jcb->...jac", rotation, orient_matrices)
+    return rotation
+
+def joint_rotations(local_matrices, rotate_orders, joint_orients=None, rotate_axes=None):
+    """
+    Solves the rotate channel values of joints from their local matrices, see joint_rotation_matrices.
+
+    Args:
+        rotate_orders (array): (joints,) rotateOrder of each joint
+
+    Returns:
+        np.ndarray: (..., joints, 3) rotate values in degrees
+    """
+    rotation = joint_rotation_matrices(local_matrices, joint_orients, rotate_axes)
+    return matrices_to_euler(rotation, rotate_orders)
+
+def matrices_to_quaternions(matrices):
+    """
+    Converts (..., 3, 3) rotation matrices to (..., 4) x, y, z, w quaternions.
+    """
+    rotation = np.swapaxes(np.asarray(matrices, dtype=float)[..., :3, :3], -1, -2)
+    m00, m11, m22 = rotation[..., 0, 0], rotation[..., 1, 1], rotation[..., 2, 2]
+
+    # each row is 4 times the square of one component, the largest one is divided by safely
+    squares = np.stack([1.0 + m00 - m11 - m22,
+                        1.0 - m00 + m11 - m22,
+                        1.0 - m00 - m11 + m22,
+                        1.0 + m00 + m11 + m22], axis=-1)
+    candidates = np.stack([
+        np.stack([squares[..., 0], rotation[..., 1, 0] + rotation[..., 0, 1],
+                  rotation[..., 0, 2] + rotation[..., 2, 0], rotation[..., 2, 1] - rotation[..., 1, 2]], axis=-1),
+        np.stack([rotation[..., 1, 0] + rotation[..., 0, 1], squares[..., 1],
+                  rotation[..., 2, 1] + rotation[..., 1, 2], rotation[..., 0, 2] - rotation[..., 2, 0]], axis=-1),
+        np.stack([rotation[..., 0, 2] + rotation[..., 2, 0], rotation[..., 2, 1] + rotation[..., 1, 2],
+                  squares[..., 2], rotation[..., 1, 0] - rotation[..., 0, 1]], axis=-1),
+        np.stack([rotation[..., 2, 1] - rotation[..., 1, 2], rotation[..., 0, 2] - rotation[..., 2, 0],
+                  rotation[..., 1, 0] - rotation[..., 0, 1], squares[..., 3]], axis=-1),
+    ], axis=-2)
+    largest = np.argmax(squares, axis=-1)
+    quaternions = np.take_along_axis(candidates, largest[..., None, None], axis=-2)[..., 0, :]
+    return quaternions / np.linalg.norm(quaternions, axis=-1, keepdims=True)
+
+def quaternions_to_matrices(quaternions):
+    """
+    Converts (..., 4) x, y, z, w quaternions to (..., 3, 3) maya rotation matrices.
+    """
+    quaternions = np.asarray(quaternions, dtype=float)
+    quaternions = quaternions / np.linalg.norm(quaternions, axis=-1, keepdims=True)
+    x, y, z, w = quaternions[..., 0], quaternions[..., 1], quaternions[..., 2], quaternions[..., 3]
+    matrices = np.empty(quaternions.shape[:-1] + (3, 3))
+    matrices[..., 0, 0] = 1.0 - 2.0 * (y * y + z * z)
+    matrices[..., 0, 1] = 2.0 * (x * y + z * w)
+    matrices[..., 0, 2] = 2.0 * (x * z - y * w)
+    matrices[..., 1, 0] = 2.0 * (x * y - z * w)
+    matrices[..., 1, 1] = 1.0 - 2.0 * (x * x + z * z)
+    matrices[..., 1, 2] = 2.0 * (y * z + x * w)
+    matrices[..., 2, 0] = 2.0 * (x * z + y * w)
+    matrices[..., 2, 1] = 2.0 * (y * z - x * w)
+    matrices[..., 2, 2] = 1.0 - 2.0 * (x * x + y * y)
+    return matrices
+
+def quaternion_continuity(quaternions, axis=0):
+    """
+    Flips quaternions onto the same hemisphere as the one before them along an axis (frames),
+    so neighbouring samples never sit on opposite sides of the double cover.
+    """
+    quaternions = np.moveaxis(np.asarray(quaternions, dtype=float), axis, 0)
+    dots = np.sum(quaternions[1:] * quaternions[:-1], axis=-1)
+    signs = np.ones(quaternions.shape[:-1])
+    signs[1:] = np.cumprod(np.where(dots < 0.0, -1.0, 1.0), axis=0)
+    return np.moveaxis(quaternions * signs[..., None], 0, axis)
+
+def closest_euler(matrices, rotate_orders):
+    """
+    Decomposes a sequence of rotations to euler angles that move as little as possible from one
+    frame to the next.
+
+    Every rotation has two euler solutions per rotate order, (a, b, c) and (a + 180, 180 - b, c + 180)
+    with b on the middle axis. Each frame takes whichever solution, shifted by whole turns, sits
+    closest to the previous frame.
+
+    Args:
+        matrices (array): (frames, joints, 3, 3) rotation matrices
+        rotate_orders (array): (joints,) maya rotateOrder of each joint
+
+    Returns:
+        np.ndarray: (frames, joints, 3) rotate values in degrees
+    """
+    rotate_orders = np.broadcast_to(np.asarray(rotate_orders, dtype=int), matrices.shape[1:-2])
+    solutions = matrices_to_euler(matrices, rotate_orders)
+    middle_axis = np.array([_order_indices(order)[1] for order in range(len(ROTATE_ORDERS))])[rotate_orders]
+    middle = np.arange(3) == middle_axis[..., None]
+    alternates = np.where(middle, 180.0 - solutions, solutions + 180.0)
+
+    angles = np.empty_like(solutions)
+    angles[0] = solutions[0]
+    for frame in range(1, len(solutions)):
+        previous = angles[frame - 1]
+        solution = solutions[frame] - np.round((solutions[frame] - previous) / 360.0) * 360.0
+        alternate = alternates[frame] - np.round((alternates[frame] - previous) / 360.0) * 360.0
+        use_alternate = np.abs(alternate - previous).sum(axis=-1) < np.abs(solution - previous).sum(axis=-1)
+        angles[frame] = np.where(use_alternate[..., None], alternate, solution)
+    return angles
@@ -0,0 +1,127 @@
+'''obj reader - parses obj files into numpy arrays and builds the meshes straight through MFnMesh
+
+Skips the OBJ file translator, every mesh is made with one MFnMesh.create call, its uvs and normals
+are set in bulk and nothing leaves construction history. Each file is read as one mesh, groups and
+objects inside it are merged the same way the accessory import used them.
+'''
+
+import numpy as np
+import maya.cmds as cmds
+from maya.api import OpenMaya
+
+# the records read_obj keeps, by the first two characters of the line
+_LINE_KINDS = {"v ": 0, "vt": 1, "vn": 2, "f ": 3}
+
+def _floats(lines, keyword, columns):
+    if not lines:
+        return np.zeros((0, columns))
+    # one parse over the whole block, the keyword only ever starts a line
+    values = np.fromstring(" ".join(lines).replace(keyword + " ", " "), dtype=np.float64, sep=" ")
+    width = len(values) // len(lines)
+    if width < columns or width * len(lines) != len(values):
+        # lines of different lengths, eg some vertices carrying a w or colours
+        return np.array([line.split()[1:columns + 1] for line in lines], dtype=np.float64)
+    return values.reshape(len(lines), width)[:, :columns]
+
+def _indices(values, counts):
+    # obj indices start at 1, negative ones count back from the last element read before their face
+    return np.where(values < 0, values + counts, values - 1)
+
+def read_obj(obj_file_path):
+    """
+    Reads an obj file.
+
+    Returns:
+        dict: positions (V,3), uvs (T,2), normals (N,3), face_counts (F,) and the per face vertex
+            vertex_ids, uv_ids and normal_ids, the last two are None when the faces dont use them
+    """
+    with open(obj_file_path, "r") as obj_file:
+        lines = obj_file.read().splitlines()
+
+    kinds = np.array([_LINE_KINDS.get(line[:2], -1) for line in lines], dtype=np.int8)
+    vertex_lines, uv_lines, normal_lines, face_lines = ([lines[i] for i in np.flatnonzero(kinds == kind)] for kind in range(4))
+
+    obj = {"positions": _floats(vertex_lines, "v", 3),
+           "uvs": _floats(uv_lines, "vt", 2),
+           "normals": _floats(normal_lines, "vn", 3),
+           "face_counts": np.zeros(0, dtype=np.int64),
+           "vertex_ids": np.zeros(0, dtype=np.int64),
+           "uv_ids": None,
+           "normal_ids": None}
+    if not face_lines:
+        return obj
+
+    # every corner of a face uses the same layout, v, v/t, v//n or v/t/n
+    layout = face_lines[0].split()[1].split("/")
+    has_uvs = len(layout) > 1 and bool(layout[1])
+    has_normals = len(layout) > 2
+    text = " ".join(face_lines)
+    if has_normals and not has_uvs:
+        text = text.replace("//", "/")
+    # obj indices are never 0, so each f becomes a 0 that marks where its face starts
+    values = np.fromstring(text.replace("f ", "0 ").replace("/", " "), dtype=np.int64, sep=" ")
+    face_starts = np.flatnonzero(values == 0)
+    width = 1 + has_uvs + has_normals
+    face_counts = np.diff(np.append(face_starts, len(values))) - 1
+    if len(face_starts) != len(face_lines) or np.any(face_counts % width):
+        raise ValueError(f"{obj_file_path}: faces mix index layouts or hold bad indices")
+    face_counts //= width
+    obj["face_counts"] = face_counts
+    columns = np.delete(values, face_starts).reshape(-1, width)
+
+    # how many of each element had been read when each corner's face came up
+    faces = kinds == 3
+    read_before = [np.repeat(np.cumsum(kinds == kind)[faces], face_counts) for kind in range(3)]
+    obj["vertex_ids"] = _indices(columns[:, 0], read_before[0])
+    if has_uvs:
+        obj["uv_ids"] = _indices(columns[:, 1], read_before[1])
+    if has_normals:
+        obj["normal_ids"] = _indices(columns[:, -1], read_before[2])
+    return obj
+
+def create_mesh(obj, name, FT_ID=None, use_file_normals=False, soften_angle=30.0):
+    """
+    Builds a mesh from read_obj data.
+
+    Args:
+        name (str): the transform name, the shape is called <name>Shape
+        FT_ID (str): stored in a FT_ID string attribute on the shape
+        use_file_normals (bool): lock the normals from the file, otherwise the normals are
+            left unlocked and edges under soften_angle are smoothed, like the accessory import did
+
+    Returns:
+        str: the transform
+    """
+    vertex_ids = obj["vertex_ids"]
+    uvs = obj["uvs"]
+    mesh_fn = OpenMaya.MFnMesh()
+    transform = mesh_fn.create(OpenMaya.MPointArray(obj["positions"].tolist()),
+                               OpenMaya.MIntArray(obj["face_counts"].tolist()),
+                               OpenMaya.MIntArray(vertex_ids.tolist()),
+                               OpenMaya.MFloatArray(uvs[:, 0].tolist()),
+                               OpenMaya.MFloatArray(uvs[:, 1].tolist()))
+
+    if obj["uv_ids"] is not None:
+        mesh_fn.assignUVs(OpenMaya.MIntArray(obj["face_counts"].tolist()),
+                          OpenMaya.MIntArray(obj["uv_ids"].tolist()))
+
+    if use_file_normals and obj["normal_ids"] is not None:
+        face_ids = np.repeat(np.arange(len(obj["face_counts"])), obj["face_counts"])
+        mesh_fn.setFaceVertexNormals(OpenMaya.MVectorArray(obj["normals"][obj["normal_ids"]].tolist()),
+                                     OpenMaya.MIntArray(face_ids.tolist()),
+                                     OpenMaya.MIntArray(vertex_ids.tolist()))
+
+    transform_name = OpenMaya.MFnDependencyNode(transform).setName(name)
+    shape = mesh_fn.object()
+    shape_fn = OpenMaya.MFnDependencyNode(shape)
+    shape_fn.setName(f"{transform_name}Shape")
+
+    if FT_ID is not None:
+        attribute = OpenMaya.MFnTypedAttribute().create("FT_ID", "FT_ID", OpenMaya.MFnData.kString)
+        shape_fn.addAttribute(attribute)
+        shape_fn.findPlug("FT_ID", False).setString(FT_ID)
+
+    if not use_file_normals:
+        cmds.polySoftEdge(transform_name, angle=soften_angle, ch=False)
+    cmds.sets(transform_name, edit=True, forceElement="initialShadingGroup")
+    return transform_name
@@ -0,0 +1,228 @@
+'''pipeline instrumentation - times the phases of a bake or export and counts the maya commands each one runs
+
+Nothing is measured until enable() is called, phase() is an empty context manager until then.
+
+    import FT_public.FT_profile as profile
+    profile.enable()
+    with profile.phase("bake"):
+        ...
+    profile.write_report("C:/temp/export.profile.json")
+    profile.print_summary()
+    profile.disable()
+
+benchmark_imports() times importing each FT_public module in a fresh mayapy, without starting maya.
+'''
+
+import collections
+import contextlib
+import json
+import os
+import pkgutil
+import subprocess
+import time
+
+import maya.cmds as cmds
+
+_enabled = False
+_phases = []
+_command_counts = collections.Counter()
+_original_commands = {}
+
+def _peak_rss():
+    """
+    Peak resident memory of this process in MB, None if it cant be read.
+    """
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # linux reports KB, mac bytes
+        return peak / (1024.0 * 1024.0) if os.uname().sysname == "Darwin" else peak / 1024.0
+
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize / (1024.0 * 1024.0)
+    except (AttributeError, OSError):
+        pass
+    return None
+
+def _node_count():
+    return len(_original_commands.get("ls", cmds.ls)() or [])
+
+def _counting(name, command):
+    def counted(*args, **kwargs):
+        _command_counts[name] += 1
+        return command(*args, **kwargs)
+    counted.__name__ = name
+    counted.__doc__ = command.__doc__
+    return counted
+
+def is_enabled():
+    return _enabled
+
+def enable():
+    """
+    Starts recording, every maya.cmds command is swapped for a counting wrapper until disable().
+    Modules call cmds.<command> at run time so they pick the wrappers up without reimporting.
+    """
+    global _enabled
+    if _enabled:
+        return
+    reset()
+    for name in dir(cmds):
+        command = getattr(cmds, name)
+        if name.startswith("_") or not callable(command):
+            continue
+        _original_commands[name] = command
+        setattr(cmds, name, _counting(name, command))
+    _enabled = True
+
+def disable():
+    """
+    Stops recording and puts the original maya.cmds commands back, the recorded phases are kept.
+    """
+    global _enabled
+    for name, command in _original_commands.items():
+        setattr(cmds, name, command)
+    _original_commands.clear()
+    _enabled = False
+
+def reset():
+    """
+    Forgets the recorded phases.
+    """
+    del _phases[:]
+    _command_counts.clear()
+
+@contextlib.contextmanager
+def phase(name):
+    """
+    Records wall time, cpu time, maya commands run, DG node counts before and after and
+    peak memory for the block it wraps.
+    """
+    if not _enabled:
+        yield
+        return
+
+    counts_before = collections.Counter(_command_counts)
+    nodes_before = _node_count()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        commands = _command_counts - counts_before
+        _phases.append({"phase": name,
+                        "wall_seconds": wall,
+                        "cpu_seconds": cpu,
+                        "command_count": sum(commands.values()),
+                        "commands": dict(commands.most_common()),
+                        "nodes_before": nodes_before,
+                        "nodes_after": _node_count(),
+                        "peak_rss_mb": _peak_rss()})
+
+def get_report():
+    """
+    Returns the recorded phases as a dictionary ready for json.
+    """
+    return {"phases": list(_phases),
+            "total_wall_seconds": sum(p["wall_seconds"] for p in _phases),
+            "total_cpu_seconds": sum(p["cpu_seconds"] for p in _phases),
+            "total_command_count": sum(p["command_count"] for p in _phases),
+            "peak_rss_mb": _peak_rss()}
+
+def write_report(path):
+    """
+    Writes the recorded phases to a json file.
+    """
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, "w") as report_file:
+        json.dump(get_report(), report_file, indent=4)
+    print("profile report written to", path)
+
+def print_summary(top_commands=3):
+    """
+    Prints one line per phase with its time, commands and node change, and the busiest commands.
+    """
+    report = get_report()
+    total_wall = report["total_wall_seconds"] or 1.0
+    print(f"{'phase':<28}{'wall s':>10}{'cpu s':>10}{'%':>7}{'cmds':>9}{'nodes':>12}  top commands")
+    for p in report["phases"]:
+        top = ", ".join(f"{name} {count}" for name, count in list(p["commands"].items())[:top_commands])
+        nodes = f"{p['nodes_before']}>{p['nodes_after']}"
+        print(f"{p['phase']:<28}{p['wall_seconds']:>10.2f}{p['cpu_seconds']:>10.2f}"
+              f"{100.0 * p['wall_seconds'] / total_wall:>7.1f}{p['command_count']:>9}{nodes:>12}  {top}")
+    peak = report["peak_rss_mb"]
+    print(f"{'total':<28}{report['total_wall_seconds']:>10.2f}{report['total_cpu_seconds']:>10.2f}"
+          f"{100.0:>7.1f}{report['total_command_count']:>9}" + (f"  peak rss {peak:.0f} MB" if peak else ""))
+
+_IMPORT_SCRIPT = """
+import importlib, json, sys, time
+modules_before = len(sys.modules)
+start = time.perf_counter()
+try:
+    importlib.import_module(sys.argv[1])
+    error = None
+except Exception as exception:
+    error = "{}: {}".format(type(exception).__name__, exception)
+print("FT_IMPORT " + json.dumps({"seconds": time.perf_counter() - start,
+                                 "modules_loaded": len(sys.modules) - modules_before,
+                                 "error": error}))
+"""
+
+def benchmark_imports(module_names=None, python=None, repeat=3):
+    """
+    Times a cold import of each FT_public module, every import runs in its own interpreter so
+    nothing is already loaded. maya.standalone isnt initialized, a module that needs the scene
+    at import time shows up with an error.
+
+    Args:
+        module_names (list(str,)): defaults to every module in FT_public
+        python (str): interpreter to run, defaults to mayapy
+        repeat (int): imports per module, the fastest is kept
+
+    Returns:
+        dict: module name -> seconds, modules_loaded and error
+    """
+    import FT_public
+    import FT_public.FT_shard as shard
+
+    if module_names is None:
+        module_names = sorted("FT_public." + module.name for module in pkgutil.iter_modules(FT_public.__path__))
+    python = python or shard.find_mayapy()
+
+    results = {}
+    for module_name in module_names:
+        runs = []
+        for _ in range(repeat):
+            output = subprocess.run([python, "-c", _IMPORT_SCRIPT, module_name], env=shard.worker_environment(),
+                                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True).stdout
+            lines = [line for line in output.splitlines() if line.startswith("FT_IMPORT ")]
+            runs.append(json.loads(lines[-1][len("FT_IMPORT "):]) if lines else
+                        {"seconds": None, "modules_loaded": None, "error": output.strip()[-500:] or "no output"})
+        timed = [run for run in runs if run["seconds"] is not None]
+        results[module_name] = min(timed, key=lambda run: run["seconds"]) if timed else runs[-1]
+
+    print(f"{'module':<32}{'import s':>10}{'modules':>9}  error")
+    for module_name, result in results.items():
+        seconds = f"{result['seconds']:.3f}" if result["seconds"] is not None else "-"
+        print(f"{module_name:<32}{seconds:>10}{str(result['modules_loaded']):>9}  {result['error'] or ''}")
+    return results
@@ -0,0 +1,219 @@
+'''frame range sharding - bakes a long range in parallel headless mayapy processes and stitches the curves back together
+
+Each worker opens a copy of the current scene, bakes its chunk of the range plus some overlap and
+writes the baked curves to an .npz file. The overlap frames are thrown away when stitching, they
+give simulated rigs time to settle and are used to line rotation curves up across the seams.
+
+The worker side runs with:
+    mayapy -m FT_public.FT_shard <job.json>
+'''
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import maya.cmds as cmds
+from maya.api import OpenMaya
+import numpy as np
+import FT_public.FT_animcurves as animcurves
+
+ROTATE_ATTRS = ("rx", "ry", "rz", "rotateX", "rotateY", "rotateZ")
+
+def find_mayapy():
+    """
+    Returns the mayapy executable for the running maya, it sits next to the maya binary.
+    """
+    name = "mayapy.exe" if os.name == "nt" else "mayapy"
+    bin_dirs = [os.path.dirname(sys.executable)]
+    if os.environ.get("MAYA_LOCATION"):
+        bin_dirs.append(os.path.join(os.environ["MAYA_LOCATION"], "bin"))
+    for bin_dir in bin_dirs:
+        mayapy = os.path.join(bin_dir, name)
+        if os.path.exists(mayapy):
+            return mayapy
+    raise RuntimeError("Could not find mayapy next to {} or in MAYA_LOCATION.".format(sys.executable))
+
+def worker_environment():
+    """
+    Environment for mayapy workers with FT_public importable.
+    """
+    env = os.environ.copy()
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    python_path = env.get("PYTHONPATH")
+    env["PYTHONPATH"] = package_root + os.pathsep + python_path if python_path else package_root
+    return env
+
+def split_frame_range(start_frame, end_frame, shards, overlap, sample_by=1):
+    """
+    Splits an inclusive frame range into shards.
+
+    Every shard starts on the start_frame + k*sample_by grid so the workers keys land on the
+    same frames a single bake would key, and the overlapping keys of neighbouring shards match up.
+
+    Returns:
+        list(tuple(int,)): (bake_start, bake_end, keep_start, keep_end) per shard, the keep ranges
+            cover the range once, the bake ranges reach overlap frames past them on either side
+    """
+    grid_count = int(np.floor((end_frame - start_frame) / sample_by)) + 1
+    shards = max(1, min(shards, grid_count))
+    bounds = np.linspace(0, grid_count, shards + 1).astype(int)
+    overlap_steps = int(np.ceil(overlap / sample_by))
+    ranges = []
+    for keep_index, keep_next in zip(bounds[:-1], bounds[1:]):
+        keep_start = start_frame + int(keep_index) * sample_by
+        keep_end = end_frame if keep_next == grid_count else start_frame + (int(keep_next) - 1) * sample_by
+        bake_start = start_frame + max(0, int(keep_index) - overlap_steps) * sample_by
+        ranges.append((bake_start, min(end_frame, keep_end + overlap), keep_start, keep_end))
+    return ranges
+
+def stitch_shards(shard_results, shard_ranges, rotate_mask, turn=360.0):
+    """
+    Joins per shard curves into continuous curves.
+
+    Args:
+        shard_results (list(tuple(np.ndarray,))): (times, values) per shard, values are (plugs, keys)
+        shard_ranges (list(tuple(int,))): as returned by split_frame_range
+        rotate_mask (np.ndarray): (plugs,) True for rotation plugs, these get shifted by whole turns
+            so they line up with the previous shard over the overlap
+        turn (float): one whole turn in the curves angle unit
+
+    Returns:
+        tuple(np.ndarray, np.ndarray): times (keys,) and values (plugs, keys)
+    """
+    stitched_times = []
+    stitched_values = []
+    previous_times = previous_values = None
+    for (times, values), (_, _, keep_start, keep_end) in zip(shard_results, shard_ranges):
+        values = values.copy()
+        if previous_times is not None:
+            _, previous_index, index = np.intersect1d(previous_times, times, return_indices=True)
+            if len(index):
+                difference = np.median(previous_values[:, previous_index] - values[:, index], axis=1)
+                values[rotate_mask] += np.round(difference[rotate_mask] / turn)[:, None] * turn
+        keep = (times >= keep_start) & (times <= keep_end)
+        stitched_times.append(times[keep])
+        stitched_values.append(values[:, keep])
+        previous_times, previous_values = times, values
+    return np.concatenate(stitched_times), np.concatenate(stitched_values, axis=1)
+
+def _tail(path, lines=20):
+    if not os.path.exists(path):
+        return ""
+    with open(path, "r", errors="replace") as log:
+        return "".join(log.readlines()[-lines:])
+
+def bake_sharded(transforms, start_frame, end_frame, sample_by=1,
+                 bakeAttrs=['tx', 'ty', 'tz', 'rx', 'ry', 'rz'], minimizeRotation=False,
+                 workers=None, overlap=10):
+    """
+    Bakes transforms over an inclusive frame range across mayapy workers and writes the stitched
+    curves back onto them.
+
+    Args:
+        transforms (list(str,)): nodes to bake
+        workers (int): number of mayapy processes, defaults to the number of cores
+        overlap (int): extra frames each worker bakes on either side of its chunk
+
+    Returns:
+        list(str,): the plugs that were baked
+    """
+    workers = workers or os.cpu_count() or 1
+    shard_ranges = split_frame_range(int(start_frame), int(end_frame), workers, overlap, sample_by)
+    mayapy = find_mayapy()
+    env = worker_environment()
+
+    temp_dir = tempfile.mkdtemp(prefix="FT_shard_")
+    try:
+        # workers bake a copy of the scene as it is now, unsaved changes included
+        scene = os.path.join(temp_dir, "shard_scene.mb")
+        cmds.file(scene, exportAll=True, preserveReferences=True, type="mayaBinary", force=True)
+
+        processes = []
+        for i, (bake_start, bake_end, _, _) in enumerate(shard_ranges):
+            job = {"scene": scene,
+                   "transforms": list(transforms),
+                   "attributes": list(bakeAttrs),
+                   "start": bake_start,
+                   "end": bake_end,
+                   "sample_by": sample_by,
+                   "minimize_rotation": minimizeRotation,
+                   "output": os.path.join(temp_dir, f"shard_{i}.npz")}
+            job_path = os.path.join(temp_dir, f"shard_{i}.json")
+            with open(job_path, "w") as job_file:
+                json.dump(job, job_file)
+            log_path = os.path.join(temp_dir, f"shard_{i}.log")
+            with open(log_path, "w") as log:
+                process = subprocess.Popen([mayapy, "-m", "FT_public.FT_shard", job_path],
+                                           stdout=log, stderr=subprocess.STDOUT, env=env)
+            processes.append((process, job, log_path))
+            print(f"shard {i}: frames {bake_start}-{bake_end}")
+
+        shard_results = []
+        plug_sets = []
+        for i, (process, job, log_path) in enumerate(processes):
+            if process.wait() != 0 or not os.path.exists(job["output"]):
+                for other, _, _ in processes:
+                    if other.poll() is None:
+                        other.kill()
+                raise RuntimeError(f"Shard {i} failed:\n{_tail(log_path)}")
+            with np.load(job["output"]) as result:
+                plug_sets.append([str(plug) for plug in result["plugs"]])
+                shard_results.append((result["times"], result["values"]))
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    # only plugs every worker managed to bake are written
+    plugs = [plug for plug in plug_sets[0] if all(plug in plug_set for plug_set in plug_sets[1:])]
+    for i, plug_set in enumerate(plug_sets):
+        rows = [plug_set.index(plug) for plug in plugs]
+        shard_results[i] = (shard_results[i][0], shard_results[i][1][rows])
+
+    rotate_mask = np.array([plug.rpartition(".")[2] in ROTATE_ATTRS for plug in plugs], dtype=bool)
+    # rotation curves come back in the ui angle unit
+    turn = 2.0 * np.pi / OpenMaya.MAngle.uiToInternal(1.0)
+    times, values = stitch_shards(shard_results, shard_ranges, rotate_mask, turn)
+
+    animcurves.disconnect_inputs(plugs)
+    animcurves.write_plugs(plugs, np.broadcast_to(times, values.shape), values)
+    print(f"sharded bake completed: {len(plugs)} curves from {len(shard_ranges)} workers")
+    return plugs
+
+def run_worker(job_path):
+    """
+    mayapy side of bake_sharded, bakes one chunk and saves the curves.
+    """
+    with open(job_path) as job_file:
+        job = json.load(job_file)
+
+    import maya.standalone
+    maya.standalone.initialize(name="python")
+    import FT_public.FT_bake as bake
+
+    cmds.file(job["scene"], open=True, force=True)
+    bake.bake_results(job["transforms"], job["start"], job["end"], sample_by=job["sample_by"],
+                      bakeAttrs=job["attributes"], minimizeRotation=job["minimize_rotation"])
+
+    times = np.arange(job["start"], job["end"] + 1, job["sample_by"], dtype=float)
+    plugs = []
+    values = []
+    for transform in job["transforms"]:
+        for attr in job["attributes"]:
+            plug = f"{transform}.{attr}"
+            curve = animcurves.get_anim_curve(plug)
+            if curve is None:
+                continue
+            curve_times, curve_values = animcurves.read_curve(curve)
+            if len(curve_times) != len(times):
+                continue
+            plugs.append(plug)
+            values.append(curve_values)
+
+    np.savez(job["output"], plugs=np.array(plugs), times=times,
+             values=np.array(values).reshape(len(plugs), len(times)))
+    maya.standalone.uninitialize()
+
+if __name__ == "__main__":
+    run_worker(sys.argv[1])
@@ -2,6 +2,7 @@ import maya.cmds as cmds
 from maya.api import OpenMaya, OpenMayaAnim
 import xml.etree.ElementTree as et
 import os
+import numpy as np
 
 def get_skin_clusters(msh_name):
     """
@@ -63,3 +64,83 @@ def import_skin_weights(obj, weights_file_path):
             cmds.skinPercent(skin, obj, nrm=1)
     else:
         cmds.warning('Skin object or influences do not exist in the scene')
+
+def read_skin_weights(weights_file_path):
+    """Reads a deformerWeights XML file into sparse arrays, only the points the file holds are kept.
+
+    Args:
+        weights_file_path (str): XML file written by deformerWeights
+
+    Return:
+        tuple(list(str,), np.ndarray, np.ndarray, np.ndarray): influences and the vertex, influence
+            (column of influences) and value of every weight
+    """
+    weight_elems = et.parse(weights_file_path).findall('weights')
+    influences = [elem.get('source') for elem in weight_elems]
+    vertices, columns, values = [], [], []
+    for column, elem in enumerate(weight_elems):
+        points = elem.findall('point')
+        vertices.append(np.array([int(point.get('index')) for point in points], dtype=np.int64))
+        columns.append(np.full(len(points), column, dtype=np.int64))
+        values.append(np.array([float(point.get('value')) for point in points], dtype=np.float64))
+    if not weight_elems:
+        return influences, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+    return influences, np.concatenate(vertices), np.concatenate(columns), np.concatenate(values)
+
+def weights_block(vertices, columns, values, influence_columns):
+    """Lays sparse weights out the way MFnSkinCluster.setWeights takes them.
+
+    Args:
+        influence_columns (list(int,)): the influences column of each skinCluster influence being set,
+            -1 for one the file doesnt hold, it gets zero weight
+
+    Return:
+        tuple(np.ndarray, np.ndarray): the weighted vertices and their (vertices, influences) weights
+    """
+    weighted, rows = np.unique(vertices, return_inverse=True)
+    # block column of every influences column, -1 for the ones not being set
+    block_columns = np.full(int(columns.max(initial=-1)) + 1, -1, dtype=np.int64)
+    for block_column, column in enumerate(influence_columns):
+        if 0 <= column < len(block_columns):
+            block_columns[column] = block_column
+    block = np.zeros((len(weighted), len(influence_columns)))
+    point_columns = block_columns[columns]
+    keep = point_columns >= 0
+    block[rows[keep], point_columns[keep]] = values[keep]
+    return weighted, block
+
+def apply_skin_weights(obj, influences, vertices, columns, values):
+    """Skins the object to the influences that exist in the scene and sets the weights in one call.
+
+    Only the vertices and influences the weights use are set, see read_skin_weights for the arguments.
+    """
+    used = set(np.unique(columns).tolist())
+    keep = [column for column, jnt in enumerate(influences) if column in used and cmds.objExists(jnt)]
+    if not cmds.objExists(obj) or not keep:
+        cmds.warning('Skin object or influences do not exist in the scene')
+        return
+    skn_infl = [influences[column] for column in keep]
+
+    curr_skin = get_skin_clusters(obj)
+    if curr_skin:
+        to_add = [x for x in skn_infl if x not in get_skin_cluster_influences(curr_skin)]
+        if to_add:
+            cmds.skinCluster(curr_skin, e=1, ai=to_add, lw=1, wt=0)
+        [cmds.setAttr(infs + '.liw', 0) for infs in cmds.skinCluster(curr_skin, q=1, inf=1)]
+    else:
+        curr_skin = cmds.skinCluster(obj, skn_infl, tsb=1)[0]
+
+    skin_fn = OpenMayaAnim.MFnSkinCluster(OpenMaya.MSelectionList().add(curr_skin).getDependNode(0))
+    mesh_path = OpenMaya.MSelectionList().add(obj).getDagPath(0).extendToShape()
+    influence_indices = {skin_fn.indexForInfluenceObject(OpenMaya.MSelectionList().add(influences[column]).getDagPath(0)): column
+                         for column in keep}
+
+    # influences that are in the skinCluster but not in the file get zero weight
+    all_indices = [skin_fn.indexForInfluenceObject(path) for path in skin_fn.influenceObjects()]
+    weighted, block = weights_block(vertices, columns, values, [influence_indices.get(index, -1) for index in all_indices])
+
+    components = OpenMaya.MFnSingleIndexedComponent()
+    vertex_components = components.create(OpenMaya.MFn.kMeshVertComponent)
+    components.addElements(OpenMaya.MIntArray(weighted.tolist()))
+    skin_fn.setWeights(mesh_path, vertex_components, OpenMaya.MIntArray(all_indices),
+                       OpenMaya.MDoubleArray(block.ravel().tolist()), normalize=True)
@@ -0,0 +1,33 @@
+'''maya plugin with one command, FT_apiUndo, that puts OpenMaya curve edits on the undo queue
+
+FT_animcurves.commit_change loads it. The edits are made first through MFnAnimCurve with an
+MAnimCurveChange, the command then takes that change so undo and redo can replay it.
+'''
+
+from maya.api import OpenMaya
+import FT_public.FT_animcurves as animcurves
+
+COMMAND_NAME = "FT_apiUndo"
+
+def maya_useNewAPI():
+    pass
+
+class ApiUndoCommand(OpenMaya.MPxCommand):
+
+    def doIt(self, args):
+        self.change = animcurves.pending_changes.pop()
+
+    def undoIt(self):
+        self.change.undoIt()
+
+    def redoIt(self):
+        self.change.redoIt()
+
+    def isUndoable(self):
+        return True
+
+def initializePlugin(plugin):
+    OpenMaya.MFnPlugin(plugin).registerCommand(COMMAND_NAME, ApiUndoCommand)
+
+def uninitializePlugin(plugin):
+    OpenMaya.MFnPlugin(plugin).deregisterCommand(COMMAND_NAME)
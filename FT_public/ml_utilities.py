@@ -67,6 +67,7 @@ import maya.mel as mm
 from maya import OpenMaya
 from functools import partial
 import shutil, os, re, sys, math
+import FT_public.FT_animcurves as animcurves
 
 #declare some variables
 WEBSITE_URL = 'http://morganloomis.com'
@@ -817,6 +818,9 @@ def matchBake(source=None, destination=None, bakeOnOnes=False, maintainOffset=Fa
         allKeyTimes = list(set(allKeyTimes))
         allKeyTimes.sort()
 
+    #baking on ones collects the sampled values and writes each curve once after the sweep
+    bakedKeys = {}
+
     with UndoChunk():
         #if 
         with IsolateViews():
@@ -829,10 +833,8 @@ def matchBake(source=None, destination=None, bakeOnOnes=False, maintainOffset=Fa
                         try:
                             v = mc.getAttr(duplicates[d]+'.'+a)
                             if bakeOnOnes:
-                                mc.setKeyframe(d, attribute=a, time=frame,
-                                               value=v,
-                                               itt='spline',
-                                               ott='spline')
+                                bakedKeys.setdefault((d, a), []).append((frame, v))
+                                #children sample against this pose later in the frame
                                 mc.setAttr(d+'.'+a, v)
                             elif a in keytimes[d] and frame in keytimes[d][a]:
                                 #tangent types line up with keytimes
@@ -846,6 +848,23 @@ def matchBake(source=None, destination=None, bakeOnOnes=False, maintainOffset=Fa
                         except:
                             pass
 
+            #each curve is written with one addKeys call, the edits share one MAnimCurveChange so the bake stays undoable
+            failed = []
+            if bakedKeys:
+                with animcurves.undoable() as change:
+                    for (d, a), keys in bakedKeys.items():
+                        times, values = zip(*keys)
+                        try:
+                            animcurves.write_plugs([d+'.'+a], [times], [values],
+                                                   in_tangent='spline', out_tangent='spline',
+                                                   keep_outside_keys=True, change=change)
+                        except RuntimeError as err:
+                            failed.append('{}.{}: {}'.format(d, a, err))
+            if failed:
+                mc.warning('matchBake could not write {} curves, see the script editor'.format(len(failed)))
+                for f in failed:
+                    print('    '+f)
+
             #this was breaking the tangents inside the other loop, so run it after.
             if not bakeOnOnes and preserveTangentWeight:
                 for d in destination:
@@ -0,0 +1,32 @@
+'''maya isnt available outside of maya, the modules under test only need maya to import so it is stubbed here'''
+
+import os
+import sys
+import types
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _stub_maya():
+    try:
+        import maya.cmds  # noqa: F401
+        return
+    except ImportError:
+        pass
+    maya = types.ModuleType("maya")
+    api = types.ModuleType("maya.api")
+    maya.cmds = mock.MagicMock(name="maya.cmds")
+    maya.mel = mock.MagicMock(name="maya.mel")
+    maya.OpenMaya = mock.MagicMock(name="maya.OpenMaya")
+    api.OpenMaya = mock.MagicMock(name="maya.api.OpenMaya")
+    api.OpenMayaAnim = mock.MagicMock(name="maya.api.OpenMayaAnim")
+    maya.api = api
+    sys.modules.update({"maya": maya,
+                        "maya.cmds": maya.cmds,
+                        "maya.mel": maya.mel,
+                        "maya.OpenMaya": maya.OpenMaya,
+                        "maya.api": api,
+                        "maya.api.OpenMaya": api.OpenMaya,
+                        "maya.api.OpenMayaAnim": api.OpenMayaAnim})
+
+_stub_maya()
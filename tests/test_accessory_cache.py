@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+
+import FT_public.FT_accessory_cache as accessory_cache
+import FT_public.FT_obj as obj_reader
+
+SKIN_XML = """<?xml version="1.0"?>
+<deformerWeight>
+  <weights deformer="skinCluster1" source="{joint}" shape="ringShape" layer="0" defaultValue="0.000" size="3" max="2">
+    <point index="0" value="1.000"/>
+    <point index="1" value="1.000"/>
+    <point index="2" value="1.000"/>
+  </weights>
+</deformerWeight>
+"""
+
+def _asset_folder(tmp_path):
+    asset_folder = tmp_path / "Ring_AB1-CD2-EF3"
+    (asset_folder / "objs").mkdir(parents=True)
+    (asset_folder / "objs" / "ring.obj").write_text("v 0 0 0\nv 1 0 0\nv 1 1 0\nf 1 2 3\n")
+    (asset_folder / "Ring_AB1-CD2-EF3_data.json").write_text('{"version": "0002"}')
+    for joint_resolution, joint in (("Lo", "head_C0_0_jnt"), ("Hi", "jaw_C0_0_jnt")):
+        (asset_folder / "weights" / joint_resolution).mkdir(parents=True)
+        (asset_folder / "weights" / joint_resolution / f"ring{joint_resolution}__skin.xml").write_text(SKIN_XML.format(joint=joint))
+    return asset_folder
+
+def _counting_read_obj(monkeypatch):
+    reads = []
+    read_obj = obj_reader.read_obj
+    def counted(path):
+        reads.append(os.path.basename(path))
+        return read_obj(path)
+    monkeypatch.setattr(obj_reader, "read_obj", counted)
+    return reads
+
+def test_geometry_is_shared_and_read_once(tmp_path, monkeypatch):
+    monkeypatch.setenv("FT_ACCESSORY_CACHE", str(tmp_path / "cache"))
+    asset_folder = str(_asset_folder(tmp_path))
+    reads = _counting_read_obj(monkeypatch)
+
+    entry = accessory_cache.load_entry(asset_folder, "AB1-CD2-EF3", "0002")
+    assert reads == ["ring.obj"]
+    assert entry["materials"] is None
+    assert np.allclose(entry["geometry"]["ring.obj"]["positions"], [[0, 0, 0], [1, 0, 0], [1, 1, 0]])
+    assert entry["geometry"]["ring.obj"]["uv_ids"] is None
+
+    for joint_resolution, joint in (("Lo", "head_C0_0_jnt"), ("Hi", "jaw_C0_0_jnt")):
+        weights = accessory_cache.load_weights(asset_folder, "AB1-CD2-EF3", "0002", joint_resolution, list(entry["geometry"]))
+        influences, vertices, columns, values = weights[f"ring{joint_resolution}_"]
+        assert influences == [joint]
+        assert vertices.tolist() == [0, 1, 2]
+
+    # a second load is a cache hit, nothing is parsed again
+    accessory_cache.load_entry(asset_folder, "AB1-CD2-EF3", "0002")
+    assert reads == ["ring.obj"]
+    version_folder = accessory_cache.get_cache_folder("AB1-CD2-EF3", "0002")
+    assert sorted(os.listdir(version_folder)) == ["Hi", "Lo", "cache.json", "geometry.npz"]
+    assert sorted(os.listdir(os.path.join(version_folder, "Lo"))) == ["cache.json", "weights.npz"]
+
+def test_changed_sources_rebuild_only_what_they_feed(tmp_path, monkeypatch):
+    monkeypatch.setenv("FT_ACCESSORY_CACHE", str(tmp_path / "cache"))
+    asset_folder = _asset_folder(tmp_path)
+    entry = accessory_cache.load_entry(str(asset_folder), "AB1-CD2-EF3", "0002")
+    for joint_resolution in ("Lo", "Hi"):
+        accessory_cache.load_weights(str(asset_folder), "AB1-CD2-EF3", "0002", joint_resolution, list(entry["geometry"]))
+
+    (asset_folder / "weights" / "Lo" / "ringLo__skin.xml").write_text(SKIN_XML.format(joint="spine_C0_0_jnt"))
+    reads = _counting_read_obj(monkeypatch)
+    entry = accessory_cache.load_entry(str(asset_folder), "AB1-CD2-EF3", "0002")
+    assert reads == []
+    weights = accessory_cache.load_weights(str(asset_folder), "AB1-CD2-EF3", "0002", "Lo", list(entry["geometry"]))
+    assert weights["ringLo_"][0] == ["spine_C0_0_jnt"]
+
+    (asset_folder / "objs" / "ring.obj").write_text("v 0 0 0\nv 2.5 0 0\nv 2.5 2.5 0\nf 1 2 3\n")
+    entry = accessory_cache.load_entry(str(asset_folder), "AB1-CD2-EF3", "0002")
+    assert reads == ["ring.obj"]
+    assert entry["geometry"]["ring.obj"]["positions"][2].tolist() == [2.5, 2.5, 0]
@@ -0,0 +1,63 @@
+import numpy as np
+
+import FT_public.FT_animcurves as animcurves
+
+def test_reduce_keys_no_keys():
+    keep = animcurves.reduce_keys(np.zeros((3, 0)), np.zeros((3, 0)), np.ones(3))
+    assert keep.shape == (3, 0)
+
+def test_reduce_keys_two_keys_kept():
+    keep = animcurves.reduce_keys([[0.0, 1.0]], [[0.0, 5.0]], [0.01])
+    assert keep.all()
+
+def test_reduce_keys_linear_curve_keeps_ends():
+    times = np.arange(20.0)[None]
+    keep = animcurves.reduce_keys(times, times * 2.0, [0.001])
+    assert keep[0].tolist() == [True] + [False] * 18 + [True]
+
+def test_reduce_keys_within_tolerance():
+    times = np.tile(np.arange(100.0), (4, 1))
+    values = np.sin(times / 7.0) * np.array([1.0, 10.0, 0.1, 50.0])[:, None]
+    tolerances = np.array([0.01, 0.05, 0.001, 0.5])
+    keep = animcurves.reduce_keys(times, values, tolerances)
+    assert keep[:, 0].all() and keep[:, -1].all()
+    assert keep.sum() < keep.size
+    for curve in range(4):
+        rebuilt = np.interp(times[curve], times[curve][keep[curve]], values[curve][keep[curve]])
+        assert np.abs(rebuilt - values[curve]).max() <= tolerances[curve] + 1e-9
+
+class FakeCmds(object):
+    """
+    pluginInfo, loadPlugin and the FT_apiUndo command, which takes the pending change like the plugin does.
+    """
+    def __init__(self):
+        self.loaded = []
+        self.recorded = []
+
+    def pluginInfo(self, name, query=True, loaded=True):
+        return bool(self.loaded)
+
+    def loadPlugin(self, path, quiet=True):
+        self.loaded.append(path)
+
+    def FT_apiUndo(self):
+        self.recorded.append(animcurves.pending_changes.pop())
+
+def test_undoable_commits_the_change_once(monkeypatch):
+    fake_cmds = FakeCmds()
+    monkeypatch.setattr(animcurves, "cmds", fake_cmds)
+    for _ in range(2):
+        with animcurves.undoable() as change:
+            pass
+    assert fake_cmds.loaded == [animcurves.UNDO_PLUGIN]
+    assert fake_cmds.recorded[-1] is change and len(fake_cmds.recorded) == 2
+    assert animcurves.pending_changes == []
+
+def test_reduce_keys_greedy_split_honours_tolerance():
+    # splitting at the worst sample isnt optimal here, keys 0, 1, 4, 6 and 7 would do
+    times = np.arange(8.0)[None]
+    values = np.array([[0.0, 2.0, 2.0, 3.0, 3.0, 2.0, 1.0, 2.0]])
+    keep = animcurves.reduce_keys(times, values, [0.5])
+    assert keep.sum() >= 5
+    rebuilt = np.interp(times[0], times[0][keep[0]], values[0][keep[0]])
+    assert np.abs(rebuilt - values[0]).max() <= 0.5
@@ -0,0 +1,52 @@
+import numpy as np
+
+import FT_public.FT_bake as bake
+
+def _cache(fingerprints, rig="rig_a", plugs=("a.tx",)):
+    return {"start": 1, "end": 200, "window": 50, "rig": rig, "fingerprints": fingerprints, "plugs": list(plugs)}
+
+def test_dirty_frame_range_unchanged():
+    fingerprints = {"curve1": ["a", "b", "c", "d"]}
+    assert bake.dirty_frame_range(_cache(fingerprints), fingerprints, 1, 200, 50, 5, rig_digest="rig_a") is None
+
+def test_dirty_frame_range_changed_window_is_padded():
+    old = {"curve1": ["a", "b", "c", "d"]}
+    new = {"curve1": ["a", "b", "x", "d"]}
+    assert bake.dirty_frame_range(_cache(old), new, 1, 200, 50, 5, rig_digest="rig_a") == (96, 155)
+
+def test_dirty_frame_range_changed_rig_drops_cache():
+    fingerprints = {"curve1": ["a", "b", "c", "d"]}
+    assert bake.dirty_frame_range(_cache(fingerprints), fingerprints, 1, 200, 50, 5, rig_digest="rig_b") == (1, 200)
+
+def test_dirty_frame_range_without_cache():
+    assert bake.dirty_frame_range(None, {}, 1, 200, rig_digest="rig_a") == (1, 200)
+
+def test_splice_values_plain():
+    cached = np.zeros(10)
+    fresh = np.arange(10.0)
+    inside = (np.arange(10) >= 3) & (np.arange(10) <= 5)
+    assert bake.splice_values(cached, fresh, inside).tolist() == [0, 0, 0, 3, 4, 5, 0, 0, 0, 0]
+
+def test_splice_values_aligns_rotations_by_whole_turns():
+    frames = np.arange(20.0)
+    cached = frames * 10.0
+    # the fresh bake landed one turn up, the cache after it sits one turn down from the fresh end
+    fresh = cached + 360.0
+    inside = (frames >= 5) & (frames <= 9)
+    spliced = bake.splice_values(cached, fresh, inside, turn=360.0)
+    assert np.allclose(spliced, cached)
+    assert np.abs(np.diff(spliced)).max() < 180.0
+
+def test_splice_values_realigns_tail():
+    frames = np.arange(10.0)
+    cached = np.where(frames < 6, frames, frames - 360.0)
+    fresh = frames.copy()
+    inside = (frames >= 2) & (frames <= 6)
+    spliced = bake.splice_values(cached, fresh, inside, turn=360.0)
+    assert np.allclose(spliced, frames)
+
+def test_dirty_frame_range_changed_options_drop_cache():
+    fingerprints = {"curve1": ["a", "b", "c", "d"]}
+    cached = dict(_cache(fingerprints), options="options_a")
+    assert bake.dirty_frame_range(cached, fingerprints, 1, 200, 50, 5, rig_digest="rig_a", options_digest="options_a") is None
+    assert bake.dirty_frame_range(cached, fingerprints, 1, 200, 50, 5, rig_digest="rig_a", options_digest="options_b") == (1, 200)
@@ -0,0 +1,22 @@
+import numpy as np
+
+import FT_public.FT_bake as bake
+
+def test_internal_to_ui_units(monkeypatch):
+    # a scene in meters and radians
+    monkeypatch.setattr(bake.OpenMaya.MDistance, "uiToInternal", lambda value: value * 100.0)
+    monkeypatch.setattr(bake.OpenMaya.MAngle, "uiToInternal", lambda value: value)
+    channels = {"t": np.array([[250.0, -100.0, 0.0]]), "r": np.array([[90.0, 180.0, -45.0]]), "s": np.ones((1, 3))}
+    converted = bake.internal_to_ui_units(channels)
+    assert np.allclose(converted["t"], [[2.5, -1.0, 0.0]])
+    assert np.allclose(converted["r"], [[np.pi / 2, np.pi, -np.pi / 4]])
+    assert converted["s"] is channels["s"]
+    assert np.allclose(channels["t"], [[250.0, -100.0, 0.0]])
+
+def test_internal_to_ui_units_centimeters_degrees(monkeypatch):
+    monkeypatch.setattr(bake.OpenMaya.MDistance, "uiToInternal", lambda value: value)
+    monkeypatch.setattr(bake.OpenMaya.MAngle, "uiToInternal", lambda value: np.radians(value))
+    channels = {"t": np.arange(6.0).reshape(2, 3), "r": np.arange(6.0).reshape(2, 3) * 30.0}
+    converted = bake.internal_to_ui_units(channels)
+    assert np.allclose(converted["t"], channels["t"])
+    assert np.allclose(converted["r"], channels["r"])
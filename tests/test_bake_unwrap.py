@@ -0,0 +1,63 @@
+import numpy as np
+
+import FT_public.FT_bake as bake
+
+def _random_rotations(num_curves=50, num_keys=600, seed=0):
+    """
+    Noisy rotation curves with injected flips and whole turns, shaped (3, curves, keys).
+    """
+    random = np.random.RandomState(seed)
+    rotations = np.cumsum(random.uniform(-40.0, 40.0, (3, num_curves, num_keys)), axis=-1)
+    flips = random.uniform(size=(num_curves, num_keys)) < 0.05
+    rotations[0][flips] += 180.0
+    rotations[1][flips] = 180.0 - rotations[1][flips]
+    rotations[2][flips] += 180.0
+    rotations += random.randint(-2, 3, rotations.shape) * 360.0
+    return rotations
+
+def test_unwrap_matches_scalar():
+    rotations = _random_rotations()
+    array_result = np.stack(bake.unwrap_euler_rotations(*rotations))
+    for i in range(rotations.shape[1]):
+        scalar_result = bake.unwrap_euler_rotations_scalar(*[list(channel[i]) for channel in rotations])
+        assert np.allclose(np.array(scalar_result), array_result[:, i])
+
+def test_unwrap_single_curve_shape():
+    rotations = _random_rotations(num_curves=1, num_keys=40, seed=3)[:, 0]
+    array_result = bake.unwrap_euler_rotations(*rotations)
+    scalar_result = bake.unwrap_euler_rotations_scalar(*[list(channel) for channel in rotations])
+    assert all(result.shape == (40,) for result in array_result)
+    assert np.allclose(np.array(scalar_result), np.stack(array_result))
+
+def test_unwrap_short_curves_untouched():
+    result = bake.unwrap_euler_rotations([10.0], [20.0], [30.0])
+    assert [float(channel[0]) for channel in result] == [10.0, 20.0, 30.0]
+
+def _assert_matches_scalar(rotations):
+    array_result = np.stack(bake.unwrap_euler_rotations(*rotations))
+    for i in range(rotations.shape[1]):
+        scalar_result = bake.unwrap_euler_rotations_scalar(*[list(channel[i]) for channel in rotations])
+        assert np.array_equal(np.array(scalar_result), array_result[:, i]), i
+
+def test_unwrap_matches_scalar_on_boundary_steps():
+    # every channel steps by exactly a quarter, half, three quarter or whole turn, alone and in runs
+    steps = [-360.0, -270.0, -180.0, -90.0, 90.0, 180.0, 270.0, 360.0]
+    rotations = []
+    for step in steps:
+        for other in steps + [0.0, 45.0]:
+            for channel in range(3):
+                curve = np.zeros((3, 6))
+                curve[channel, 1:] = np.cumsum([step, other, step, step, -other])
+                rotations.append(curve)
+    _assert_matches_scalar(np.stack(rotations, axis=1))
+
+def test_unwrap_matches_scalar_on_whole_degrees():
+    # whole degree keys, rounded to 10 so steps keep landing on the wrap boundaries
+    random = np.random.RandomState(4)
+    rotations = np.round(np.cumsum(random.uniform(-400.0, 400.0, (3, 500, 30)), axis=-1) / 10.0) * 10.0
+    _assert_matches_scalar(rotations)
+    _assert_matches_scalar(np.round(_random_rotations(num_curves=50, num_keys=200, seed=5)))
+
+def test_unwrap_keeps_a_step_of_exactly_270():
+    rot_x, rot_y, rot_z = bake.unwrap_euler_rotations([0.0, 0.0], [0.0, 0.0], [0.0, 270.0])
+    assert rot_z.tolist() == [0.0, 270.0]
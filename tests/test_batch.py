@@ -0,0 +1,16 @@
+import os
+
+import FT_public.FT_batch as batch
+
+def test_scene_destinations_keep_shots_apart(tmp_path):
+    shots = tmp_path / "shots"
+    scenes = [str(shots / "sh010" / "anim" / "anim.mb"), str(shots / "sh020" / "anim" / "anim.mb")]
+    destination = str(tmp_path / "fbx")
+    destinations = batch.scene_destinations(scenes, destination)
+    assert destinations[scenes[0]] == os.path.join(destination, "sh010", "anim")
+    assert destinations[scenes[1]] == os.path.join(destination, "sh020", "anim")
+
+def test_scenes_in_one_folder_share_the_destination(tmp_path):
+    scenes = [str(tmp_path / "sh010.mb"), str(tmp_path / "sh020.mb")]
+    destination = str(tmp_path / "fbx")
+    assert set(batch.scene_destinations(scenes, destination).values()) == {destination}
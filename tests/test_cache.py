@@ -0,0 +1,57 @@
+import hashlib
+import os
+
+import FT_public.FT_cache as cache
+
+def _files(tmp_path):
+    scene_path, rig_path = tmp_path / "shot010.ma", tmp_path / "rig.ma"
+    scene_path.write_text("scene")
+    rig_path.write_text("rig")
+    return str(scene_path), str(rig_path)
+
+def test_file_digest(tmp_path):
+    path = tmp_path / "rig.ma"
+    path.write_bytes(b"x" * 3000)
+    assert cache.file_digest(str(path), chunk_size=1024) == hashlib.sha1(b"x" * 3000).hexdigest()
+    assert cache.file_digest(str(tmp_path / "missing.ma")) is None
+    assert cache.file_digest(None) is None
+
+def test_export_key_changes_with_every_input(tmp_path):
+    scene_path, rig_path = _files(tmp_path)
+    key = cache.export_key(scene_path, rig_path, 1, 100, "Lo", {"reduce_keys": False})
+    assert key == cache.export_key(scene_path, rig_path, 1.0, 100.0, "Lo", {"reduce_keys": False})
+    assert key != cache.export_key(scene_path, rig_path, 1, 101, "Lo", {"reduce_keys": False})
+    assert key != cache.export_key(scene_path, rig_path, 1, 100, "Hi", {"reduce_keys": False})
+    assert key != cache.export_key(scene_path, rig_path, 1, 100, "Lo", {"reduce_keys": True})
+    assert cache.export_key(scene_path, str(tmp_path / "missing.ma"), 1, 100, "Lo") is None
+
+    with open(rig_path, "a") as rig_file:
+        rig_file.write(" edited")
+    assert key != cache.export_key(scene_path, rig_path, 1, 100, "Lo", {"reduce_keys": False})
+
+def test_record_then_hit(tmp_path):
+    scene_path, rig_path = _files(tmp_path)
+    fbx_path = str(tmp_path / "fbx" / "shot010.fbx")
+    key = cache.export_key(scene_path, rig_path, 1, 100, "Lo")
+    assert not cache.is_cached(fbx_path, key)
+
+    os.makedirs(os.path.dirname(fbx_path))
+    with open(fbx_path, "w") as fbx_file:
+        fbx_file.write("fbx")
+    cache.record(fbx_path, key, seconds=1.5)
+    assert cache.is_cached(fbx_path, key)
+    assert cache.load_manifest(os.path.dirname(fbx_path))["shot010.fbx"] == {"key": key, "seconds": 1.5}
+    assert not cache.is_cached(fbx_path, cache.export_key(scene_path, rig_path, 1, 120, "Lo"))
+    assert not cache.is_cached(fbx_path, None)
+
+    os.remove(fbx_path)
+    assert not cache.is_cached(fbx_path, key)
+
+def test_broken_manifest_is_a_miss(tmp_path):
+    (tmp_path / cache.MANIFEST_NAME).write_text("{not json")
+    assert cache.load_manifest(str(tmp_path)) == {}
+
+def test_options_digest():
+    assert cache.options_digest({"reduce_keys": True, "tier": "Lo"}) == cache.options_digest({"tier": "Lo", "reduce_keys": True})
+    assert cache.options_digest({"reduce_keys": True}) != cache.options_digest({"reduce_keys": False})
+    assert cache.options_digest(None) == cache.options_digest({})
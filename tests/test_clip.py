@@ -0,0 +1,29 @@
+import json
+
+import numpy as np
+import pytest
+
+import FT_public.FT_clip as clip
+
+def test_clip_paths():
+    for path in ("shot/walk.fbx", "shot/walk.clip.npy", "shot/walk.clip.json", "shot/walk"):
+        assert clip.clip_paths(path) == ("shot/walk.clip.npy", "shot/walk.clip.json")
+
+def test_write_read_roundtrip(tmp_path):
+    trs = np.random.RandomState(0).normal(size=(12, 3, 10))
+    npy_path, json_path = clip.write_clip(str(tmp_path / "anim" / "walk.fbx"), ["root", "hip", "knee"], [-1, 0, 1],
+                                          trs, 30.0, 1, 12, linear_unit="cm")
+    header, data = clip.read_clip(npy_path)
+    assert header["joints"] == ["root", "hip", "knee"]
+    assert header["parents"] == [-1, 0, 1]
+    assert header["frame_count"] == 12
+    assert header["linear_unit"] == "cm"
+    assert header["channels"] == clip.CHANNELS
+    assert data.dtype == np.float32
+    assert np.allclose(data, trs.astype(np.float32))
+    with open(json_path) as header_file:
+        assert json.load(header_file)["fps"] == 30.0
+
+def test_write_clip_rejects_bad_shape(tmp_path):
+    with pytest.raises(ValueError):
+        clip.write_clip(str(tmp_path / "bad"), ["root"], [-1], np.zeros((4, 2, 10)), 24.0, 0, 3)
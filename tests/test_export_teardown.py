@@ -0,0 +1,70 @@
+import fnmatch
+
+import FT_public.FT_export as export
+
+class FakeScene(object):
+    """
+    Just enough of maya.cmds for the teardown: node types, dag flags and source connections.
+    """
+    def __init__(self, nodes, sources):
+        self.nodes = dict(nodes)
+        self.sources = {node: list(inputs) for node, inputs in sources.items()}
+
+    def _match(self, names):
+        names = [names] if isinstance(names, str) else list(names)
+        return [node for node in self.nodes if any(fnmatch.fnmatchcase(node, name) for name in names)]
+
+    def ls(self, names=None, type=None, dag=False):
+        nodes = self._match(names)
+        if type:
+            types = [type] if isinstance(type, str) else type
+            nodes = [node for node in nodes if self.nodes[node][0] in types]
+        if dag:
+            nodes = [node for node in nodes if self.nodes[node][1]]
+        return nodes
+
+    def listConnections(self, nodes, source=True, destination=False, skipConversionNodes=True):
+        return [source_node for node in nodes for source_node in self.sources.get(node, []) if source_node in self.nodes]
+
+    def nodeType(self, node):
+        return self.nodes[node][0]
+
+    def objExists(self, node):
+        return node in self.nodes
+
+    def delete(self, nodes):
+        for node in [nodes] if isinstance(nodes, str) else nodes:
+            del self.nodes[node]
+
+def _scene():
+    nodes = {"rig:out_C0_0_jnt": ("joint", True),
+             "rig:arm_dM": ("decomposeMatrix", False),
+             "rig:arm_mM": ("multMatrix", False),
+             "rig:arm_ctl": ("transform", True),
+             "rig:arm_ctl_mtxCns": ("mgear_matrixConstraint", False),
+             "rig:hip_rigUParCon": ("parentConstraint", True),
+             "rig:out_C0_0_jnt_translateX": ("animCurveTL", False),
+             "other:arm_mM": ("multMatrix", False),
+             "other:arm_dM": ("decomposeMatrix", False)}
+    sources = {"rig:out_C0_0_jnt": ["rig:arm_dM"],
+               "rig:arm_dM": ["rig:arm_mM"],
+               "rig:arm_mM": ["rig:arm_ctl", "other:arm_mM"],
+               "rig:arm_ctl": ["rig:arm_ctl_mtxCns"]}
+    return FakeScene(nodes, sources)
+
+def test_teardown_from_nodes_gathered_before_the_bake(monkeypatch):
+    scene = _scene()
+    monkeypatch.setattr(export, "cmds", scene)
+    matrix_nodes = export.gather_rig_matrix_nodes("rig", ["rig:out_C0_0_jnt"])
+
+    # the bake replaces the decompose connections with animCurves
+    scene.sources["rig:out_C0_0_jnt"] = ["rig:out_C0_0_jnt_translateX"]
+    report = export.teardown_matrix_nodes("rig", ["rig:out_C0_0_jnt"], matrix_nodes)
+
+    assert scene.ls("rig:*", type=export.MATRIX_NODE_TYPES) == []
+    assert not scene.objExists("rig:hip_rigUParCon")
+    assert report["matrix_nodes"] == {"decomposeMatrix": 1, "multMatrix": 1, "mgear_matrixConstraint": 1,
+                                      "parentConstraint": 1}
+    # another character's nodes are left alone
+    assert scene.objExists("other:arm_mM") and scene.objExists("other:arm_dM")
+    assert scene.objExists("rig:out_C0_0_jnt") and scene.objExists("rig:arm_ctl")
@@ -0,0 +1,25 @@
+import FT_public.FT_export as export
+
+def _manifest(kept, deleted, groups=("Lo", "Mid", "Hi")):
+    return {"tiers": {tier: {"joints": kept.get(tier, []), "delete_joints": deleted.get(tier, []),
+                             "geometry": [tier] if tier in groups else []} for tier in export.TIERS}}
+
+JOINT_PATHS = ["|rig:jnt_org|rig:global_C0_0_jnt",
+               "|rig:jnt_org|rig:global_C0_0_jnt|rig:spine_C0_0_jnt",
+               "|rig:jnt_org|rig:global_C0_0_jnt|rig:spine_C0_0_jnt|rig:CheekMain_L0_0_jnt",
+               "|rig:jnt_org|rig:global_C0_0_jnt|rig:spine_C0_0_jnt|rig:CheekMain_L0_0_jnt|rig:cheek_L0_0_jnt"]
+ALL = ["global_C0_0_jnt", "spine_C0_0_jnt", "CheekMain_L0_0_jnt", "cheek_L0_0_jnt"]
+
+def test_healthy_tiers_pass():
+    manifest = _manifest({"Lo": ALL[:2], "Mid": ALL, "Hi": ALL}, {"Lo": ["CheekMain_L0_0_jnt", "cheek_L0_0_jnt"]})
+    assert export.check_tier_manifest(manifest, JOINT_PATHS) == {}
+
+def test_every_failing_tier_is_reported():
+    # Lo keeps a joint under the main joint it deletes, Mid has no joints, Hi has no group
+    manifest = _manifest({"Lo": ["global_C0_0_jnt", "spine_C0_0_jnt", "cheek_L0_0_jnt"], "Hi": ALL},
+                         {"Lo": ["CheekMain_L0_0_jnt"]}, groups=("Lo", "Mid"))
+    failing = export.check_tier_manifest(manifest, JOINT_PATHS)
+    assert sorted(failing) == ["Hi", "Lo", "Mid"]
+    assert failing["Lo"] == ["1 joints sit under deleted joints: cheek_L0_0_jnt"]
+    assert failing["Mid"] == ["no joints"]
+    assert failing["Hi"] == ["no tier group"]
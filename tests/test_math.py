@@ -0,0 +1,76 @@
+import numpy as np
+
+import FT_public.FT_math as ft_math
+
+def _axis_matrix(axis, degrees):
+    # maya row vector rotation about one axis
+    c, s = np.cos(np.radians(degrees)), np.sin(np.radians(degrees))
+    i, j = [(1, 2), (2, 0), (0, 1)][axis]
+    matrix = np.eye(3)
+    matrix[i, i], matrix[i, j], matrix[j, i], matrix[j, j] = c, s, -s, c
+    return matrix
+
+def test_euler_to_matrices_follows_maya_order():
+    angles = np.array([30.0, -50.0, 75.0])
+    for rotate_order, order in enumerate(ft_math.ROTATE_ORDERS):
+        # row vectors, the first axis of the order is applied first
+        expected = np.eye(3)
+        for axis in order:
+            axis = "xyz".index(axis)
+            expected = expected @ _axis_matrix(axis, angles[axis])
+        assert np.allclose(ft_math.euler_to_matrices(angles, rotate_order), expected), order
+
+def test_euler_roundtrip_every_order():
+    angles = np.random.RandomState(1).uniform(-180.0, 180.0, size=(50, 3))
+    angles[:, 1] = np.clip(angles[:, 1], -89.0, 89.0)
+    for rotate_order, order in enumerate(ft_math.ROTATE_ORDERS):
+        middle = "xyz".index(order[1])
+        order_angles = angles.copy()
+        order_angles[:, [1, middle]] = order_angles[:, [middle, 1]]
+        matrices = ft_math.euler_to_matrices(order_angles, rotate_order)
+        assert np.allclose(ft_math.matrices_to_euler(matrices, rotate_order), order_angles), order
+
+def test_matrices_to_euler_per_joint_orders():
+    angles = np.array([[10.0, 20.0, 30.0], [-40.0, 15.0, 120.0]])
+    matrices = np.stack([ft_math.euler_to_matrices(angles[0], 0), ft_math.euler_to_matrices(angles[1], 5)])
+    assert np.allclose(ft_math.matrices_to_euler(matrices[None], [0, 5])[0], angles)
+
+def test_joint_rotations_undo_orient_axis_and_scale():
+    rotate = np.array([[25.0, -10.0, 60.0]])
+    joint_orients = np.array([[0.0, 90.0, 0.0]])
+    rotate_axes = np.array([[15.0, 0.0, 0.0]])
+    local = np.eye(4)
+    local[:3, :3] = (np.diag([2.0, 2.0, 2.0]) @ ft_math.euler_to_matrices(rotate_axes[0])
+                     @ ft_math.euler_to_matrices(rotate[0]) @ ft_math.euler_to_matrices(joint_orients[0]))
+    local[3, :3] = [1.0, 2.0, 3.0]
+    solved = ft_math.joint_rotations(local[None, None], [0], joint_orients, rotate_axes)
+    assert np.allclose(solved[0], rotate)
+
+def test_quaternion_roundtrip():
+    angles = np.random.RandomState(2).uniform(-180.0, 180.0, size=(200, 3))
+    matrices = ft_math.euler_to_matrices(angles, 0)
+    quaternions = ft_math.matrices_to_quaternions(matrices)
+    assert np.allclose(np.linalg.norm(quaternions, axis=-1), 1.0)
+    assert np.allclose(ft_math.quaternions_to_matrices(quaternions), matrices)
+
+def test_quaternion_continuity_keeps_one_hemisphere():
+    angles = np.zeros((90, 3))
+    angles[:, 2] = np.linspace(0.0, 720.0, 90)
+    quaternions = ft_math.matrices_to_quaternions(ft_math.euler_to_matrices(angles, 0))
+    continuous = ft_math.quaternion_continuity(quaternions, axis=0)
+    assert np.all(np.sum(continuous[1:] * continuous[:-1], axis=-1) > 0.0)
+    assert np.allclose(np.abs(np.sum(continuous * quaternions, axis=-1)), 1.0)
+
+def test_closest_euler_is_flip_free_past_180():
+    # a spin on z past 180 and a swing through the y gimbal, sampled densely, must never jump
+    frames = 120
+    angles = np.zeros((frames, 2, 3))
+    angles[:, 0, 2] = np.linspace(0.0, 540.0, frames)
+    angles[:, 1, 0] = 30.0
+    angles[:, 1, 1] = np.linspace(0.0, 170.0, frames)
+    rotate_orders = np.array([0, 0])
+    matrices = np.stack([ft_math.euler_to_matrices(angles[:, joint], 0) for joint in range(2)], axis=1)
+    solved = ft_math.closest_euler(matrices, rotate_orders)
+    assert np.abs(np.diff(solved, axis=0)).max() < 10.0
+    assert np.allclose(ft_math.euler_to_matrices(solved, 0), matrices)
+    assert np.allclose(solved[:, 0, 2], angles[:, 0, 2])
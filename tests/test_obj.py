@@ -0,0 +1,109 @@
+import time
+
+import numpy as np
+import pytest
+
+import FT_public.FT_obj as obj_reader
+
+def _write(tmp_path, text, name="piece.obj"):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+def _grid_obj(size):
+    # size x size quads with uvs and normals, written the way the accessory exports are
+    lines = ["# grid", "o grid"]
+    for y in range(size + 1):
+        for x in range(size + 1):
+            lines.append(f"v {x * 0.5:.6f} 0.000000 {y * 0.25:.6f}")
+    for y in range(size + 1):
+        for x in range(size + 1):
+            lines.append(f"vt {x / size:.6f} {y / size:.6f}")
+    lines.append("vn 0.000000 1.000000 0.000000")
+    lines.append("s off")
+    for y in range(size):
+        for x in range(size):
+            a = y * (size + 1) + x + 1
+            corners = (a, a + 1, a + size + 2, a + size + 1)
+            lines.append("f " + " ".join(f"{corner}/{corner}/1" for corner in corners))
+    return "\n".join(lines) + "\n"
+
+def _read_obj_per_line(obj_file_path):
+    # the straightforward parser, kept as the reference read_obj is checked and timed against
+    positions, uvs, normals, face_counts, corners = [], [], [], [], []
+    with open(obj_file_path) as obj_file:
+        for line in obj_file:
+            fields = line.split()
+            if not fields:
+                continue
+            if fields[0] == "v":
+                positions.append([float(value) for value in fields[1:4]])
+            elif fields[0] == "vt":
+                uvs.append([float(value) for value in fields[1:3]])
+            elif fields[0] == "vn":
+                normals.append([float(value) for value in fields[1:4]])
+            elif fields[0] == "f":
+                face_counts.append(len(fields) - 1)
+                counts = (len(positions), len(uvs), len(normals))
+                for corner in fields[1:]:
+                    corners.append([int(value) - 1 if int(value) > 0 else int(value) + count
+                                    for value, count in zip(corner.split("/"), counts)])
+    corners = np.array(corners)
+    return {"positions": np.array(positions), "uvs": np.array(uvs), "normals": np.array(normals),
+            "face_counts": np.array(face_counts), "vertex_ids": corners[:, 0], "uv_ids": corners[:, 1],
+            "normal_ids": corners[:, 2]}
+
+def test_layouts(tmp_path):
+    vertices = "v 0 0 0\nv 1 0 0\nv 1 1 0\nvt 0 0\nvt 1 0\nvt 1 1\nvn 0 0 1\n"
+    obj = obj_reader.read_obj(_write(tmp_path, vertices + "f 1 2 3\n"))
+    assert obj["vertex_ids"].tolist() == [0, 1, 2]
+    assert obj["uv_ids"] is None and obj["normal_ids"] is None
+
+    obj = obj_reader.read_obj(_write(tmp_path, vertices + "f 1//1 2//1 3//1\n"))
+    assert obj["uv_ids"] is None
+    assert obj["normal_ids"].tolist() == [0, 0, 0]
+
+    obj = obj_reader.read_obj(_write(tmp_path, vertices + "f 1/3 2/2 3/1\n"))
+    assert obj["uv_ids"].tolist() == [2, 1, 0]
+    assert obj["normal_ids"] is None
+
+    obj = obj_reader.read_obj(_write(tmp_path, vertices + "f 1/1/1 2/2/1 3/3/1\n"))
+    assert obj["positions"].shape == (3, 3)
+    assert obj["uvs"].shape == (3, 2)
+    assert obj["face_counts"].tolist() == [3]
+
+def test_negative_indices_count_back_from_what_was_read(tmp_path):
+    # -4 in the second face counts back from the seven vertices read by then, not from the end of the file
+    text = ("v 0 0 0\nv 1 0 0\nv 1 1 0\n"
+            "f -3 -2 -1\n"
+            "v 0 0 1\nv 1 0 1\nv 1 1 1\nv 0 1 1\n"
+            "f -4 -3 -2 -1\n"
+            "f 1 2 3\n")
+    obj = obj_reader.read_obj(_write(tmp_path, text))
+    assert obj["face_counts"].tolist() == [3, 4, 3]
+    assert obj["vertex_ids"].tolist() == [0, 1, 2, 3, 4, 5, 6, 0, 1, 2]
+
+def test_vertices_of_different_widths(tmp_path):
+    text = "v 0 0 0\nv 1 0 0 1.0\nv 1 1 0 0.5 0.5 0.5\nf 1 2 3\n"
+    obj = obj_reader.read_obj(_write(tmp_path, text))
+    assert np.allclose(obj["positions"], [[0, 0, 0], [1, 0, 0], [1, 1, 0]])
+
+def test_mixed_layouts_are_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        obj_reader.read_obj(_write(tmp_path, "v 0 0 0\nv 1 0 0\nv 1 1 0\nvt 0 0\nf 1/1 2/1 3\n"))
+
+def test_matches_and_outruns_the_per_line_parser(tmp_path):
+    path = _write(tmp_path, _grid_obj(150))
+
+    start = time.perf_counter()
+    expected = _read_obj_per_line(path)
+    per_line_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    obj = obj_reader.read_obj(path)
+    read_obj_seconds = time.perf_counter() - start
+    print(f"read_obj {read_obj_seconds * 1000:.1f}ms, per line parser {per_line_seconds * 1000:.1f}ms, "
+          f"{per_line_seconds / read_obj_seconds:.1f}x")
+
+    for field, array in expected.items():
+        assert np.array_equal(obj[field], array) if array.dtype.kind == "i" else np.allclose(obj[field], array), field
+    assert read_obj_seconds < per_line_seconds
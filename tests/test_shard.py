@@ -0,0 +1,36 @@
+import numpy as np
+
+import FT_public.FT_shard as shard
+
+def _shard_results(shard_ranges, sample_by, curve):
+    # what each worker returns, keys on its own bake range
+    results = []
+    for bake_start, bake_end, _, _ in shard_ranges:
+        times = np.arange(bake_start, bake_end + 1, sample_by, dtype=float)
+        results.append((times, curve(times)[None]))
+    return results
+
+def test_split_covers_the_range_once():
+    shard_ranges = shard.split_frame_range(1, 100, 4, 10)
+    assert [(keep_start, keep_end) for _, _, keep_start, keep_end in shard_ranges] == [(1, 25), (26, 50), (51, 75), (76, 100)]
+    assert shard_ranges[0][:2] == (1, 35) and shard_ranges[1][:2] == (16, 60) and shard_ranges[-1][:2] == (66, 100)
+
+def test_shards_start_on_the_sample_grid():
+    sample_by = 2
+    shard_ranges = shard.split_frame_range(1, 100, 3, 5, sample_by)
+    for bake_start, _, keep_start, _ in shard_ranges:
+        assert (bake_start - 1) % sample_by == 0 and (keep_start - 1) % sample_by == 0
+
+    results = _shard_results(shard_ranges, sample_by, lambda times: times * 0.5)
+    times, values = shard.stitch_shards(results, shard_ranges, np.array([False]))
+    assert np.array_equal(times, np.arange(1, 101, sample_by))
+    assert np.allclose(values[0], times * 0.5)
+
+def test_stitch_lines_rotations_up_by_whole_turns():
+    shard_ranges = shard.split_frame_range(1, 60, 3, 5)
+    for turn in (360.0, 2.0 * np.pi):
+        # a slow spin, every shard but the first comes back a turn off
+        results = _shard_results(shard_ranges, 1, lambda times: times * turn / 40.0)
+        results = [(times, values - turn * (i > 0)) for i, (times, values) in enumerate(results)]
+        times, values = shard.stitch_shards(results, shard_ranges, np.array([True]), turn)
+        assert np.allclose(values[0], times * turn / 40.0), turn
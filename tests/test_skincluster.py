@@ -0,0 +1,38 @@
+import numpy as np
+
+import FT_public.FT_skincluster as skn
+
+WEIGHTS_XML = """<?xml version="1.0"?>
+<deformerWeight>
+  <headerInfo fileName="ring_skin.xml" worldMatrix="1.0 0 0 0 0 1.0 0 0 0 0 1.0 0 0 0 0 1.0 "/>
+  <weights deformer="skinCluster1" source="head_C0_0_jnt" shape="ringShape" layer="0" defaultValue="0.000" size="2" max="9">
+    <point index="0" value="1.000"/>
+    <point index="9" value="0.250"/>
+  </weights>
+  <weights deformer="skinCluster1" source="jaw_C0_0_jnt" shape="ringShape" layer="0" defaultValue="0.000" size="1" max="9">
+    <point index="9" value="0.750"/>
+  </weights>
+  <weights deformer="skinCluster1" source="neck_C0_0_jnt" shape="ringShape" layer="0" defaultValue="0.000" size="0" max="9"/>
+</deformerWeight>
+"""
+
+def test_read_skin_weights_is_sparse(tmp_path):
+    path = tmp_path / "ring_skin.xml"
+    path.write_text(WEIGHTS_XML)
+    influences, vertices, columns, values = skn.read_skin_weights(str(path))
+    assert influences == ["head_C0_0_jnt", "jaw_C0_0_jnt", "neck_C0_0_jnt"]
+    assert vertices.tolist() == [0, 9, 9]
+    assert columns.tolist() == [0, 0, 1]
+    assert np.allclose(values, [1.0, 0.25, 0.75])
+
+def test_weights_block_only_holds_the_weighted_vertices():
+    vertices, columns, values = np.array([0, 9, 9]), np.array([0, 0, 1]), np.array([1.0, 0.25, 0.75])
+    # skinCluster influences: jaw, an influence the file doesnt hold, head
+    weighted, block = skn.weights_block(vertices, columns, values, [1, -1, 0])
+    assert weighted.tolist() == [0, 9]
+    assert np.allclose(block, [[0.0, 0.0, 1.0], [0.75, 0.0, 0.25]])
+
+def test_weights_block_of_no_weights():
+    empty = np.zeros(0, dtype=np.int64)
+    weighted, block = skn.weights_block(empty, empty, np.zeros(0), [0, 1])
+    assert block.shape == (0, 2)
@@ -0,0 +1,51 @@
+import os
+
+import FT_public.FT_accessories as accessories
+import FT_public.FT_cache as cache
+
+def _write(path, data):
+    with open(path, "wb") as texture:
+        texture.write(data)
+    return str(path)
+
+def _counting_digest(monkeypatch):
+    hashed = []
+    file_digest = cache.file_digest
+    def digest(path, *args, **kwargs):
+        hashed.append(os.path.basename(path))
+        return file_digest(path, *args, **kwargs)
+    monkeypatch.setattr(cache, "file_digest", digest)
+    return hashed
+
+def test_stage_copies_then_skips_without_hashing(tmp_path, monkeypatch):
+    source = tmp_path / "source"
+    source.mkdir()
+    textures = [_write(source / "skin_D.png", b"diffuse"), _write(source / "skin_N.png", b"normal")]
+    staged_folder = str(tmp_path / "staged")
+
+    staged = accessories.stage_textures(textures, staged_folder)
+    assert sorted(os.path.basename(path) for path in staged.values()) == ["skin_D.png", "skin_N.png"]
+
+    hashed = _counting_digest(monkeypatch)
+    assert accessories.stage_textures(textures, staged_folder) == staged
+    assert hashed == []
+
+def test_stage_reuses_a_texture_under_another_name(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    first = _write(source / "a_D.png", b"shared")
+    second = _write(source / "b_D.png", b"shared")
+    staged = accessories.stage_textures([first, second], str(tmp_path / "staged"))
+    assert staged[first] == staged[second]
+    assert sorted(os.listdir(tmp_path / "staged")) == ["a_D.png", accessories.TEXTURE_INDEX_NAME]
+
+def test_stage_copies_a_change_of_the_same_size(tmp_path):
+    source = tmp_path / "source"
+    source.mkdir()
+    texture = _write(source / "skin_D.png", b"aaaa")
+    staged_folder = tmp_path / "staged"
+    accessories.stage_textures([texture], str(staged_folder))
+    _write(texture, b"bbbb")
+    os.utime(texture, (0, 0))
+    accessories.stage_textures([texture], str(staged_folder))
+    assert (staged_folder / "skin_D.png").read_bytes() == b"bbbb"